@@ -0,0 +1,188 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from astrbot.api import logger
+from .search_engine import MultiSearchEngine
+from .text_norm import normalize
+
+# 书目中保存的字段；其余字段（简介、试读等）不进入书目
+CATALOG_FIELDS = ("name", "author", "origin", "bid", "url")
+
+
+def _grams(text: str) -> set:
+    """单字与相邻两字的集合；单字用于一个字的查询"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class BookCatalog:
+    """见过的所有书籍的本地书目，按书名/作者的字符二元组建立倒排索引
+
+    搜索结果与详情在获取时自动收录，插件重启后仍然保留（追加写入 JSON Lines 日志，
+    启动时重放并在日志明显冗余时压缩）。上游可用时用于即时展示，上游不可用时作为兜底结果。
+
+    Args:
+        data_dir: 插件数据目录
+        max_books: 书目容量上限，超出时淘汰最久未见的书籍
+    """
+    def __init__(self, data_dir: str, max_books: int = 20000):
+        self.path = os.path.join(data_dir, "catalog.jsonl")
+        self.max_books = max_books
+        self._keys = OrderedDict()  # 书籍键 -> 记录 id，按最近出现排序
+        self._records = {}          # 记录 id -> 书目记录
+        self._postings = {}         # 单字/二元组 -> 记录 id 集合
+        self._urls = {}             # (平台, 详情链接) -> 书籍键，合并同一本书带/不带 bid 的记录
+        self._next_id = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self._load()
+
+    @staticmethod
+    def book_id(book: dict) -> tuple:
+        """书籍键：同一平台内优先按 bid 区分，没有 bid 时按详情链接"""
+        bid = book.get("bid")
+        return book.get("origin"), str(bid) if bid else book.get("url")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        self._insert(json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+        except OSError as e:
+            logger.warning(f"[书目] 读取失败: {e}")
+            return
+        if lines > 2 * len(self._records) + 100:
+            self._compact()
+
+    def _compact(self):
+        """按当前书目重写日志，去掉被覆盖与被淘汰的记录"""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record_id in self._keys.values():
+                    f.write(json.dumps(self._records[record_id], ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"[书目] 压缩失败: {e}")
+
+    def _insert(self, record: dict) -> bool:
+        """放入内存索引，返回记录是否有变化"""
+        key = self.book_id(record)
+        if not record.get("name") or not key[1]:
+            return False
+        url_key = (record.get("origin"), record.get("url"))
+        known = self._urls.get(url_key)
+        if known is not None and known != key:
+            if record.get("bid"):
+                # 早先只按链接收录的同一本书并入带 bid 的记录
+                self._drop(self._keys.pop(known))
+            else:
+                key = known
+                record = dict(record, bid=self._records[self._keys[known]].get("bid"))
+        record_id = self._keys.get(key)
+        if record_id is not None:
+            self._keys.move_to_end(key)
+            old = self._records[record_id]
+            if all(old.get(k) == record.get(k) for k in CATALOG_FIELDS):
+                return False
+            self._unindex(record_id)
+            self._urls.pop((old.get("origin"), old.get("url")), None)
+        else:
+            record_id = self._next_id
+            self._next_id += 1
+            self._keys[key] = record_id
+        self._records[record_id] = record
+        if record.get("url"):
+            self._urls[url_key] = key
+        for gram in self._record_grams(record):
+            self._postings.setdefault(gram, set()).add(record_id)
+        while len(self._keys) > self.max_books:
+            _, evicted = self._keys.popitem(last=False)
+            self._drop(evicted)
+        return True
+
+    def _drop(self, record_id: int):
+        """从索引中移除记录（书籍键由调用方移除）"""
+        self._unindex(record_id)
+        record = self._records.pop(record_id)
+        self._urls.pop((record.get("origin"), record.get("url")), None)
+
+    @staticmethod
+    def _record_grams(record: dict) -> set:
+        return _grams(normalize(record.get("name") or "")) | _grams(normalize(record.get("author") or ""))
+
+    def _unindex(self, record_id: int):
+        for gram in self._record_grams(self._records[record_id]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def add(self, books: list):
+        """收录一批搜索结果或详情，只有新增或变化的书籍写入日志"""
+        changed = []
+        for book in books:
+            if not isinstance(book, dict):
+                continue
+            record = {k: book.get(k) for k in CATALOG_FIELDS}
+            record["seen"] = int(time.time())
+            if self._insert(record):
+                changed.append(record)
+        if not changed:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in changed:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"[书目] 写入失败: {e}")
+
+    def search(self, keyword: str, origins=None, limit: int = 50) -> list:
+        """按书名/作者查找，返回按匹配度排序的书籍副本（带 cached 标记）
+
+        Args:
+            keyword: 搜索关键词
+            origins: 只返回这些平台的书籍；None 表示不限
+            limit: 最多返回条数
+        """
+        query = normalize(keyword)
+        if not query:
+            return []
+        grams = {query[i:i + 2] for i in range(len(query) - 1)} or {query}
+        postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0]).intersection(*postings[1:])
+        matched = []
+        for record_id in candidates:
+            record = self._records[record_id]
+            if origins is not None and record.get("origin") not in origins:
+                continue
+            # 二元组全部出现不代表连续出现，再确认一次子串匹配
+            if query not in normalize(record.get("name") or "") and query not in normalize(record.get("author") or ""):
+                continue
+            matched.append(record)
+        matched.sort(key=lambda r: MultiSearchEngine.calculate_score(r, keyword, 1.0), reverse=True)
+        results = [dict(r, cached=True) for r in matched[:limit]]
+        if results:
+            self.hits += 1
+        return results
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> dict:
+        return {
+            "books": len(self._records),
+            "grams": len(self._postings),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,93 @@
+import time
+from collections import deque
+
+
+class SourceUnavailableError(Exception):
+    """数据源熔断中，调用被直接拒绝"""
+    def __init__(self, source_name: str):
+        super().__init__(f"数据源 {source_name} 熔断中")
+        self.source_name = source_name
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器（关闭/打开/半开）
+
+    window 秒内失败（网络异常、超时、5xx）达到 failure_threshold 次即打开，
+    打开期间直接拒绝调用；recovery_timeout 秒后进入半开，只放行一次试探调用，
+    成功则关闭，失败则重新打开。
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 4, window: float = 60, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = deque()
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def _prune(self, now: float):
+        while self.failures and now - self.failures[0] > self.window:
+            self.failures.popleft()
+
+    def current_state(self) -> str:
+        """当前状态；打开超过恢复时间后视为半开（不占用试探名额）"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.probing = False
+        return self.state
+
+    def available(self) -> bool:
+        state = self.current_state()
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self.probing)
+
+    def allow(self) -> bool:
+        """请求放行判断，半开状态下占用唯一的试探名额"""
+        state = self.current_state()
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def end_probe(self):
+        """试探调用结束但未产生网络结果（如命中缓存）时归还名额"""
+        self.probing = False
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            self.failures.clear()
+        self.probing = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._open(now)
+            return
+        self.failures.append(now)
+        self._prune(now)
+        if self.state == self.CLOSED and len(self.failures) >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.probing = False
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._prune(now)
+        state = self.current_state()
+        return {
+            "state": state,
+            "recent_failures": len(self.failures),
+            "retry_in": max(0.0, self.recovery_timeout - (now - self.opened_at)) if state == self.OPEN else 0.0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current_deadline = contextvars.ContextVar("webnovel_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """指令的整体时间预算已用尽（区别于上游自身超时，不计入熔断）"""
+
+
+class Deadline:
+    """一条指令的整体延迟预算，随调用链传递给每个子请求
+
+    同时作为该指令的上下文，记录指令名与在事件循环上同步执行解析所占用的时间。
+    """
+    def __init__(self, budget: float, command: str = None, parent: "Deadline" = None):
+        self.budget = budget
+        self.command = command
+        self.expires_at = time.monotonic() + budget
+        self.blocked = 0.0
+        self.parent = parent
+
+    @property
+    def root(self) -> "Deadline":
+        """整条指令的预算（子预算向上追溯到的最外层）"""
+        return self if self.parent is None else self.parent.root
+
+    def child(self, budget: float) -> "Deadline":
+        """从剩余时间中划出最多 budget 秒的子预算，如聚合搜索中单个平台的延迟预算"""
+        return Deadline(min(budget, self.remaining()), self.command, parent=self)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """剩余时间是否还够 seconds 秒"""
+        return self.remaining() >= seconds
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+def has_budget(seconds: float) -> bool:
+    """当前调用链是否还有 seconds 秒可用；没有预算约束时总是 True
+
+    可选的附加请求（如试读章节）应先用它判断，预算不足时直接跳过。
+    """
+    deadline = _current_deadline.get()
+    return deadline is None or deadline.allows(seconds)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """在当前上下文中启用预算；期间创建的子任务会继承该预算"""
+    if deadline is None:
+        yield None
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,64 @@
+from .text_norm import book_key
+
+
+class DuplicateIndex:
+    """聚合搜索中的跨平台重复书籍合并
+
+    按归一化后的 (书名, 作者) 建立哈希索引，同一本书只保留一个条目：
+    条目是首选来源书籍的副本（不修改平台返回的共享结果），附带
+    origins（按平台权重降序的全部来源）与 sources（来源 -> 详情链接）。
+
+    Args:
+        weights_map: 平台 -> 权重，权重更高的来源作为首选
+    """
+    def __init__(self, weights_map: dict):
+        self.weights_map = dict(weights_map)
+        self._entries = {}  # 去重键 -> 条目
+        self.merged = 0     # 被合并掉的重复书籍数
+
+    def _weight(self, origin) -> float:
+        return self.weights_map.get(origin, 1.0)
+
+    def absorb(self, books: list, replaceable=None):
+        """合并一批新到达的书籍
+
+        Args:
+            books: 平台返回的书籍列表
+            replaceable: 判断已有条目能否更换首选来源的函数；已展示给用户的条目应保持不变
+
+        Returns:
+            tuple: (新条目列表, 首选来源被更换的已有条目列表)
+        """
+        new_entries, replaced = [], []
+        fresh = set()  # 本批新建条目的 id，可随时更换首选来源
+        for book in books:
+            origin = book.get('origin')
+            key = book_key(book)
+            entry = self._entries.get(key) if key[0] else None
+            if entry is None:
+                entry = dict(book)
+                entry['origins'] = [origin]
+                entry['sources'] = {origin: book.get('url')}
+                if key[0]:
+                    self._entries[key] = entry
+                new_entries.append(entry)
+                fresh.add(id(entry))
+                continue
+
+            self.merged += 1
+            if origin in entry['sources']:
+                continue  # 同一平台的重复结果
+            origins, sources = entry['origins'], entry['sources']
+            sources[origin] = book.get('url')
+            origins.append(origin)
+            origins.sort(key=self._weight, reverse=True)
+            if origins[0] != origin:
+                continue
+            is_fresh = id(entry) in fresh
+            if is_fresh or replaceable is None or replaceable(entry):
+                entry.clear()
+                entry.update(book)
+                entry['origins'], entry['sources'] = origins, sources
+                if not is_fresh and not any(e is entry for e in replaced):
+                    replaced.append(entry)
+        return new_entries, replaced
@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from astrbot.api import logger
+from .deadline import DeadlineExceeded
+
+
+class EndpointHealth:
+    """单个接口地址的滚动延迟与错误统计"""
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=20)  # True 表示成功
+        self.consecutive_failures = 0
+        self.healthy = True
+
+    def record(self, latency: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def score(self) -> float:
+        """分数越低越优先：中位延迟按错误率放大，无样本时视为 1 秒"""
+        p50 = self.percentile(0.5)
+        return (p50 if p50 is not None else 1.0) * (1 + 4 * self.error_rate)
+
+
+class HedgedRouter:
+    """多接口地址的健康评分路由与对冲请求
+
+    请求先发往评分最优的地址，超过该地址 p95 延迟仍未返回时向次优地址补发一次，
+    谁先成功用谁，另一个请求随即取消。连续失败的地址移出轮换，
+    由后台探测在恢复后重新加入。
+    """
+    def __init__(self, hedge_min: float = 0.3, hedge_max: float = 3.0, fail_threshold: int = 3, probe_interval: float = 60):
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        self.fail_threshold = fail_threshold
+        self.probe_interval = probe_interval
+        self.endpoints = {}
+        self._probe = None
+        self._probe_task = None
+
+    def set_endpoints(self, endpoints):
+        self.endpoints = {e: self.endpoints.get(e) or EndpointHealth() for e in endpoints}
+
+    def ranked(self) -> list:
+        """健康地址按评分排序；全部不健康时退回全部地址，保证仍有请求可发"""
+        healthy = [e for e, h in self.endpoints.items() if h.healthy]
+        candidates = healthy or list(self.endpoints)
+        return sorted(candidates, key=lambda e: self.endpoints[e].score())
+
+    def hedge_delay(self, endpoint) -> float:
+        p95 = self.endpoints[endpoint].percentile(0.95)
+        if p95 is None:
+            return self.hedge_max
+        return min(self.hedge_max, max(self.hedge_min, p95))
+
+    def _record(self, endpoint, latency: float, ok: bool):
+        health = self.endpoints.get(endpoint)
+        if health is None:
+            return
+        health.record(latency, ok)
+        if health.healthy and health.consecutive_failures >= self.fail_threshold:
+            health.healthy = False
+            logger.warning(f"[路由] {endpoint} 连续失败 {health.consecutive_failures} 次，暂时移出轮换")
+
+    async def _attempt(self, endpoint, send):
+        start = time.monotonic()
+        try:
+            result = await send(endpoint)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 指令预算耗尽与地址本身的健康无关，不计入失败
+        except Exception as e:
+            self._record(endpoint, time.monotonic() - start, False)
+            logger.warning(f"[路由] 请求异常 {endpoint}: {e}")
+            return None
+        self._record(endpoint, time.monotonic() - start, result is not None)
+        return result
+
+    async def fetch(self, send):
+        """按路由策略执行 send(endpoint)，返回第一个非 None 结果
+
+        Args:
+            send: 接收地址、返回协程的函数；返回 None 或抛出异常均视为失败
+        """
+        remaining = self.ranked()
+        if not remaining:
+            return None
+        self._ensure_probe()
+
+        pending = set()
+
+        def launch():
+            endpoint = remaining.pop(0)
+            pending.add(asyncio.ensure_future(self._attempt(endpoint, send)))
+            # 仍有备用地址时，超过该地址的 p95 延迟即补发对冲请求
+            return self.hedge_delay(endpoint) if remaining else None
+
+        try:
+            delay = launch()
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        return result
+                if not remaining:
+                    delay = None
+                elif not done:
+                    logger.debug(f"[路由] 超过 {delay:.2f}s 未返回，向 {remaining[0]} 发起对冲请求")
+                    launch()
+                    delay = None  # 同时最多两个请求在途
+                elif not pending:
+                    delay = launch()  # 均已失败，换下一个地址
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def set_probe(self, probe):
+        """注册健康探测函数 probe(endpoint) -> bool，首次请求时启动后台探测"""
+        self._probe = probe
+
+    def _ensure_probe(self):
+        if self._probe is not None and (self._probe_task is None or self._probe_task.done()):
+            # 在空白上下文中启动：探测任务长期运行，不能继承触发它的那条指令的预算
+            self._probe_task = contextvars.Context().run(asyncio.ensure_future, self._probe_loop())
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            for endpoint, health in list(self.endpoints.items()):
+                if health.healthy:
+                    continue
+                start = time.monotonic()
+                try:
+                    ok = await self._probe(endpoint)
+                except Exception:
+                    ok = False
+                if ok:
+                    health.healthy = True
+                    health.consecutive_failures = 0
+                    health.record(time.monotonic() - start, True)
+                    logger.info(f"[路由] {endpoint} 探测恢复，重新加入轮换")
+
+    async def close(self):
+        if self._probe_task and not self._probe_task.done():
+            self._probe_task.cancel()
+        self._probe_task = None
+
+    def stats(self) -> dict:
+        return {
+            e: {
+                "healthy": h.healthy,
+                "p50": h.percentile(0.5),
+                "p95": h.percentile(0.95),
+                "error_rate": h.error_rate,
+            }
+            for e, h in self.endpoints.items()
+        }
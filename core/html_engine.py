@@ -0,0 +1,105 @@
+from lxml import html
+from lxml.cssselect import CSSSelector
+
+# get_text 时跳过这些标签内的文本（与 BeautifulSoup 一致）
+_SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+
+def compile_selectors(selectors: dict) -> dict:
+    """预编译一组 CSS 选择器（在模块加载时调用一次）
+
+    Args:
+        selectors: 名称 -> CSS 选择器字符串
+
+    Returns:
+        dict: 名称 -> CSSSelector
+    """
+    return {name: CSSSelector(expr) for name, expr in selectors.items()}
+
+
+def parse(content: str):
+    """解析 HTML 文本，返回根节点；空文档返回空的 <html> 节点"""
+    if not content or not content.strip():
+        return html.Element("html")
+    try:
+        return html.fromstring(content)
+    except ValueError:
+        # 带编码声明的 XML 头不能以 str 形式解析
+        return html.fromstring(content.encode("utf-8"))
+
+
+def select(node, selector) -> list:
+    """返回 node 的后代中匹配选择器的节点（不含 node 本身，与 bs4 的 select 一致）"""
+    return [e for e in selector(node) if e is not node]
+
+
+def select_one(node, selector):
+    for e in selector(node):
+        if e is not node:
+            return e
+    return None
+
+
+def _iter_strings(node, recursive=True):
+    if node.text:
+        yield node.text
+    for child in node:
+        if isinstance(child.tag, str) and recursive and child.tag not in _SKIP_TEXT_TAGS:
+            yield from _iter_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def get_text(node, separator: str = "", strip: bool = False, recursive: bool = True) -> str:
+    """提取节点文本，行为对齐 BeautifulSoup 的 get_text
+
+    Args:
+        separator: 各文本片段之间的分隔符
+        strip: 是否去掉每个片段首尾空白并丢弃空片段
+        recursive: 为 False 时只取节点自身的文本（不含子标签内的文本）
+    """
+    parts = []
+    for text in _iter_strings(node, recursive):
+        if strip:
+            text = text.strip()
+            if not text:
+                continue
+        parts.append(text)
+    return separator.join(parts)
+
+
+def _benchmark(path: str, selectors, encoding: str = "utf-8", rounds: int = 50):
+    """对比 BeautifulSoup(html.parser) 与本引擎在同一页面上的解析+选择耗时，并校验文本一致"""
+    import time
+    from bs4 import BeautifulSoup
+
+    with open(path, "rb") as f:
+        content = f.read().decode(encoding, errors="ignore")
+    compiled = compile_selectors({s: s for s in selectors})
+
+    def old():
+        soup = BeautifulSoup(content, "html.parser")
+        return [[t.get_text(strip=True) for t in soup.select(s)] for s in selectors]
+
+    def new():
+        root = parse(content)
+        return [[get_text(t, strip=True) for t in select(root, compiled[s])] for s in selectors]
+
+    if old() != new():
+        print(f"{path}: 文本不一致")
+    for name, func in (("bs4/html.parser", old), ("lxml/cssselect", new)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        print(f"{path} {name}: {(time.perf_counter() - start) / rounds * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HTML 解析引擎基准")
+    parser.add_argument("page", help="页面文件")
+    parser.add_argument("selectors", nargs="+", help="CSS 选择器")
+    parser.add_argument("--encoding", default="utf-8", help="页面编码，飞卢页面用 gb18030")
+    args = parser.parse_args()
+    _benchmark(args.page, args.selectors, args.encoding)
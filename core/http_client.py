@@ -0,0 +1,201 @@
+import asyncio
+import json
+import time
+import aiohttp
+from yarl import URL
+from astrbot.api import logger
+from .deadline import DeadlineExceeded, current_deadline
+from .replay import REPLAY_METHOD_HEADER, REPLAY_URL_HEADER
+from .response_cache import ResponseCache
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class HttpResponse:
+    """已完整读取的响应，连接归还连接池后仍可安全使用"""
+    __slots__ = ("url", "status", "headers", "body", "charset", "from_cache")
+
+    def __init__(self, url, status, headers, body, charset=None, from_cache=False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+        self.from_cache = from_cache
+
+    def text(self, encoding=None, errors="replace"):
+        return self.body.decode(encoding or self.charset or "utf-8", errors=errors)
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """插件级共享 HTTP 客户端
+
+    所有数据源共用一个按主机保活的连接池，避免每次请求都重新建立连接、
+    解析 DNS 和 TLS 握手；配置了 rate_limiter 时，每个请求先按站点排队限流；
+    配置了 response_cache 时，带 cache_ttl 的 GET 请求走磁盘缓存与条件请求；
+    配置了 recorder 时，真实响应会录制为夹具；配置了 replay_url 时，
+    请求改发到本地 mock 上游（见 core/replay.py），用于离线调试与压测。
+    """
+    def __init__(self, limit: int = 64, limit_per_host: int = 8, dns_ttl: int = 300, keepalive_timeout: int = 30,
+                 rate_limiter=None, response_cache=None, recorder=None, replay_url: str = None):
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.recorder = recorder
+        self.replay_url = URL(replay_url) if replay_url else None
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.limit,
+                        limit_per_host=self.limit_per_host,
+                        use_dns_cache=True,
+                        ttl_dns_cache=self.dns_ttl,
+                        keepalive_timeout=self.keepalive_timeout,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        headers={"User-Agent": DEFAULT_USER_AGENT},
+                    )
+        return self._session
+
+    async def request(self, method: str, url, headers=None, params=None, timeout: float = 10, encoded: bool = False,
+                      cache_ttl: float = None) -> HttpResponse:
+        """发送请求并完整读取响应体
+
+        Args:
+            method: 请求方法
+            url: 请求地址（str 或 yarl.URL）
+            headers: 本次请求附加的请求头
+            params: 查询参数
+            timeout: 总超时（秒）
+            encoded: 为 True 时不对 URL 做二次编码（用于已签名的地址）
+            cache_ttl: 缓存新鲜期（秒），为 None 时不使用响应缓存
+
+        Returns:
+            HttpResponse: 响应对象；网络异常与超时直接抛出，
+            当前指令预算用尽时抛出 DeadlineExceeded
+        """
+        if not isinstance(url, URL):
+            url = URL(url, encoded=encoded)
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() < timeout:
+            # 子请求只能使用指令剩余的时间（含限流排队）
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            try:
+                return await asyncio.wait_for(
+                    self._dispatch(method, url, headers, params, remaining, cache_ttl), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded() from None
+        return await self._dispatch(method, url, headers, params, timeout, cache_ttl)
+
+    async def _dispatch(self, method, url, headers, params, timeout, cache_ttl) -> HttpResponse:
+        if cache_ttl is not None and method == "GET" and self.response_cache is not None:
+            return await self._cached_get(url, headers, params, timeout, cache_ttl)
+        return await self._limited_send(method, url, headers, params, timeout)
+
+    async def _cached_get(self, url, headers, params, timeout, cache_ttl) -> HttpResponse:
+        cache = self.response_cache
+        key = cache.make_key(cache.normalize_url(url, params))
+        entry = cache.get(key)
+        if entry is not None:
+            meta, body = entry
+            cached = HttpResponse(meta["url"], meta["status"], meta["headers"], body, meta.get("charset"), from_cache=True)
+            if time.time() - meta["fetched_at"] < cache_ttl:
+                cache.hits += 1
+                return cached
+            # 已过期：带上校验信息发起条件请求
+            headers = dict(headers or {})
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = await self._limited_send("GET", url, headers, params, timeout)
+        if resp.status == 304 and entry is not None:
+            cache.revalidated += 1
+            cache.refresh(key, meta)
+            return cached
+        cache.misses += 1
+        if resp.status == 200:
+            cache.put(key, resp.url, resp.status, resp.headers, resp.body, resp.charset)
+        return resp
+
+    async def _limited_send(self, method, url, headers, params, timeout) -> HttpResponse:
+        if self.rate_limiter is None:
+            return await self._send(method, url, headers, params, timeout)
+        async with self.rate_limiter.acquire(url.host):
+            return await self._send(method, url, headers, params, timeout)
+
+    async def _send(self, method, url, headers, params, timeout) -> HttpResponse:
+        session = await self.get_session()
+        target = url
+        if self.replay_url is not None or self.recorder is not None:
+            normalized = ResponseCache.normalize_url(url, params)
+        if self.replay_url is not None:
+            # 原始地址（含查询参数）交给 mock 上游匹配夹具
+            headers = dict(headers or {})
+            headers[REPLAY_URL_HEADER] = normalized
+            headers[REPLAY_METHOD_HEADER] = method
+            target, params = self.replay_url, None
+        async with session.request(method, target, headers=headers, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            body = await resp.read()
+            try:
+                charset = resp.get_encoding()
+            except Exception:
+                charset = None
+            resp_url = normalized if self.replay_url is not None else str(resp.url)
+            result = HttpResponse(resp_url, resp.status, dict(resp.headers), body, charset)
+        if self.recorder is not None and self.replay_url is None and result.status != 304:
+            # 304 依赖本地缓存状态，不适合作为夹具
+            self.recorder.record(method, normalized, result.status, result.headers, result.body, result.charset)
+        return result
+
+    async def get(self, url, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.debug("[HTTP] 共享连接池已关闭")
+        self._session = None
+
+    def bind(self, breaker) -> "SourceHttpClient":
+        return SourceHttpClient(self, breaker)
+
+
+class SourceHttpClient:
+    """绑定到单个数据源的客户端视图，请求结果回报给该数据源的熔断器"""
+    def __init__(self, client: HttpClient, breaker):
+        self.client = client
+        self.breaker = breaker
+
+    async def request(self, method: str, url, **kwargs) -> HttpResponse:
+        try:
+            resp = await self.client.request(method, url, **kwargs)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if resp.status >= 500:
+            self.breaker.record_failure()
+        elif not resp.from_cache:
+            self.breaker.record_success()
+        return resp
+
+    async def get(self, url, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from astrbot.api import logger
+
+# 详情展示用到的字段；其余字段不落盘
+DETAIL_FIELDS = (
+    "name", "author", "origin", "bid", "url", "cover", "intro", "category", "tags",
+    "status", "word_count", "total_chapters", "rating", "rating_users", "rank",
+    "collection", "all_recommend", "total_click",
+    "reward_coin", "reward_flower", "reward_ticket", "reward_review",
+    "last_update", "last_chapter", "first_chapter_title", "first_chapter_content",
+)
+# 随连载变化的字段，有效期较短；其余字段（书名、作者、简介、封面等）视为静态
+VOLATILE_FIELDS = frozenset((
+    "status", "word_count", "total_chapters", "rating", "rating_users", "rank",
+    "collection", "all_recommend", "total_click",
+    "reward_coin", "reward_flower", "reward_ticket", "reward_review",
+    "last_update", "last_chapter",
+))
+# 试读章节：内容基本不变，但缺失时可能只是当次请求跳过了试读，按易变字段处理
+TRIAL_FIELDS = ("first_chapter_title", "first_chapter_content")
+
+
+class MetadataStore:
+    """持久化的书籍详情（SQLite，WAL 模式），插件重启后仍可直接使用
+
+    以 (平台, bid) 为键保存详情展示所需的字段与抓取时间，同时按详情链接建立索引。
+    每个字段有各自的有效期：只有记录中所有字段都未过期时才视为新鲜，
+    可以跳过网络请求；没有试读章节的记录按易变字段的有效期处理，以便尽快补全。
+    过期记录仍保留，上游不可用时用作兜底。
+    put() 可在后台线程中调用，与事件循环上的读取共用同一连接，由内部锁串行化。
+
+    Args:
+        path: 数据库文件路径
+        static_ttl: 静态字段的有效期（秒），同时是记录的最长保留时间
+        volatile_ttl: 易变字段的有效期（秒）
+        trial_ttl: 试读章节的有效期（秒）
+        field_ttls: 字段 -> 有效期（秒），覆盖上面几项
+    """
+    def __init__(self, path: str, static_ttl: float = 7 * 86400, volatile_ttl: float = 1800, trial_ttl: float = 86400,
+                 field_ttls: dict = None):
+        self.static_ttl = static_ttl
+        self.volatile_ttl = volatile_ttl
+        self.trial_ttl = trial_ttl
+        self.field_ttls = dict(field_ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0    # 字段过期、需要重新请求的次数
+        self.served_stale = 0  # 上游不可用时展示过期记录的次数
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS book_meta ("
+            "origin TEXT NOT NULL, bid TEXT NOT NULL, url TEXT NOT NULL, "
+            "data TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (origin, bid))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS book_meta_url ON book_meta (origin, url)")
+        self._conn.execute("DELETE FROM book_meta WHERE fetched_at < ?", (time.time() - static_ttl,))
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, data_dir: str, **kwargs):
+        """在插件数据目录中打开数据库；失败时返回 None（不影响插件其余功能）"""
+        try:
+            return cls(os.path.join(data_dir, "metadata.db"), **kwargs)
+        except sqlite3.Error as e:
+            logger.warning(f"[详情库] 打开失败，不再持久化详情: {e}")
+            return None
+
+    def ttl_for(self, field: str) -> float:
+        if field in self.field_ttls:
+            return self.field_ttls[field]
+        if field in TRIAL_FIELDS:
+            return self.trial_ttl
+        return self.volatile_ttl if field in VOLATILE_FIELDS else self.static_ttl
+
+    def is_fresh(self, details: dict, age: float) -> bool:
+        """记录中出现的每个字段都在各自的有效期内；缺少试读章节时按易变字段的有效期"""
+        if not details.get("first_chapter_title") and age > self.volatile_ttl:
+            return False
+        return all(age <= self.ttl_for(field) for field, value in details.items() if value not in (None, ""))
+
+    def _load(self, origin: str, url: str):
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT data, fetched_at FROM book_meta WHERE origin = ? AND url = ? ORDER BY fetched_at DESC LIMIT 1",
+                    (origin, url),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"[详情库] 读取失败 {url}: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get(self, origin: str, url: str):
+        """返回新鲜的详情；不存在或有字段过期时返回 None"""
+        loaded = self._load(origin, url)
+        if loaded is None:
+            self.misses += 1
+            return None
+        details, fetched_at = loaded
+        if not self.is_fresh(details, time.time() - fetched_at):
+            self.stale += 1
+            return None
+        self.hits += 1
+        return details
+
+    def get_stale(self, origin: str, url: str):
+        """返回 (详情, 抓取时间)，不论是否过期；用于上游不可用时兜底"""
+        loaded = self._load(origin, url)
+        if loaded is not None:
+            self.served_stale += 1
+        return loaded
+
+    def put(self, origin: str, url: str, details: dict):
+        data = {k: details.get(k) for k in DETAIL_FIELDS if details.get(k) is not None}
+        data.setdefault("origin", origin)
+        data.setdefault("url", url)
+        bid = str(details.get("bid") or url)
+        try:
+            with self._lock:
+                # 同一链接下以其他键保存的旧记录（例如缺少 bid 时按链接保存）一并替换
+                self._conn.execute("DELETE FROM book_meta WHERE origin = ? AND url = ? AND bid != ?", (origin, url, bid))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO book_meta (origin, bid, url, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (origin, bid, url, json.dumps(data, ensure_ascii=False, default=str), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[详情库] 写入失败 {url}: {e}")
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                rows = self._conn.execute("SELECT COUNT(*) FROM book_meta").fetchone()[0]
+        except sqlite3.Error:
+            rows = 0
+        return {
+            "rows": rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "served_stale": self.served_stale,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from astrbot.api import logger
+from .deadline import current_deadline
+
+
+class Offloader:
+    """把 CPU 密集的解析/解密任务交给工作池，避免阻塞事件循环
+
+    小于 inline_threshold 字节的输入直接在事件循环上执行（调度开销反而更大），
+    其余提交到线程池或进程池。进程池模式下 func 必须是模块级函数，参数与返回值可被 pickle。
+    每次在事件循环上同步执行的耗时按指令累计，可通过 stats() 查看。
+
+    Args:
+        mode: "thread"、"process" 或 "inline"（全部在事件循环上执行，仅统计）
+        workers: 工作池大小
+        inline_threshold: 直接执行的输入大小上限（字节）
+    """
+    MODES = ("thread", "process", "inline")
+
+    def __init__(self, mode: str = "thread", workers: int = 2, inline_threshold: int = 32 * 1024):
+        if mode not in self.MODES:
+            logger.warning(f"[工作池] 未知模式 {mode}，改用线程池")
+            mode = "thread"
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.inline_threshold = inline_threshold
+        self._executor = None
+        self._io_executor = None
+        self.commands = {}  # 指令名 -> 阻塞统计
+
+    def _get_executor(self):
+        if self._executor is None and self.mode != "inline":
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webnovel-parse")
+        return self._executor
+
+    async def run(self, func, *args, size: int = 0):
+        """执行 func(*args)；size 为输入大小（字节），决定是否卸载到工作池"""
+        executor = self._get_executor() if size >= self.inline_threshold else None
+        start = time.perf_counter()
+        if executor is None:
+            try:
+                return func(*args)
+            finally:
+                self._record(time.perf_counter() - start, inline=True)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+        finally:
+            self._record(time.perf_counter() - start, inline=False)
+
+    async def run_io(self, func, *args):
+        """在后台线程中执行阻塞 I/O（如数据库写入），与 mode 无关，按提交顺序逐个执行"""
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webnovel-io")
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, partial(func, *args))
+
+    def _record(self, elapsed: float, inline: bool):
+        deadline = current_deadline()
+        command = (deadline.command if deadline is not None else None) or "-"
+        st = self.commands.setdefault(command, {
+            "inline": 0, "offloaded": 0, "blocked": 0.0, "max_blocked": 0.0, "max_command_blocked": 0.0,
+            "offloaded_time": 0.0,
+        })
+        if not inline:
+            st["offloaded"] += 1
+            st["offloaded_time"] += elapsed
+            return
+        st["inline"] += 1
+        st["blocked"] += elapsed
+        st["max_blocked"] = max(st["max_blocked"], elapsed)
+        if deadline is not None:
+            deadline = deadline.root
+            deadline.blocked += elapsed
+            st["max_command_blocked"] = max(st["max_command_blocked"], deadline.blocked)
+
+    def stats(self) -> dict:
+        """各指令的事件循环阻塞统计（秒）"""
+        return {command: dict(st) for command, st in self.commands.items()}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._io_executor is not None:
+            # 等待已提交的写入完成，之后才能关闭数据库
+            self._io_executor.shutdown(wait=True)
+            self._io_executor = None
@@ -0,0 +1,101 @@
+import asyncio
+from functools import partial
+
+
+class PageFeed:
+    """后台并发拉取的后续分页，按页码顺序交付
+
+    创建时立即并发请求全部页码，fetch(page) 返回 (records, is_last)。
+    某页为最后一页（或请求失败）时，取消其后仍在进行的请求。
+    多个调用方可以同时迭代同一个 PageFeed，单个调用方取消不影响其他人；
+    通过 hold() 登记的调用方全部 release() 后，取消仍在进行的请求。
+    """
+    def __init__(self, fetch, pages):
+        self.pages = list(pages)
+        self.last_page = None  # 已确定的最后一个有效页码
+        self.failed = False    # 是否有分页请求失败（结果不完整）
+        self._tasks = {}
+        self._holders = 0
+        for page in self.pages:
+            task = asyncio.ensure_future(fetch(page))
+            task.add_done_callback(partial(self._on_done, page))
+            self._tasks[page] = task
+
+    def _on_done(self, page, task):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.failed = True
+            self._stop(page - 1)
+            return
+        records, is_last = task.result()
+        if not records:
+            self._stop(page - 1)
+        elif is_last:
+            self._stop(page)
+
+    def _stop(self, page):
+        if self.last_page is not None and self.last_page <= page:
+            return
+        self.last_page = page
+        for p, task in self._tasks.items():
+            if p > page and not task.done():
+                task.cancel()
+
+    @property
+    def done(self) -> bool:
+        return all(task.done() for task in self._tasks.values())
+
+    @property
+    def complete(self) -> bool:
+        """全部有效分页均已成功拉取（未失败、未被取消）"""
+        if self.failed:
+            return False
+        for page, task in self._tasks.items():
+            if self.last_page is not None and page > self.last_page:
+                continue
+            if not task.done() or task.cancelled():
+                return False
+        return True
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        """按页码顺序产出 (page, records)，遇到最后一页或失败页即结束"""
+        for page in self.pages:
+            if self.last_page is not None and page > self.last_page:
+                return
+            task = self._tasks[page]
+            try:
+                records, _ = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if task.cancelled():
+                    return
+                raise
+            except Exception:
+                return
+            if not records:
+                return
+            yield page, records
+
+    async def wait(self) -> list:
+        """等待全部分页，返回按页码顺序合并的结果"""
+        records = []
+        async for _, page_records in self:
+            records.extend(page_records)
+        return records
+
+    def hold(self):
+        """登记一个需要后续分页的调用方"""
+        self._holders += 1
+
+    def release(self):
+        """调用方不再需要后续分页；最后一个调用方放弃时停止拉取"""
+        self._holders -= 1
+        if self._holders <= 0:
+            self.cancel()
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
@@ -0,0 +1,70 @@
+import asyncio
+from astrbot.api import logger
+
+
+class Prefetcher:
+    """后台预取下一页搜索结果与排名靠前书籍的详情
+
+    展示第 N 页后提前拉取第 N+1 页，用户翻页时直接命中页码缓存；
+    详情预取只在上游站点有富余配额时进行（由调用方判断），统计在 detail_* 中。
+    全局同时进行的预取数不超过 budget，超出时直接放弃本次预取（不排队），
+    避免预取挤占正常指令的上游配额。
+
+    Args:
+        budget: 同时进行的预取上限，0 表示关闭
+        enabled: 数据源 -> 是否预取；未列出的数据源默认开启
+    """
+    def __init__(self, budget: int = 4, enabled: dict = None):
+        self.budget = max(0, budget)
+        self.enabled = dict(enabled or {})
+        self._tasks = set()
+        self.scheduled = 0      # 发起的预取
+        self.skipped = 0        # 超出预算放弃的预取
+        self.fetched = 0        # 成功放入页码缓存的页数
+        self.used = 0           # 被用户翻页实际使用的页数
+        self.wasted = 0         # 新搜索开始时仍未使用而被丢弃的页数
+        self.detail_fetched = 0  # 预取的详情数
+        self.detail_used = 0     # 被用户查看的预取详情数
+        self.detail_busy = 0     # 站点繁忙而放弃的详情预取
+
+    def is_enabled(self, source_name: str) -> bool:
+        return self.budget > 0 and self.enabled.get(source_name, True)
+
+    def schedule(self, source_name: str, factory):
+        """在预算内启动 factory() 返回的协程，返回任务；未启动时返回 None"""
+        if not self.is_enabled(source_name):
+            return None
+        if len(self._tasks) >= self.budget:
+            self.skipped += 1
+            return None
+        task = asyncio.ensure_future(self._run(factory()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.scheduled += 1
+        return task
+
+    @staticmethod
+    async def _run(coro):
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"[预取] 失败: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._tasks),
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "fetched": self.fetched,
+            "used": self.used,
+            "wasted": self.wasted,
+            "detail_fetched": self.detail_fetched,
+            "detail_used": self.detail_used,
+            "detail_busy": self.detail_busy,
+        }
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,67 @@
+import time
+
+
+class RankTrace:
+    """单次聚合搜索的打分/排序追踪
+
+    仅在用户显式开启（/ss --trace）时创建；未开启时各处传入 None，
+    打分与排序路径上不做任何格式化或记录。
+
+    Args:
+        keyword: 搜索关键词
+        max_records: 最多保留的逐本打分记录数
+    """
+    def __init__(self, keyword: str, max_records: int = 500):
+        self.keyword = keyword
+        self.max_records = max_records
+        self.created = time.time()
+        self.scores = []   # (来源, 书名, 书名分, 作者分, 权重, 最终得分)
+        self.sifts = []    # (池大小, 平均分阈值, 入选数)
+        self.batches = []  # 每批排序后的 [(来源, 书名, 得分)]
+        self.dropped = 0
+
+    def add_score(self, book: dict, name_score: float, author_score: float, weight: float, final_score: float):
+        if len(self.scores) >= self.max_records:
+            self.dropped += 1
+            return
+        self.scores.append((book.get('origin', 'unknown'), book.get('name', ''),
+                            name_score, author_score, weight, final_score))
+
+    def add_sift(self, pool_size: int, threshold: float, sifted: int):
+        self.sifts.append((pool_size, threshold, sifted))
+
+    def add_order(self, books: list):
+        self.batches.append([(b.get('origin', 'unknown'), b.get('name', ''), b.get('final_score', 0)) for b in books])
+
+    def format(self, limit: int = 20) -> str:
+        """生成可读的追踪报告；逐本记录按得分降序只列出前 limit 条"""
+        lines = [f"🧮 打分追踪：“{self.keyword}”（{time.strftime('%H:%M:%S', time.localtime(self.created))}）"]
+        lines.append(f"已打分 {len(self.scores) + self.dropped} 本，筛选 {len(self.sifts)} 次，排序 {len(self.batches)} 批")
+
+        if self.scores:
+            lines.append("\n【得分明细】来源 | 书名 | 书名分 / 作者分 × 权重 = 得分")
+            top = sorted(self.scores, key=lambda r: r[5], reverse=True)[:limit]
+            for origin, name, name_score, author_score, weight, final_score in top:
+                lines.append(f"{origin} | 《{name}》 | {name_score:.1f} / {author_score} × {weight} = {final_score:.1f}")
+            if len(self.scores) > limit:
+                lines.append(f"... 其余 {len(self.scores) - limit} 条未列出")
+        if self.dropped:
+            lines.append(f"（超过 {self.max_records} 条的记录未保存）")
+
+        if self.sifts:
+            lines.append("\n【筛选】")
+            for i, (pool_size, threshold, sifted) in enumerate(self.sifts, 1):
+                lines.append(f"{i}. 池 {pool_size} 本 | 阈值 {threshold:.2f} | 入选 {sifted} 本")
+
+        if self.batches:
+            lines.append("\n【排序】")
+            rank = 0
+            for i, batch in enumerate(self.batches, 1):
+                lines.append(f"第 {i} 批（{len(batch)} 本）:")
+                for origin, name, score in batch[:limit]:
+                    rank += 1
+                    lines.append(f"  {rank}. 《{name}》({origin}) - {score:.1f}")
+                if len(batch) > limit:
+                    rank += len(batch) - limit
+                    lines.append(f"  ... 本批其余 {len(batch) - limit} 本")
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from astrbot.api import logger
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量"""
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.01)
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        """当前可用令牌数"""
+        self._refill()
+        return self.tokens
+
+    async def take(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimit:
+    """单个站点的限流状态（令牌桶 + 最大并发）及排队统计"""
+    def __init__(self, rate: float, burst: int, max_inflight: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_inflight = max(max_inflight, 1)
+        self.semaphore = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class RateLimiter:
+    """按上游站点统一限流，所有数据源的请求都经过这里"""
+    DEFAULT_LIMIT = (5.0, 10, 4)  # 每秒令牌数, 突发容量, 最大并发
+
+    def __init__(self, limits: dict = None, default=None):
+        self.limits = limits or {}
+        self.default = default or self.DEFAULT_LIMIT
+        self.hosts = {}
+
+    @staticmethod
+    def parse_config(entries) -> dict:
+        """解析配置项，每行格式为 `站点 每秒请求数 突发容量 最大并发`
+
+        站点写作 `default` 时作为未单独配置站点的默认值。
+        """
+        limits = {}
+        for entry in entries or []:
+            parts = str(entry).split()
+            if len(parts) != 4:
+                logger.warning(f"[限流] 忽略无效配置: {entry}")
+                continue
+            try:
+                limits[parts[0].lower()] = (float(parts[1]), int(parts[2]), int(parts[3]))
+            except ValueError:
+                logger.warning(f"[限流] 忽略无效配置: {entry}")
+        return limits
+
+    @classmethod
+    def from_config(cls, entries):
+        limits = cls.parse_config(entries)
+        default = limits.pop("default", None)
+        return cls(limits, default)
+
+    def _get(self, host: str) -> HostLimit:
+        host = (host or "").lower()
+        limit = self.hosts.get(host)
+        if limit is None:
+            limit = HostLimit(*self.limits.get(host, self.default))
+            self.hosts[host] = limit
+        return limit
+
+    @asynccontextmanager
+    async def acquire(self, host: str):
+        limit = self._get(host)
+        start = time.monotonic()
+        limit.waiting += 1
+        try:
+            await limit.semaphore.acquire()
+        finally:
+            limit.waiting -= 1
+        try:
+            await limit.bucket.take()
+            wait = time.monotonic() - start
+            limit.record_wait(wait)
+            if wait > 1:
+                logger.debug(f"[限流] {host} 排队 {wait:.2f}s")
+            limit.inflight += 1
+            try:
+                yield
+            finally:
+                limit.inflight -= 1
+        finally:
+            limit.semaphore.release()
+
+    def has_spare(self, host: str) -> bool:
+        """站点是否有富余配额：无排队、并发未过半且令牌充足，供低优先级的预取判断"""
+        limit = self._get(host)
+        return (limit.waiting == 0
+                and limit.inflight < max(1, limit.max_inflight // 2)
+                and limit.bucket.available() >= 2)
+
+    def stats(self) -> dict:
+        """各站点的排队耗时统计"""
+        result = {}
+        for host, limit in self.hosts.items():
+            result[host] = {
+                "requests": limit.requests,
+                "avg_wait": limit.total_wait / limit.requests if limit.requests else 0.0,
+                "max_wait": limit.max_wait,
+                "inflight": limit.inflight,
+                "waiting": limit.waiting,
+            }
+        return result
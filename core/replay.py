@@ -0,0 +1,185 @@
+"""上游响应录制与本地回放
+
+录制：HttpClient 配置 recorder 后，每个真实响应（状态码、响应头、原始字节）
+按 `方法 + 规范化 URL` 存成一个 JSON 夹具，响应体以 base64 保存，
+因此 GB18030 编码的飞卢页面、七猫加密章节等都能原样回放。
+
+回放：HttpClient 配置 replay_url 后，所有请求改发到本地 mock 服务，
+原始地址放在 X-Replay-Url 请求头中，由 MockUpstream 按夹具返回，
+并可模拟延迟、错误与限流，用于在无网络环境下压测与基准测试。
+
+本模块可独立运行（不依赖 AstrBot）：
+
+    python core/replay.py --fixtures ./fixtures --port 8765 --latency 0.05 --error-rate 0.02 --rps 20
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+try:
+    from astrbot.api import logger
+except ImportError:
+    logger = logging.getLogger("webnovel_replay")
+
+REPLAY_URL_HEADER = "X-Replay-Url"
+REPLAY_METHOD_HEADER = "X-Replay-Method"
+
+
+class FixtureStore:
+    """夹具目录，每个响应一个 JSON 文件"""
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = fixture_dir
+        if not os.path.exists(fixture_dir):
+            os.makedirs(fixture_dir)
+
+    @staticmethod
+    def key(method: str, normalized_url: str) -> str:
+        return hashlib.sha1(f"{method.upper()} {normalized_url}".encode("utf-8")).hexdigest()
+
+    def _path(self, method, normalized_url):
+        return os.path.join(self.fixture_dir, f"{self.key(method, normalized_url)}.json")
+
+    def save(self, method: str, normalized_url: str, status: int, headers: dict, body: bytes, charset=None):
+        fixture = {
+            "method": method.upper(),
+            "url": normalized_url,
+            "status": status,
+            "headers": headers,
+            "charset": charset,
+            "body_b64": base64.b64encode(body).decode("ascii"),
+            "recorded_at": time.time(),
+        }
+        with open(self._path(method, normalized_url), "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+
+    def load(self, method: str, normalized_url: str):
+        path = self._path(method, normalized_url)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixture["body"] = base64.b64decode(fixture.pop("body_b64"))
+        return fixture
+
+
+class Recorder:
+    """把真实响应写入夹具目录"""
+    def __init__(self, store: FixtureStore):
+        self.store = store
+        self.recorded = 0
+
+    def record(self, method: str, normalized_url: str, status: int, headers: dict, body: bytes, charset=None):
+        try:
+            self.store.save(method, normalized_url, status, headers, body, charset)
+            self.recorded += 1
+        except Exception as e:
+            logger.warning(f"[录制] 保存夹具失败 {normalized_url}: {e}")
+
+
+class MockUpstream:
+    """按夹具回放的本地上游服务
+
+    Args:
+        store: 夹具目录
+        latency: 每个响应的固定延迟（秒）
+        jitter: 额外随机延迟上限（秒）
+        error_rate: 以 503 响应的概率
+        rps: 每秒允许的请求数，超出返回 429；None 表示不限流
+        seed: 随机种子，保证压测可复现
+    """
+    # 回放时去掉的响应头，由 aiohttp 重新生成
+    HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection"}
+
+    def __init__(self, store: FixtureStore, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rps: float = None, seed: int = None):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rps = rps
+        self.random = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.served = 0
+        self.missing = 0
+        self.throttled = 0
+
+    def _throttle(self) -> bool:
+        if not self.rps:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.rps
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        if self._throttle():
+            self.throttled += 1
+            return web.Response(status=429, text="throttled")
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.Response(status=503, text="injected error")
+
+        method = request.headers.get(REPLAY_METHOD_HEADER, request.method)
+        url = request.headers.get(REPLAY_URL_HEADER, str(request.url))
+        fixture = self.store.load(method, url)
+        if fixture is None:
+            self.missing += 1
+            logger.warning(f"[回放] 无夹具: {method} {url}")
+            return web.Response(status=404, text="no fixture")
+
+        self.served += 1
+        headers = {k: v for k, v in fixture["headers"].items() if k.lower() not in self.HOP_HEADERS}
+        return web.Response(status=fixture["status"], body=fixture["body"], headers=headers)
+
+    def make_app(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        """在当前事件循环中启动服务，返回 runner（调用 runner.cleanup() 停止）"""
+        from aiohttp import web
+
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"[回放] mock 上游已启动: http://{host}:{port}")
+        return runner
+
+
+def main():
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="网文搜索助手 - 本地 mock 上游")
+    parser.add_argument("--fixtures", required=True, help="夹具目录")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入 503 的概率")
+    parser.add_argument("--rps", type=float, default=None, help="每秒请求上限，超出返回 429")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mock = MockUpstream(FixtureStore(args.fixtures), args.latency, args.jitter, args.error_rate, args.rps, args.seed)
+    web.run_app(mock.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
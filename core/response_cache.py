@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from yarl import URL
+from astrbot.api import logger
+
+
+class ResponseCache:
+    """磁盘 HTTP 响应缓存
+
+    以规范化后的 URL 为键，保存响应体、响应头、ETag/Last-Modified 与抓取时间，
+    过期后由 HttpClient 发起条件请求重新验证；总大小超限时按 LRU 淘汰。
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.index = self._load_index()  # key -> 占用字节数，按最近访问排序
+        self.total_bytes = sum(self.index.values())
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_url(url, params=None) -> str:
+        """规范化 URL：去掉片段、查询参数排序（yarl 已统一协议与主机大小写）"""
+        url = url if isinstance(url, URL) else URL(str(url))
+        if params:
+            url = url.update_query(params)
+        return str(url.with_fragment(None).with_query(sorted(url.query.items())))
+
+    @staticmethod
+    def make_key(normalized_url: str) -> str:
+        return hashlib.sha1(normalized_url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _load_index(self) -> OrderedDict:
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".bin"):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                st = os.stat(path)
+                entries.append((st.st_mtime, filename[:-4], st.st_size))
+            except OSError:
+                continue
+        entries.sort()
+        return OrderedDict((key, size) for _, key, size in entries)
+
+    def get(self, key: str):
+        """读取缓存条目，返回 (meta, body)；不存在或损坏时返回 None"""
+        if key not in self.index:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(body_path)
+        except Exception:
+            self._remove(key)
+            return None
+        self.index.move_to_end(key)
+        return meta, body
+
+    def put(self, key: str, url: str, status: int, headers: dict, body: bytes, charset=None):
+        lower_headers = {k.lower(): v for k, v in headers.items()}
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "charset": charset,
+            "etag": lower_headers.get("etag"),
+            "last_modified": lower_headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(body_path, "wb") as f:
+                f.write(body)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"[缓存] 写入失败 {url}: {e}")
+            self._remove(key)
+            return
+        self.total_bytes -= self.index.pop(key, 0)
+        self.index[key] = len(body)
+        self.total_bytes += len(body)
+        self._evict()
+
+    def refresh(self, key: str, meta: dict):
+        """条件请求返回 304 后刷新抓取时间"""
+        meta["fetched_at"] = time.time()
+        meta_path, _ = self._paths(key)
+        try:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"[缓存] 刷新失败 {meta.get('url')}: {e}")
+
+    def _remove(self, key: str):
+        self.total_bytes -= self.index.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.index:
+            key = next(iter(self.index))
+            self._remove(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.index),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
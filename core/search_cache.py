@@ -0,0 +1,90 @@
+import json
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """进程内共享的搜索结果缓存（LRU + TTL）
+
+    以 (数据源, 规范化关键词, 页码, 附加参数) 为键，所有用户共用同一份结果（预取的详情与封面也存放在同类缓存中）；
+    每个数据源可设置不同的有效期，按估算的字节数限制总占用，超出时淘汰最久未访问的条目。
+    缓存的结果会被多个用户同时引用，调用方不得修改。
+
+    Args:
+        max_bytes: 总占用上限（字节）
+        default_ttl: 未单独配置的数据源使用的有效期（秒）
+        ttls: 数据源 -> 有效期（秒）；有效期为 0 的数据源不缓存
+    """
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, default_ttl: float = 300, ttls: dict = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries = OrderedDict()  # 键 -> (过期时间, 字节数, 结果)，按最近访问排序
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def ttl_for(self, source_name: str) -> float:
+        return self.ttls.get(source_name, self.default_ttl)
+
+    @staticmethod
+    def estimate_size(value) -> int:
+        """按 JSON 序列化后的 UTF-8 长度估算占用（二进制内容按原始长度）"""
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        try:
+            return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        except (TypeError, ValueError):
+            return 0
+
+    def __contains__(self, key) -> bool:
+        """是否有未过期的条目（不计入命中统计）"""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, _, value = entry
+        if expires <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, source_name: str, value):
+        ttl = self.ttl_for(source_name)
+        if ttl <= 0:
+            return
+        size = self.estimate_size(value)
+        if not size or size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evicted += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
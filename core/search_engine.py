@@ -1,5 +1,15 @@
-import re
-from astrbot.api import logger
+import logging
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时使用纯 Python 打分
+    np = None
+
+try:
+    from astrbot.api import logger
+except ImportError:  # 独立运行基准测试时
+    logger = logging.getLogger("webnovel_search")
 
 class MultiSearchEngine:
     @staticmethod
@@ -42,53 +52,106 @@ class MultiSearchEngine:
         # 4. 最终得分（权重加权）
         final_score = base_score * weight
         
-        # 最终打分结果
-        logger.debug(f"[打分] {book.get('origin', 'unknown')} | 《{name}》 | 得分: {final_score:.1f} (权重: {weight})")
+        # 最终打分结果（未开启 debug 时不做格式化）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[打分] {book.get('origin', 'unknown')} | 《{name}》 | 得分: {final_score:.1f} (权重: {weight})")
         
         return final_score
 
+    # 批量打分中 numpy 向量化的起始规模，更小的批次纯 Python 更快
+    NUMPY_MIN_BATCH = 256
+
     @classmethod
-    def sift_by_average(cls, raw_batch: list, keyword: str, weights_map: dict):
-        """按有效书籍平均分筛选高质量结果"""
-        if not raw_batch:
-            return [], [], 0.0
-        
-        # 计算所有书籍得分并过滤无效结果
-        valid_books = []
-        total_score = 0.0
-        for book in raw_batch:
-            platform_weight = weights_map.get(book.get('origin'), 1.0)
-            score = cls.calculate_score(book, keyword, platform_weight)
-            book['final_score'] = score
-            if score > 0:
-                valid_books.append(book)
-                total_score += score
-        
-        if not valid_books:
-            return [], [], 0.0
-        
-        # 计算有效书籍平均分
-        avg_score = total_score / len(valid_books)
-        logger.debug(f"[筛选] 有效书籍数: {len(valid_books)} | 平均分阈值: {avg_score:.2f}")
-        
-        # 按平均分筛选结果
-        sifted_books = []
-        remaining_books = []
-        for book in valid_books:
-            if book['final_score'] >= avg_score:
-                sifted_books.append(book)
+    def score_batch(cls, books: list, keyword: str, weights_map: dict, trace=None) -> list:
+        """批量打分，结果与逐本调用 calculate_score 完全一致
+
+        关键词的字符统计只计算一次，模糊匹配只检查关键词中不重复的字符。
+        安装了 numpy 且批次较大时，分数合成改为向量化计算。
+        传入 trace（RankTrace）时记录每本书的各项得分。
+        """
+        if not books:
+            return []
+        kw_len = len(keyword)
+        kw_chars = Counter(keyword).items()
+
+        if np is None or len(books) < cls.NUMPY_MIN_BATCH:
+            scores = []
+            for book in books:
+                name = book.get('name', '')
+                author = book.get('author', '未知')
+                if name == keyword:
+                    name_score = 100
+                elif name.startswith(keyword):
+                    name_score = 80
+                elif keyword in name:
+                    name_score = 50 + (kw_len / len(name) * 20)
+                elif kw_len and sum(n for c, n in kw_chars if c in name) / kw_len >= 0.4:
+                    name_score = 30
+                else:
+                    name_score = 0
+                author_score = 40 if author == keyword else (20 if keyword in author else 0)
+                weight = weights_map.get(book.get('origin'), 1.0)
+                score = max(name_score, author_score) * weight
+                book['final_score'] = score
+                scores.append(score)
+                if trace is not None:
+                    trace.add_score(book, name_score, author_score, weight, score)
+            return scores
+
+        # 向量化：逐本只做字符串判断，分类为 0 无匹配 / 1 模糊 / 2 包含 / 3 前缀 / 4 完全匹配
+        kinds = []
+        name_lens = []
+        author_scores = []
+        weights = []
+        for book in books:
+            name = book.get('name', '')
+            author = book.get('author', '未知')
+            if name == keyword:
+                kind = 4
+            elif name.startswith(keyword):
+                kind = 3
+            elif keyword in name:
+                kind = 2
+            elif kw_len and sum(n for c, n in kw_chars if c in name) / kw_len >= 0.4:
+                kind = 1
             else:
-                remaining_books.append(book)
-        
-        return sifted_books, remaining_books, avg_score
+                kind = 0
+            kinds.append(kind)
+            name_lens.append(len(name))
+            author_scores.append(40 if author == keyword else (20 if keyword in author else 0))
+            weights.append(weights_map.get(book.get('origin'), 1.0))
+
+        kind_arr = np.array(kinds)
+        lens = np.array(name_lens, dtype=np.float64)
+        contain = 50 + (kw_len / np.where(lens > 0, lens, 1)) * 20
+        name_scores = np.select(
+            [kind_arr == 4, kind_arr == 3, kind_arr == 2, kind_arr == 1],
+            [100.0, 80.0, contain, 30.0], 0.0)
+        base = np.maximum(name_scores, np.array(author_scores, dtype=np.float64))
+        scores = (base * np.array(weights, dtype=np.float64)).tolist()
+
+        for book, score in zip(books, scores):
+            book['final_score'] = score
+        if trace is not None:
+            for book, name_score, author_score, weight, score in zip(
+                    books, name_scores.tolist(), author_scores, weights, scores):
+                trace.add_score(book, name_score, author_score, weight, score)
+        return scores
+
+    @classmethod
+    def sift_by_average(cls, raw_batch: list, keyword: str, weights_map: dict):
+        """按有效书籍平均分筛选高质量结果（一次性打分，不保留状态）"""
+        return IncrementalScorer(keyword, weights_map).sift(raw_batch)
 
     @classmethod
-    def interleave_results(cls, good_books: list, qd_priority: str, tm_priority: str, cwm_priority: str):
+    def interleave_results(cls, good_books: list, trace=None):
         """按得分降序排列结果"""
         sorted_results = sorted(good_books, key=lambda x: x.get('final_score', 0), reverse=True)
+        if trace is not None:
+            trace.add_order(sorted_results)
         
-        # 输出排序后的结果摘要
-        if sorted_results:
+        # 输出排序后的结果摘要（未开启 debug 时不做格式化）
+        if sorted_results and logger.isEnabledFor(logging.DEBUG):
             log_msg = "[排序] 最终排列顺序:\n"
             for i, b in enumerate(sorted_results[:10]): # 仅列出前10条
                 log_msg += f"  {i+1}. 《{b['name']}》({b['origin']}) - 得分: {b['final_score']:.1f}\n"
@@ -96,4 +159,179 @@ class MultiSearchEngine:
                 log_msg += f"  ... 共 {len(sorted_results)} 条结果"
             logger.debug(log_msg)
             
-        return sorted_results
\ No newline at end of file
+        return sorted_results
+
+
+class IncrementalScorer:
+    """一次搜索内的增量打分
+
+    同一 (关键词, 权重) 下每本书只打分一次；池中有效书籍（得分 > 0）的得分和与数量
+    随书籍加入、移出实时维护，平均分阈值无需重新遍历打分。
+    trace 为 RankTrace 时记录各项得分与每次筛选的阈值。
+    """
+    def __init__(self, keyword: str, weights_map: dict, trace=None):
+        self.keyword = keyword
+        self.weights_map = dict(weights_map)
+        self.trace = trace
+        self._scores = {}      # id(book) -> 得分
+        self._pooled = set()   # 当前计入统计的书籍 id
+        self.total = 0.0
+        self.count = 0
+        self.scored = 0        # 实际打分的书籍数
+
+    def matches(self, keyword: str, weights_map: dict) -> bool:
+        return self.keyword == keyword and self.weights_map == weights_map
+
+    def score(self, book: dict) -> float:
+        key = id(book)
+        score = self._scores.get(key)
+        if score is None:
+            score = MultiSearchEngine.score_batch([book], self.keyword, self.weights_map, self.trace)[0]
+            self._scores[key] = score
+            self.scored += 1
+        return score
+
+    def add(self, books: list):
+        """将新到达的书籍计入统计，已计入的书籍直接跳过"""
+        new_books = [b for b in books if id(b) not in self._scores]
+        if new_books:
+            scores = MultiSearchEngine.score_batch(new_books, self.keyword, self.weights_map, self.trace)
+            for book, score in zip(new_books, scores):
+                self._scores[id(book)] = score
+            self.scored += len(new_books)
+        for book in books:
+            key = id(book)
+            if key in self._pooled:
+                continue
+            score = self._scores[key]
+            if score > 0:
+                self._pooled.add(key)
+                self.total += score
+                self.count += 1
+
+    def forget(self, books: list):
+        """丢弃书籍的得分与统计（书籍内容变化后需重新打分）"""
+        for book in books:
+            key = id(book)
+            score = self._scores.pop(key, None)
+            if key in self._pooled:
+                self._pooled.discard(key)
+                self.total -= score
+                self.count -= 1
+
+    def clear(self):
+        """结果池被整体清空时重置统计（已有得分保留）"""
+        self._pooled.clear()
+        self.total = 0.0
+        self.count = 0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def sift(self, pool: list):
+        """按当前平均分拆分结果池，高于平均分的书籍移出统计
+
+        Returns:
+            tuple: (高于平均分的书籍, 其余有效书籍, 平均分)；得分为 0 的书籍被丢弃
+        """
+        self.add(pool)
+        if not self.count:
+            return [], [], 0.0
+
+        avg_score = self.average
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[筛选] 有效书籍数: {self.count} | 平均分阈值: {avg_score:.2f}")
+        sifted_books = []
+        remaining_books = []
+        for book in pool:
+            score = self._scores[id(book)]
+            if score <= 0:
+                continue
+            if score >= avg_score:
+                sifted_books.append(book)
+            else:
+                remaining_books.append(book)
+        if self.trace is not None:
+            self.trace.add_sift(self.count, avg_score, len(sifted_books))
+
+        for book in sifted_books:
+            key = id(book)
+            if key in self._pooled:
+                self._pooled.discard(key)
+                self.total -= self._scores[key]
+                self.count -= 1
+        return sifted_books, remaining_books, avg_score
+
+
+def _benchmark(pool_size: int = 5000, batches: int = 5, seed: int = 7):
+    """合成结果池上对比旧流程（每批次对整个原始池重复打分 3 次）与增量打分"""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    keyword = "诡秘之主"
+    chars = "诡秘之主的道天神魔剑仙帝王龙凡人修真都市重生系统"
+    weights = {"qidian": 1.1, "tomato": 1.0, "ciweimao": 0.9}
+    origins = list(weights)
+
+    def make_batch(n):
+        return [{
+            "name": "".join(rng.choice(chars) for _ in range(rng.randint(2, 8))),
+            "author": "作者" + str(rng.randint(1, 500)),
+            "origin": rng.choice(origins),
+        } for _ in range(n)]
+
+    batch_size = pool_size // batches
+    arrivals = [make_batch(batch_size) for _ in range(batches)]
+
+    def legacy():
+        raw_pool, full_pool = [], []
+        for batch in arrivals:
+            MultiSearchEngine.sift_by_average(raw_pool, keyword, weights)
+            raw_pool.extend(batch)
+            MultiSearchEngine.sift_by_average(raw_pool, keyword, weights)
+            good, raw_pool, _ = MultiSearchEngine.sift_by_average(raw_pool, keyword, weights)
+            full_pool.extend(good)
+        return full_pool
+
+    def incremental():
+        scorer = IncrementalScorer(keyword, weights)
+        raw_pool, full_pool = [], []
+        for batch in arrivals:
+            _ = scorer.average
+            raw_pool.extend(batch)
+            scorer.add(batch)
+            good, raw_pool, _ = scorer.sift(raw_pool)
+            full_pool.extend(good)
+        return full_pool, scorer.scored
+
+    logging.disable(logging.CRITICAL)
+    start = time.perf_counter()
+    legacy_pool = legacy()
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new_pool, scored = incremental()
+    new_time = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+
+    same = [id(b) for b in legacy_pool] == [id(b) for b in new_pool]
+    print(f"结果池 {pool_size} 本 / {batches} 批次，结果一致: {same}")
+    print(f"旧流程: {legacy_time * 1000:.1f}ms")
+    print(f"增量打分: {new_time * 1000:.1f}ms（打分 {scored} 次）")
+
+    books = [dict(b) for batch in arrivals for b in batch]
+    logging.disable(logging.CRITICAL)
+    start = time.perf_counter()
+    single = [MultiSearchEngine.calculate_score(b, keyword, weights[b["origin"]]) for b in books]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_scores = MultiSearchEngine.score_batch(books, keyword, weights)
+    batch_time = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+    print(f"逐本打分: {single_time * 1000:.1f}ms / 批量打分{'（numpy）' if np is not None else ''}: "
+          f"{batch_time * 1000:.1f}ms，结果一致: {single == batch_scores}")
+
+
+if __name__ == "__main__":
+    _benchmark()
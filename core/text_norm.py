@@ -0,0 +1,131 @@
+import unicodedata
+from functools import lru_cache
+
+try:
+    from opencc import OpenCC
+    _t2s = OpenCC("t2s").convert
+except Exception:  # opencc 为可选依赖，缺失时使用内置常用字表
+    _t2s = None
+
+# 网文书名/作者名中常见的繁体字 -> 简体字
+# 只收录在简体中不单独使用的字；覆、於、夥等简繁通用的字不在表中，以免改写正确的简体写法
+_TRADITIONAL = (
+    "萬與醜專業叢東絲兩嚴喪個豐臨為麗舉麼義烏樂喬習鄉書買亂爭虧雲亞產畝親褻億僅從侖倉儀們價眾優會傘偉傳傷倫偽"
+    "體餘傭僉俠侶僥偵側僑儈儂儕儔儼兒兌黨蘭關興茲養獸囅內岡冊寫軍農馮沖決況凍淨涼減湊凜幾鳳鳧憑凱擊鑿芻劃劉則剛創刪別"
+    "剎劑剮劍劇勸辦務勱動勵勁勞勢勳匱區醫華協單賣盧衛卻廠廳歷厲壓厭廁廂縣參雙發變敘疊葉號嘆嚇嗎啟吳嗚員聽響啞喚"
+    "國圖圓聖場壞塊堅壇壩墳墜壘壯聲殼壺處備復夠頭夾奪奮奧婦媽嬌孫學寧寶實寵審憲宮寬賓對尋導將爾塵嘗堯層屬岡峽島"
+    "嶺巋幣帥師帳帶幫幹並廣莊慶廬庫應廟廢開異棄張彌彎彈強歸當錄彙彥徹徑從徠禦憶懷態懲戀戰戲戶撲執擴捫掃揚擾撫"
+    "拋摶搶護報擔擬攏揀擁攔擰撥擇掛摯撈損換據擄擲撣搖擺攜攝攤斕斷無舊時曠曇晝顯晉曬曉暫術東樸機殺雜權條來楊榮"
+    "槍構標樣樹橋檢樓歐歡殘殞毀毆氣漢湯溝沒瀘淚瀉潑澤潔灑濃濤滅燈靈災燦爐點煉爛熱愛爺牆狀獨狹獅獄貓猶獲瑪環現"
+    "瑣畫暢畢異療癡盡監盤盧眾睜矯礦碼確禮禍離禿種積稱穩窮竊競筆節範築簡糧紀約紅紉紋納紐純紗紙級紛素細紹終絕給"
+    "統絲綁經綠網緊緣編緩練縱總績繩繼續纏羅罰罷羨義習翹聞聯聰職腦膽臉臘臟興舉艦艱藝節莊華萬葉著蓋蒼蘇藍虛蟲蝕"
+    "補裝製複見規視覽覺親觀觸計訂認討讓訓議記講許論設訪證評識詞詩試話該詳誠誤說請諸讀課誰調談謀謎謝謹譽變讚"
+    "貝負財貢貧貨販責貴買費貼賀資賊賜賞賢賤賦質賬賴贈贊趕趙趨躍車軌軒軟輕載輪輸轉轟辭農迴這連週進遊運過達違遠"
+    "適選遲遺邊邏郵鄰醜釋裡鑒針釣鈴鐵鏡長門閃閉問閑間閣閱闊隊陽陰陣階際陸陳險隨隱隸難雞雖離電霧霸靜韓頁頂項順"
+    "須預領頭題額顏願類顧風飛飯飲飽飾餓館馬駕騎騰驗驚髮鬥鬧鬼魚鮮鳥鳴鴻鶴麥黃齊齒龍龜"
+    "詭錢銀錯鋒鎮闖韻顛飄驅歲殤溫滄漁潛燼獵瘋癮簫籠蓮薩蘊誅諜譜謊貪賽贏輝轎鄭錦鍾鐘鑄闡陝韋頌顆餅駭驛鬱魯鯨鵬鷹黴齡"
+)
+_SIMPLIFIED = (
+    "万与丑专业丛东丝两严丧个丰临为丽举么义乌乐乔习乡书买乱争亏云亚产亩亲亵亿仅从仑仓仪们价众优会伞伟传伤伦伪"
+    "体余佣佥侠侣侥侦侧侨侩侬侪俦俨儿兑党兰关兴兹养兽冁内冈册写军农冯冲决况冻净凉减凑凛几凤凫凭凯击凿刍划刘则刚创删别"
+    "刹剂剐剑剧劝办务劢动励劲劳势勋匮区医华协单卖卢卫却厂厅历厉压厌厕厢县参双发变叙叠叶号叹吓吗启吴呜员听响哑唤"
+    "国图圆圣场坏块坚坛坝坟坠垒壮声壳壶处备复够头夹夺奋奥妇妈娇孙学宁宝实宠审宪宫宽宾对寻导将尔尘尝尧层属冈峡岛"
+    "岭岿币帅师帐带帮干并广庄庆庐库应庙废开异弃张弥弯弹强归当录汇彦彻径从徕御忆怀态惩恋战戏户扑执扩扪扫扬扰抚"
+    "抛抟抢护报担拟拢拣拥拦拧拨择挂挚捞损换据掳掷掸摇摆携摄摊斓断无旧时旷昙昼显晋晒晓暂术东朴机杀杂权条来杨荣"
+    "枪构标样树桥检楼欧欢残殒毁殴气汉汤沟没泸泪泻泼泽洁洒浓涛灭灯灵灾灿炉点炼烂热爱爷墙状独狭狮狱猫犹获玛环现"
+    "琐画畅毕异疗痴尽监盘卢众睁矫矿码确礼祸离秃种积称稳穷窃竞笔节范筑简粮纪约红纫纹纳纽纯纱纸级纷素细绍终绝给"
+    "统丝绑经绿网紧缘编缓练纵总绩绳继续缠罗罚罢羡义习翘闻联聪职脑胆脸腊脏兴举舰艰艺节庄华万叶著盖苍苏蓝虚虫蚀"
+    "补装制复见规视览觉亲观触计订认讨让训议记讲许论设访证评识词诗试话该详诚误说请诸读课谁调谈谋谜谢谨誉变赞"
+    "贝负财贡贫货贩责贵买费贴贺资贼赐赏贤贱赋质账赖赠赞赶赵趋跃车轨轩软轻载轮输转轰辞农回这连周进游运过达违远"
+    "适选迟遗边逻邮邻丑释里鉴针钓铃铁镜长门闪闭问闲间阁阅阔队阳阴阵阶际陆陈险随隐隶难鸡虽离电雾霸静韩页顶项顺"
+    "须预领头题额颜愿类顾风飞饭饮饱饰饿馆马驾骑腾验惊发斗闹鬼鱼鲜鸟鸣鸿鹤麦黄齐齿龙龟"
+    "诡钱银错锋镇闯韵颠飘驱岁殇温沧渔潜烬猎疯瘾箫笼莲萨蕴诛谍谱谎贪赛赢辉轿郑锦钟钟铸阐陕韦颂颗饼骇驿郁鲁鲸鹏鹰霉龄"
+)
+_T2S_TABLE = str.maketrans(_TRADITIONAL, _SIMPLIFIED)
+
+
+def to_simplified(text: str) -> str:
+    """繁体转简体；安装了 opencc 时使用完整词库，否则按内置常用字表逐字转换"""
+    if _t2s is not None:
+        return _t2s(text)
+    return text.translate(_T2S_TABLE)
+
+
+@lru_cache(maxsize=4096)
+def normalize(text: str) -> str:
+    """用于去重比较的归一化文本
+
+    全角转半角（NFKC）、繁体转简体、字母转小写，并去掉标点、符号与空白。
+    """
+    if not text:
+        return ""
+    text = to_simplified(unicodedata.normalize("NFKC", text)).lower()
+    return "".join(c for c in text if unicodedata.category(c)[0] not in "PSZC")
+
+
+def book_key(book: dict) -> tuple:
+    """书籍去重键：归一化后的 (书名, 作者)"""
+    return normalize(book.get('name') or ''), normalize(book.get('author') or '')
+
+
+class KeywordCanonicalizer:
+    """搜索关键词规范化
+
+    query() 生成发往站点的查询串：全角转半角（NFKC）、合并空白，安装了 opencc 时可选繁体转简体；
+    key() 在此基础上再做繁体转简体与大小写折叠，作为缓存与“是否同一次搜索”的比较键。
+    内置字表只能逐字转换，处理不了一简对多繁，因此没有 opencc 时只折叠比较键，
+    发往站点的查询串保持用户的写法。
+
+    Args:
+        fold_traditional: 是否将繁体关键词转为简体后再搜索
+    """
+    def __init__(self, fold_traditional: bool = True):
+        self.fold_traditional = fold_traditional
+        self.query = lru_cache(maxsize=2048)(self._query)
+        self.key = lru_cache(maxsize=2048)(self._key)
+
+    def _query(self, text: str) -> str:
+        text = " ".join(unicodedata.normalize("NFKC", text or "").split())
+        return _t2s(text) if self.fold_traditional and _t2s is not None else text
+
+    def _key(self, text: str) -> str:
+        text = self.query(text)
+        return (to_simplified(text) if self.fold_traditional else text).casefold()
+
+
+_SAMPLE_QUERIES = [
+    "诡秘之主", "诡秘之主 ", "詭秘之主", "诡秘之主", "剑来", "劍來", "剑来", "全职高手", "全職高手",
+    "Re:从零开始", "RE：从零开始", "re:从零开始", "斗破苍穹", "鬥破蒼穹", "斗破  苍穹", "凡人修仙传",
+    "凡人修仙传", "大奉打更人", "大奉打更人", "十日终焉", "十日終焉", "道诡异仙", "道詭異仙", "诡秘之主",
+    "第１序列", "第1序列", "第一序列", "深海余烬", "深海餘燼", "深海余烬", "宿命之环", "宿命之環",
+]
+
+
+def _benchmark(path: str = None):
+    """在查询日志（每行一个关键词）上对比原样与规范化后的缓存命中率"""
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            queries = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        queries = _SAMPLE_QUERIES
+    canon = KeywordCanonicalizer()
+
+    def hit_rate(make_key):
+        seen, hits = set(), 0
+        for q in queries:
+            k = make_key(q)
+            if k in seen:
+                hits += 1
+            seen.add(k)
+        return hits / len(queries), len(seen)
+
+    raw_rate, raw_keys = hit_rate(lambda q: q)
+    canon_rate, canon_keys = hit_rate(canon.key)
+    print(f"查询 {len(queries)} 条")
+    print(f"原样作为键: 命中率 {raw_rate * 100:.1f}%（{raw_keys} 个不同的键）")
+    print(f"规范化后: 命中率 {canon_rate * 100:.1f}%（{canon_keys} 个不同的键）")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
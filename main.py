@@ -1,9 +1,9 @@
 import asyncio
-import aiohttp
 import base64
+from yarl import URL
 import re
 import os
-from yarl import URL
+import time
 from cachetools import TTLCache
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register, StarTools
@@ -11,9 +11,49 @@ from astrbot.api import logger
 import astrbot.api.message_components as Comp
 
 from .sources import SourceManager
-from .core.search_engine import MultiSearchEngine
+from .core.http_client import HttpClient
+from .core.rate_limiter import RateLimiter
+from .core.circuit_breaker import SourceUnavailableError
+from .core.deadline import Deadline, DeadlineExceeded, deadline_scope
+from .core.response_cache import ResponseCache
+from .core.search_cache import SearchCache
+from .core.text_norm import KeywordCanonicalizer
+from .core.prefetch import Prefetcher
+from .core.replay import FixtureStore, Recorder
+from .core.offload import Offloader
+from .core.search_engine import MultiSearchEngine, IncrementalScorer
+from .core.rank_trace import RankTrace
+from .core.dedup import DuplicateIndex
+from .core.catalog import BookCatalog
+from .core.metadata_store import MetadataStore
 from .core.bookshelf_manager import BookshelfManager
 
+# 各指令默认的整体延迟预算（秒），可在配置 command_budgets 中覆盖
+DEFAULT_COMMAND_BUDGETS = {
+    "ss": 15, "qd": 12, "cwm": 10, "fq": 10, "blb": 10, "fl": 12, "qm": 10, "sj": 10, "shelf": 12,
+}
+
+# 聚合搜索的平台，顺序与配置 platform_weights 中的优先级一一对应
+AGGREGATE_PLATFORMS = ("qidian", "tomato", "ciweimao", "sfacg", "faloo", "qimao")
+# platform_weights 未写到的平台使用的优先级
+DEFAULT_PLATFORM_PRIO = {"qidian": "1", "tomato": "2", "ciweimao": "2", "sfacg": "3", "faloo": "3", "qimao": "3"}
+
+# 解析工作池配置项到模式的映射
+PARSE_WORKER_MODES = {"线程池": "thread", "进程池": "process", "不卸载": "inline"}
+
+# 平台显示名称
+PLATFORM_NAMES = {
+    "qidian": "起点",
+    "ciweimao": "刺猬猫",
+    "tomato": "番茄",
+    "sfacg": "菠萝包",
+    "faloo": "飞卢",
+    "qimao": "七猫",
+}
+
+# 预取的详情与封面在内存中的容量上限（MB）
+DETAIL_PREFETCH_CACHE_MB = 16
+
 @register("astrbot_plugin_webnovel_info", "Foolllll", "网文搜索助手", "1.1.1", "")
 class WebnovelInfoPlugin(Star):
     """网文搜索插件核心类
@@ -21,14 +61,80 @@ class WebnovelInfoPlugin(Star):
     """
     def __init__(self, context: Context, config=None):
         super().__init__(context)
-        self.source_manager = SourceManager()  # 数据源管理器
-        self.bookshelf_manager = BookshelfManager(StarTools.get_data_dir("astrbot_plugin_webnovel_info"))
         self.config = config or {}             # 插件配置（默认空字典）
+        data_dir = StarTools.get_data_dir("astrbot_plugin_webnovel_info")
+        # 插件级共享连接池与按站点限流器，所有数据源与封面下载共用
+        self.rate_limiter = RateLimiter.from_config(self.config.get("host_rate_limits", []))
+        cache_mb = self.config.get("response_cache_mb", 64)
+        self.response_cache = ResponseCache(os.path.join(data_dir, "http_cache"), cache_mb * 1024 * 1024) if cache_mb > 0 else None
+        # 调试用：录制真实响应为夹具 / 改发到本地 mock 上游回放
+        record_dir = self.config.get("record_fixtures_dir", "").strip()
+        self.recorder = Recorder(FixtureStore(record_dir)) if record_dir else None
+        self.http = HttpClient(
+            limit_per_host=self.config.get("http_limit_per_host", 8),
+            rate_limiter=self.rate_limiter,
+            response_cache=self.response_cache,
+            recorder=self.recorder,
+            replay_url=self.config.get("replay_upstream_url", "").strip() or None,
+        )
+        # CPU 密集的解析/解密交给工作池，避免阻塞事件循环
+        self.offloader = Offloader(
+            mode=PARSE_WORKER_MODES.get(self.config.get("parse_worker_mode", "线程池"), "thread"),
+            workers=self.config.get("parse_workers", 2),
+            inline_threshold=self.config.get("parse_inline_kb", 32) * 1024,
+        )
+        # 关键词规范化：全半角、空白、繁简写法不同的同一搜索共用缓存与搜索状态
+        self.canonicalizer = KeywordCanonicalizer(self.config.get("keyword_fold_traditional", True))
+        # 搜索结果在所有用户间共享，热门书名的重复搜索不再逐个请求上游
+        search_cache_mb = self.config.get("search_cache_mb", 16)
+        self.search_cache = SearchCache(
+            max_bytes=search_cache_mb * 1024 * 1024,
+            ttls=self.config.get("search_cache_ttl", {}),
+        ) if search_cache_mb > 0 else None
+        # 本地书目：收录见过的所有书籍，用于即时展示与上游不可用时兜底
+        catalog_max_books = self.config.get("catalog_max_books", 20000)
+        self.catalog = BookCatalog(data_dir, catalog_max_books) if catalog_max_books > 0 else None
+        self.catalog_instant = self.config.get("catalog_instant", True)
+        # 书籍详情持久化到 SQLite：静态字段长期有效，易变字段（最新章节、排行、收藏等）很快过期
+        metadata_static_ttl = self.config.get("metadata_static_ttl", 7 * 86400)
+        self.metadata_store = MetadataStore.open(
+            data_dir,
+            static_ttl=metadata_static_ttl,
+            volatile_ttl=self.config.get("metadata_volatile_ttl", 1800),
+        ) if metadata_static_ttl > 0 else None
+        self.source_manager = SourceManager(  # 数据源管理器
+            self.http,
+            detail_cache_ttl=self.config.get("detail_cache_ttl", 600),
+            offloader=self.offloader,
+            search_cache=self.search_cache,
+            canonicalizer=self.canonicalizer,
+            budget_factor=self.config.get("aggregate_budget_factor", 1.5),
+            catalog=self.catalog,
+            metadata_store=self.metadata_store,
+        )
+        # 单平台搜索展示第 N 页后在后台预取第 N+1 页
+        self.prefetcher = Prefetcher(
+            budget=self.config.get("prefetch_budget", 4),
+            enabled=self.config.get("prefetch_next_page", {}),
+        )
+        # 搜索结果展示后，在站点空闲时预取前几条的详情与封面
+        self.detail_prefetch_top = self.config.get("detail_prefetch_top", 3)
+        self.detail_cache = SearchCache(
+            max_bytes=DETAIL_PREFETCH_CACHE_MB * 1024 * 1024,
+            default_ttl=self.config.get("detail_cache_ttl", 600),
+        )
+        self.bookshelf_manager = BookshelfManager(data_dir)
         
         # 显示模式：简洁/详细（默认详细）
         self.display_mode = "concise" if self.config.get("display_mode", "详细") == "简洁" else "detailed"
         self.enable_trial = self.config.get("enable_trial", False)  # 是否启用试读功能
         self.priority_cfg = self.config.get("platform_weights", "1 2 2").split()  # 平台权重配置
+        self.command_budgets = self.config.get("command_budgets", {})  # 各指令延迟预算
+        self._background_tasks = set()  # 指令返回后仍在运行的后台任务
+        # 聚合搜索流式返回：达到法定数量的平台（或等待超时）即先展示，慢平台结果随后追加
+        self.stream_quorum = self.config.get("stream_quorum", 2)
+        self.stream_wait = self.config.get("stream_wait", 3)
+        self.stream_late_notice = self.config.get("stream_late_notice", True)
         
         # 初始化番茄 API 配置
         if "tomato" in self.source_manager.sources:
@@ -38,14 +144,11 @@ class WebnovelInfoPlugin(Star):
         
         self.trial_content_limit = 3000  # 试读内容长度限制（字符数）
         self.page_size = 10  
-        self._session = None # 持久化会话
 
-    async def get_session(self):
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            })
-        return self._session
+    def _deadline(self, command: str) -> Deadline:
+        """按指令创建整体延迟预算"""
+        budget = self.command_budgets.get(command) or DEFAULT_COMMAND_BUDGETS.get(command, 15)
+        return Deadline(float(budget), command)
 
     def _get_user_search_state(self, user_id: str):
         """获取/初始化用户搜索状态
@@ -62,17 +165,21 @@ class WebnovelInfoPlugin(Star):
                 "current_page": 1,      # 当前页码
                 "full_pool": [],        # 多平台综合结果池
                 "raw_pool": [],         # 原始搜索结果池
-                "qd_page": 1,           # 起点搜索页码
-                "cwm_page": 1,          # 刺猬猫搜索页码
-                "tm_page": 1,           # 番茄搜索页码
-                "qd_last": False,       # 起点是否最后一页
-                "cwm_last": False,      # 刺猬猫是否最后一页
-                "tm_last": False,       # 番茄是否最后一页
+                "scorer": None,         # 原始池的增量打分器
+                "dedup": None,          # 跨平台重复书籍索引
+                "trace": None,          # 最近一次开启追踪的搜索的打分记录
+                "platform_pages": {},   # 聚合搜索各平台下一次拉取的页码
+                "platform_last": {},    # 聚合搜索各平台是否已到最后一页
                 "source": "",           # 当前搜索源（multi/qidian/ciweimao/tomato）
                 "max_pages": 1,         # 总页数
                 "results": [],          # 当前页结果
                 "single_pool": [],      # 单平台结果池
                 "cached_pages": {},     # 页码缓存（key:页码，value:该页数据）
+                "page_feed": None,      # 起点后续分页（PageFeed）
+                "page_feed_task": None, # 起点后续分页的后台并入任务
+                "prefetch_task": None,  # 下一页的后台预取任务
+                "prefetched_pages": set(),  # 预取到但尚未被使用的页码
+                "detail_prefetch_task": None,  # 前几条结果的详情预取任务
                 "last_viewed": None,    # 最近查看的书籍信息
                 "bookshelf_page": 1     # 书架当前页码
             }
@@ -82,15 +189,29 @@ class WebnovelInfoPlugin(Star):
     async def multi_search_handler(self, event: AstrMessageEvent):
         """多平台聚合搜索"""
         parts = event.message_str.strip().split()
+        trace = "--trace" in parts
+        if trace:
+            parts = [p for p in parts if p != "--trace"]
+        user_id = event.get_sender_id()
+        state = self._get_user_search_state(user_id)
+
+        # 0. 查看上一次开启追踪的搜索的打分明细 (e.g. /ss --trace)
+        if trace and len(parts) < 2:
+            if state.get("trace") is None:
+                yield event.plain_result("❌ 暂无打分追踪，请先使用 `/ss <书名> --trace` 搜索。")
+            else:
+                yield event.plain_result(state["trace"].format())
+            return
         if len(parts) < 2:
             yield event.plain_result("用法: /ss <书名> 或 /ss <序号> 或 /ss 下一页")
             return
 
-        # 解析用户ID和操作指令
-        user_id, action = event.get_sender_id(), parts[1]
-        state = self._get_user_search_state(user_id)
+        # 解析操作指令
+        action = parts[1]
         avg_threshold = 60  # 结果筛选阈值
         direct_index = None
+        fresh = False       # 本次指令是否发起了新的搜索
+        deadline = self._deadline("ss")
 
         # 1. 序号查询：查看指定书籍详情 (e.g. /ss 1)
         if action.isdigit() and len(parts) == 2:
@@ -98,9 +219,8 @@ class WebnovelInfoPlugin(Star):
             if 0 <= idx < len(state["full_pool"]):
                 target = state["full_pool"][idx]
                 state["last_viewed"] = target # 记录最近查看
-                details = await self.source_manager.get_source(target['origin']).get_book_details(target["url"])
-                if details:
-                    yield event.chain_result(await self._format_book_details(details))
+                async for result in self._detail_results(event, target['origin'], target["url"], deadline):
+                    yield result
                 return
             yield event.plain_result(f"🤔 序号 {action} 不在当前结果中。")
             return
@@ -126,89 +246,114 @@ class WebnovelInfoPlugin(Star):
                     keyword = " ".join(parts[1:])
             else:
                 keyword = " ".join(parts[1:])
+            keyword = self.canonicalizer.query(keyword)
             
             if not keyword:
                 yield event.plain_result("❌ 请输入关键词，例如：`/ss 诡秘之主`")
                 return
             
             req_page = 1
-            if state["keyword"] != keyword:
+            # 开启追踪时重新搜索，确保每本书的打分都被记录
+            if self.canonicalizer.key(state["keyword"]) != self.canonicalizer.key(keyword) or trace:
                 yield event.plain_result(f"🔍 正在多平台搜索“{keyword}”...")
                 # 重置搜索状态
+                self._cancel_page_feed(state)
+                self._cancel_prefetch(state)
                 state.update({
-                    "keyword": keyword, "full_pool": [], "raw_pool": [], 
-                    "qd_page": 1, "cwm_page": 1, "tm_page": 1,
-                    "qd_last": False, "cwm_last": False, "tm_last": False,
+                    "keyword": keyword, "full_pool": [], "raw_pool": [], "scorer": None, "dedup": None,
+                    "platform_pages": {}, "platform_last": {},
                     "source": "multi",
                     "cached_pages": {},
                     "last_viewed": None
                 })
+                if trace:
+                    state["trace"] = RankTrace(keyword)
+                fresh = True
+            else:
+                keyword = state["keyword"]  # 仅大小写不同，沿用当前搜索
 
         # 计算目标页数需要的结果总数
         if direct_index:
             target_count = direct_index
         else:
             target_count = req_page * self.page_size
-        qd_prio = self.priority_cfg[0] if len(self.priority_cfg) > 0 else "1"
-        tm_prio = self.priority_cfg[1] if len(self.priority_cfg) > 1 else "2"
-        cwm_prio = self.priority_cfg[2] if len(self.priority_cfg) > 2 else "2"
-        
-        weights_map = {
-            "qidian": MultiSearchEngine.get_weight(qd_prio), 
-            "tomato": MultiSearchEngine.get_weight(tm_prio),
-            "ciweimao": MultiSearchEngine.get_weight(cwm_prio)
-        }
+        platforms = self._aggregate_platforms()
+        weights_map = {p: MultiSearchEngine.get_weight(prio) for p, prio in platforms.items()}
+        # 同一次搜索（关键词 + 权重）内每本书只打分一次，后续批次只处理新到达的书籍
+        scorer = state.get("scorer")
+        if scorer is None or not scorer.matches(keyword, weights_map):
+            scorer = state["scorer"] = IncrementalScorer(keyword, weights_map, state["trace"] if trace else None)
+            scorer.add(state["raw_pool"])
+            state["dedup"] = DuplicateIndex(weights_map)
+
+        # 本地书目中已有的结果先行展示（共享缓存已有全部平台的结果时无需展示）
+        if fresh and direct_index is None and self.catalog is not None and self.catalog_instant and not all(
+                self.source_manager.has_cached_search(p, keyword, 1, True) for p in platforms):
+            cached_books = self.catalog.search(keyword, origins=set(platforms), limit=self.page_size)
+            if cached_books:
+                yield event.plain_result(self._build_catalog_message(keyword, cached_books, "ss"))
+
+        # 熔断中的平台直接跳过，不再等待其超时；本地书目中有该平台的书籍时以缓存结果代替
+        skipped = [p for p in platforms if not self.source_manager.is_available(p)]
+        if skipped:
+            covered = [p for p in skipped if self._absorb_catalog(state, p, keyword)]
+            msg = f"⚠️ {'、'.join(PLATFORM_NAMES[p] for p in skipped)} 暂时无法访问，本次搜索已跳过。"
+            if covered:
+                msg += f"\n📚 {'、'.join(PLATFORM_NAMES[p] for p in covered)} 使用本地书目中的缓存结果。"
+            yield event.plain_result(msg)
 
         # 补充结果池直到满足目标页数需求
         avg_threshold = 60  # 结果筛选阈值
         max_batches = 5     # 最大拉取批次，防止低质量结果导致无限拉取
         batch_count = 0
+        late = {}           # 首批未及时返回的平台 -> 仍在进行的搜索任务
+        dropped = set()     # 超出自身延迟预算、本次指令不再拉取的平台
+        pages, lasts = state["platform_pages"], state["platform_last"]
         
         while len(state["full_pool"]) < target_count and batch_count < max_batches:
             batch_count += 1
-            _, _, current_avg = MultiSearchEngine.sift_by_average(state["raw_pool"], keyword, weights_map)
+            if batch_count > 1 and deadline.expired:
+                logger.debug(f"[聚合搜索] 时间预算已用尽，停止拉取, 关键词: {keyword}")
+                break
+            current_avg = scorer.average
             
             # 结果不足或质量不达标时，拉取更多数据
             # 如果所有平台都已拉完，或者当前已经有足够多的原始结果但质量仍不达标，则停止拉取
-            all_exhausted = state["qd_last"] and state["cwm_last"] and state["tm_last"]
+            all_exhausted = all(lasts.get(p) or p in skipped or p in dropped for p in platforms)
             need_more = not state["raw_pool"] or (current_avg < avg_threshold and not all_exhausted)
             
             if need_more:
                 tasks, p_map = [], []
-                # 起点搜索任务
-                if qd_prio != "0" and not state["qd_last"]:
-                    tasks.append(self.source_manager.get_source("qidian").search_book(keyword, page=state["qd_page"], return_metadata=True))
-                    p_map.append("qidian")
-                # 刺猬猫搜索任务
-                if cwm_prio != "0" and not state["cwm_last"]:
-                    tasks.append(self.source_manager.get_source("ciweimao").search_book(keyword, page=state["cwm_page"], return_metadata=True))
-                    p_map.append("ciweimao")
-                # 番茄搜索任务
-                if tm_prio != "0" and not state["tm_last"] and self.config.get("tomato_api_base"):
-                    tasks.append(self.source_manager.get_source("tomato").search_book(keyword, page=state["tm_page"], return_metadata=True))
-                    p_map.append("tomato")
+                for p in platforms:
+                    if lasts.get(p) or p in skipped or p in dropped or p in late:
+                        continue
+                    # 每个平台只能使用按其近期 p90 耗时学到的预算，慢平台超时即退出本轮
+                    budget = self.source_manager.search_budget(p)
+                    p_deadline = deadline if budget is None else deadline.child(budget)
+                    tasks.append(self.source_manager.search_book(p, keyword, page=pages.get(p, 1), return_metadata=True, deadline=p_deadline))
+                    p_map.append(p)
                 
                 if tasks:
                     # 并发执行搜索任务
                     logger.debug(f"[聚合搜索] 正在执行第 {batch_count} 批次拉取, 关键词: {keyword}")
-                    results = await asyncio.gather(*tasks)
+                    if batch_count == 1 and 0 < self.stream_quorum < len(tasks):
+                        # 流式：多数平台返回即先展示，其余平台转入 late 稍后追加
+                        results, late = await self._gather_quorum(tasks, p_map, deadline)
+                    else:
+                        results = await asyncio.gather(*tasks, return_exceptions=True)
                     for i, r in enumerate(results):
+                        if isinstance(r, Exception):
+                            if isinstance(r, DeadlineExceeded):
+                                dropped.add(p_map[i])
+                                self._absorb_catalog(state, p_map[i], keyword)
+                            elif not isinstance(r, SourceUnavailableError):
+                                logger.error(f"[聚合搜索] {p_map[i]} 搜索异常: {r}")
+                            continue
                         if not r: continue
-                        books = r.get('books', [])
-                        platform = p_map[i]
-                        if platform == "qidian":
-                            state["qd_page"] += 1
-                            state["qd_last"] = r.get('is_last', False)
-                        elif platform == "ciweimao":
-                            state["cwm_page"] += 1
-                            state["cwm_last"] = r.get('is_last', False)
-                        elif platform == "tomato":
-                            state["tm_page"] += 1
-                            state["tm_last"] = r.get('is_last', False)
-                        state["raw_pool"].extend(books)
+                        self._absorb_search_result(state, p_map[i], r)
                     
                     # 拉取后重新计算评分，如果还是没结果且没到限制，继续循环拉取
-                    _, _, current_avg = MultiSearchEngine.sift_by_average(state["raw_pool"], keyword, weights_map)
+                    current_avg = scorer.average
                     if not state["raw_pool"] and not all_exhausted:
                         continue
             
@@ -216,9 +361,10 @@ class WebnovelInfoPlugin(Star):
             # 注意：即使 current_avg < avg_threshold，只要池子里有东西，我们也进行一次筛选
             # 这样可以保证即使没有完美匹配，也能展示当前最接近的结果
             if state["raw_pool"]:
-                good_batch, remains, _ = MultiSearchEngine.sift_by_average(state["raw_pool"], keyword, weights_map)
+                good_batch, remains, _ = scorer.sift(state["raw_pool"])
                 if good_batch:
-                    interleaved = MultiSearchEngine.interleave_results(good_batch, qd_prio, tm_prio, cwm_prio)
+                    # 每批只在批内排序后追加，已展示的序号不会因后续批次变化
+                    interleaved = MultiSearchEngine.interleave_results(good_batch, trace=scorer.trace)
                     state["full_pool"].extend(interleaved)
                     state["raw_pool"] = remains
                 else:
@@ -228,17 +374,24 @@ class WebnovelInfoPlugin(Star):
                         sorted_raw = sorted(state["raw_pool"], key=lambda x: x.get('final_score', 0), reverse=True)
                         state["full_pool"].extend(sorted_raw)
                         state["raw_pool"] = []
+                        scorer.clear()
             elif all_exhausted:
                 break
 
+        # 已到达的结果不足以展示目标页或目标序号时，只能等待迟到的平台
+        needed = direct_index or (req_page - 1) * self.page_size + 1
+        if late and len(state["full_pool"]) < needed:
+            await self._merge_late(state, late, deadline)
+
         # 如果是直接查看详情模式
         if direct_index is not None:
             if 1 <= direct_index <= len(state["full_pool"]):
+                for fut in late.values():
+                    fut.cancel()  # 直接查看详情，不再需要迟到平台的结果
                 target = state["full_pool"][direct_index - 1]
                 state["last_viewed"] = target # 记录最近查看
-                details = await self.source_manager.get_source(target['origin']).get_book_details(target["url"])
-                if details:
-                    yield event.chain_result(await self._format_book_details(details))
+                async for result in self._detail_results(event, target['origin'], target["url"], deadline):
+                    yield result
                 return
             else:
                 yield event.plain_result(f"⚠️ 序号 {direct_index} 超出综合搜索结果范围（共 {len(state['full_pool'])} 条），将显示搜索列表。")
@@ -253,10 +406,8 @@ class WebnovelInfoPlugin(Star):
             yield event.plain_result(f"抱歉，没有找到匹配“{keyword}”的高质量结果。")
             return
 
-        # 1. 检查是否还能拉取更多数据（起点/刺猬猫/番茄未到最后一页）
-        can_load_more = False
-        if not state["qd_last"] or not state["cwm_last"] or not state["tm_last"]:
-            can_load_more = True
+        # 1. 检查是否还能拉取更多数据（有参与聚合的平台未到最后一页）
+        can_load_more = not all(lasts.get(p) for p in platforms)
         
         # 2. 计算当前总页数（已加载数据）
         current_total_pages = (len(state["full_pool"]) + self.page_size - 1) // self.page_size
@@ -268,7 +419,6 @@ class WebnovelInfoPlugin(Star):
             has_next_page = True
         
         # 4. 构建消息（显示总页数）
-        can_load_more = not state["qd_last"] or not state["cwm_last"] or not state["tm_last"]
         current_total_pages = (len(state["full_pool"]) + self.page_size - 1) // self.page_size
         
         if can_load_more:
@@ -277,19 +427,13 @@ class WebnovelInfoPlugin(Star):
             msg = f"以下是【{keyword}】的第 {req_page}/{current_total_pages} 页综合搜索结果：\n"  # 无更多→显示总页数
         for i, b in enumerate(display_list):
             origin = b.get('origin')
-            if origin == 'qidian':
-                platform_tag = "[起点]"
-            elif origin == 'ciweimao':
-                platform_tag = "[刺猬猫]"
-            elif origin == 'sfacg':
-                platform_tag = "[菠萝包]"
-            elif origin == 'tomato':
-                platform_tag = "[番茄]"
-            elif origin == 'faloo':
-                platform_tag = "[飞卢]"
-            else:
-                platform_tag = "[未知]"
+            platform_tag = f"[{PLATFORM_NAMES.get(origin, '未知')}]"
+            if b.get('cached'):
+                platform_tag += "(缓存)"
             msg += f"{start_idx + i + 1}. {b['name']}\n    {platform_tag} 作者：{b['author']}\n"
+            also = [PLATFORM_NAMES.get(o, o) for o in b.get('origins', []) if o != origin]
+            if also:
+                msg += f"    另见：{'、'.join(also)}\n"
         
         # 5. 构建翻页提示
         page_tips = []
@@ -299,6 +443,8 @@ class WebnovelInfoPlugin(Star):
         logger.info(f"用户 {user_id} 搜索【{keyword}】第 {req_page} 页结果，当前池中共有 {len(state['full_pool'])} 条结果，可加载更多：{can_load_more}。")
         
         # 6. 补充操作提示
+        if late:
+            msg += f"\n⏳ {'、'.join(PLATFORM_NAMES[p] for p in late)} 仍在响应，结果到达后将追加在末尾\n"
         msg += f"\n💡 `/ss <序号>` 查看详情\n"
         if page_tips:
             msg += f"💡 使用 {' | '.join(page_tips)} 翻页"
@@ -309,6 +455,132 @@ class WebnovelInfoPlugin(Star):
                 msg += "💡 当前已是最后一页，无更多内容"
         
         yield event.plain_result(msg)
+        self._prefetch_details(state, None, display_list)
+
+        # 7. 慢平台的结果陆续到达：筛选后追加到结果池末尾，已展示的序号保持不变
+        if late:
+            pool = state["full_pool"]
+            async for platform, r in self._iter_late(late, deadline):
+                if state["full_pool"] is not pool:
+                    break  # 用户已发起新的搜索
+                if isinstance(r, Exception):
+                    if not isinstance(r, (SourceUnavailableError, DeadlineExceeded)):
+                        logger.error(f"[聚合搜索] {platform} 搜索异常: {r}")
+                    continue
+                if not r:
+                    continue
+                self._absorb_search_result(state, platform, r)
+                good_batch, remains, _ = scorer.sift(state["raw_pool"])
+                if not good_batch:
+                    continue
+                added = MultiSearchEngine.interleave_results(good_batch, trace=scorer.trace)
+                start = len(pool) + 1
+                pool.extend(added)
+                state["raw_pool"] = remains
+                logger.debug(f"[聚合搜索] {platform} 迟到结果已追加 {len(added)} 条, 关键词: {keyword}")
+                if self.stream_late_notice:
+                    yield event.plain_result(
+                        f"📥 {PLATFORM_NAMES[platform]}的结果已到达，新增 {len(added)} 条（第 {start}-{len(pool)} 条）。\n"
+                        f"💡 `/ss <序号>` 查看详情，`/ss 下一页` 继续浏览")
+
+    def _aggregate_platforms(self) -> dict:
+        """参与聚合搜索的平台 -> 优先级，按 platform_weights 的顺序读取，优先级为 0 的平台不参与"""
+        platforms = {}
+        for i, platform in enumerate(AGGREGATE_PLATFORMS):
+            prio = self.priority_cfg[i] if i < len(self.priority_cfg) else DEFAULT_PLATFORM_PRIO[platform]
+            if prio == "0" or platform not in self.source_manager.sources:
+                continue
+            if platform == "tomato" and not self.config.get("tomato_api_base"):
+                continue  # 未配置 API 地址时番茄不可用
+            platforms[platform] = prio
+        return platforms
+
+    def _absorb_search_result(self, state, platform, r):
+        """记录聚合搜索中某平台的分页进度，并把结果放入原始池"""
+        state["platform_pages"][platform] = state["platform_pages"].get(platform, 1) + 1
+        state["platform_last"][platform] = r.get('is_last', False)
+        self._absorb_books(state, r.get('books', []))
+
+    def _absorb_catalog(self, state, platform, keyword) -> int:
+        """平台本次无法返回结果时，用本地书目中该平台的书籍代替，返回放入的条数"""
+        if self.catalog is None:
+            return 0
+        books = self.catalog.search(keyword, origins={platform})
+        if books:
+            self.catalog.fallbacks += 1
+            self._absorb_books(state, books)
+        return len(books)
+
+    def _absorb_books(self, state, books):
+        """把一批书籍去重后放入原始池并打分"""
+        replaced = []
+        if state.get("dedup") is not None:
+            # 同一本书在多个平台出现时合并为一条；仍在原始池中的条目可改用权重更高的来源
+            raw_ids = {id(b) for b in state["raw_pool"]}
+            books, replaced = state["dedup"].absorb(books, lambda e: id(e) in raw_ids)
+        state["raw_pool"].extend(books)
+        if state.get("scorer") is not None:
+            state["scorer"].forget(replaced)
+            state["scorer"].add(replaced + books)
+
+    async def _merge_late(self, state, late, deadline):
+        """等待全部迟到平台，把结果筛选后并入结果池"""
+        async for platform, r in self._iter_late(late, deadline):
+            if isinstance(r, Exception) or not r:
+                continue
+            self._absorb_search_result(state, platform, r)
+        late.clear()
+        if state["raw_pool"]:
+            good_batch, remains, _ = state["scorer"].sift(state["raw_pool"])
+            state["full_pool"].extend(MultiSearchEngine.interleave_results(good_batch, trace=state["scorer"].trace))
+            state["raw_pool"] = remains
+
+    async def _gather_quorum(self, tasks, p_map, deadline):
+        """等待 stream_quorum 个平台返回（或首批等待时间用尽）
+
+        Returns:
+            tuple: (results, late)。results 与 p_map 对齐，已完成的为结果或异常，未完成的为 None；
+            late 为 平台 -> 仍在进行的任务
+        """
+        futures = [asyncio.ensure_future(t) for t in tasks]
+        wait_until = asyncio.get_running_loop().time() + min(self.stream_wait, deadline.remaining())
+        pending = set(futures)
+        while pending and len(futures) - len(pending) < self.stream_quorum:
+            timeout = wait_until - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            _, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        results, late = [], {}
+        for platform, fut in zip(p_map, futures):
+            if not fut.done():
+                results.append(None)
+                late[platform] = fut
+            elif fut.cancelled():
+                results.append(None)
+            else:
+                results.append(fut.exception() or fut.result())
+        if late:
+            logger.debug(f"[聚合搜索] 先行展示，等待中的平台: {list(late)}")
+        return results, late
+
+    async def _iter_late(self, late, deadline):
+        """按到达顺序产出迟到平台的 (平台, 结果或异常)，超出指令预算后取消剩余任务"""
+        async def tagged(platform, fut):
+            try:
+                return platform, await fut
+            except Exception as e:
+                return platform, e
+
+        try:
+            for next_done in asyncio.as_completed([tagged(p, f) for p, f in late.items()],
+                                                  timeout=max(0.0, deadline.remaining())):
+                yield await next_done
+        except asyncio.TimeoutError:
+            logger.debug("[聚合搜索] 迟到平台超出时间预算，已放弃")
+        finally:
+            for fut in late.values():
+                fut.cancel()
 
     @filter.command("起点", alias={'qd'})
     async def qidian_handler(self, event: AstrMessageEvent):
@@ -352,8 +624,14 @@ class WebnovelInfoPlugin(Star):
     @filter.command("三江", alias={'sj'})
     async def sanjiang_handler(self, event: AstrMessageEvent):
         """获取起点三江频道推荐书籍"""
-        qidian = self.source_manager.get_source("qidian")
-        books = await qidian.get_sanjiang_books()
+        try:
+            books = await self.source_manager.call("qidian", "get_sanjiang_books", deadline=self._deadline("sj"))
+        except SourceUnavailableError:
+            yield event.plain_result("⚠️ 起点暂时无法访问，请稍后再试。")
+            return
+        except DeadlineExceeded:
+            yield event.plain_result("⏱️ 起点 响应超时，请稍后再试。")
+            return
         
         if not books:
             yield event.plain_result("❌ 暂时没有获取到三江推荐书籍，请稍后再试。")
@@ -362,10 +640,12 @@ class WebnovelInfoPlugin(Star):
         # 记录到搜索状态，方便用户直接通过序号看详情
         user_id = event.get_sender_id()
         state = self._get_user_search_state(user_id)
+        self._cancel_page_feed(state)
+        self._cancel_prefetch(state)
         state.update({
             "keyword": "三江推荐",
             "source": "qidian",
-            "full_pool": books, # 三江不需要翻页，直接放入全量池
+            "full_pool": list(books), # 三江不需要翻页，直接放入全量池（复制一份，结果可能被并发请求共享）
             "results": books,
             "cached_pages": {1: books},
             "current_page": 1,
@@ -388,6 +668,92 @@ class WebnovelInfoPlugin(Star):
 
 
 
+    @filter.command("网文统计", alias={'wnstats'})
+    async def stats_handler(self, event: AstrMessageEvent):
+        """查看运行统计（站点限流、熔断、缓存等）"""
+        host_stats = self.rate_limiter.stats()
+        msg = "📊 【站点限流统计】\n"
+        if not host_stats:
+            msg += "    暂无请求\n"
+        for host, st in sorted(host_stats.items()):
+            msg += (f"{host}\n"
+                    f"    请求 {st['requests']} | 平均排队 {st['avg_wait'] * 1000:.0f}ms | 最长排队 {st['max_wait'] * 1000:.0f}ms\n"
+                    f"    进行中 {st['inflight']} | 排队中 {st['waiting']}\n")
+
+        msg += "\n🧯 【平台熔断】\n"
+        state_names = {"closed": "正常", "open": "熔断中", "half_open": "试探恢复"}
+        for name, breaker in self.source_manager.breakers.items():
+            bs = breaker.snapshot()
+            line = f"    {PLATFORM_NAMES.get(name, name)}: {state_names[bs['state']]} | 近期失败 {bs['recent_failures']} | 已拒绝 {bs['rejected']}"
+            if bs['state'] == "open":
+                line += f" | {bs['retry_in']:.0f}s 后试探"
+            msg += line + "\n"
+
+        tomato = self.source_manager.get_source("tomato")
+        if tomato.api_bases:
+            msg += "\n🍅 【番茄 API】\n"
+            for base, st in tomato.router.stats().items():
+                p50 = f"{st['p50'] * 1000:.0f}ms" if st['p50'] is not None else "-"
+                p95 = f"{st['p95'] * 1000:.0f}ms" if st['p95'] is not None else "-"
+                state = "正常" if st['healthy'] else "已摘除"
+                msg += f"{base}\n    {state} | p50 {p50} | p95 {p95} | 错误率 {st['error_rate'] * 100:.0f}%\n"
+
+        fs = self.source_manager.flights.stats()
+        msg += f"\n🔀 【请求合并】\n    实际请求 {fs['executed']} | 合并复用 {fs['shared']} | 进行中 {fs['inflight']}\n"
+
+        if self.response_cache:
+            cs = self.response_cache.stats()
+            msg += (f"\n💾 【响应缓存】\n"
+                    f"    条目 {cs['entries']} | 占用 {cs['bytes'] / 1024 / 1024:.1f}MB\n"
+                    f"    命中 {cs['hits']} | 验证未变 {cs['revalidated']} | 未命中 {cs['misses']}\n")
+
+        ps = self.prefetcher.stats()
+        msg += "\n⏭️ 【翻页预取】\n"
+        if not (ps["scheduled"] or ps["skipped"]):
+            msg += "    暂无预取\n"
+        else:
+            msg += (f"    发起 {ps['scheduled']} | 成功 {ps['fetched']} | 被使用 {ps['used']} | 未使用丢弃 {ps['wasted']}\n"
+                    f"    超出预算跳过 {ps['skipped']} | 进行中 {ps['inflight']}\n")
+        msg += "\n📖 【详情预取】\n"
+        if not (ps["detail_fetched"] or ps["detail_busy"]):
+            msg += "    暂无预取\n"
+        else:
+            msg += f"    预取 {ps['detail_fetched']} | 被查看 {ps['detail_used']} | 站点繁忙放弃 {ps['detail_busy']}\n"
+
+        if self.catalog is not None:
+            cs = self.catalog.stats()
+            msg += (f"\n📚 【本地书目】\n"
+                    f"    收录 {cs['books']} 本 | 索引词 {cs['grams']}\n"
+                    f"    命中 {cs['hits']} | 上游不可用兜底 {cs['fallbacks']}\n")
+
+        if self.metadata_store is not None:
+            ms = self.metadata_store.stats()
+            msg += (f"\n🗄️ 【详情库】\n"
+                    f"    记录 {ms['rows']} | 命中 {ms['hits']} | 字段过期 {ms['stale']} | 未收录 {ms['misses']}\n"
+                    f"    上游不可用时展示缓存 {ms['served_stale']}\n")
+
+        if self.search_cache:
+            ss = self.search_cache.stats()
+            msg += (f"\n🔎 【搜索缓存】\n"
+                    f"    条目 {ss['entries']} | 占用 {ss['bytes'] / 1024 / 1024:.1f}MB\n"
+                    f"    命中 {ss['hits']} | 未命中 {ss['misses']} | 淘汰 {ss['evicted']}\n")
+
+        loop_stats = self.offloader.stats()
+        msg += "\n⏱️ 【解析阻塞】\n"
+        if not loop_stats:
+            msg += "    暂无解析记录\n"
+        else:
+            for command, st in sorted(loop_stats.items()):
+                msg += (f"    {command}: 主循环解析 {st['inline']} 次，累计阻塞 {st['blocked'] * 1000:.0f}ms"
+                        f"（单次最长 {st['max_blocked'] * 1000:.1f}ms，单条指令最长 {st['max_command_blocked'] * 1000:.1f}ms）"
+                        f" | 工作池 {st['offloaded']} 次\n")
+
+        if self.http.replay_url is not None:
+            msg += f"\n🧪 【回放模式】\n    上游: {self.http.replay_url}\n"
+        elif self.recorder:
+            msg += f"\n🧪 【录制中】\n    已录制 {self.recorder.recorded} 个响应\n"
+        yield event.plain_result(msg.strip())
+
     @filter.command("添加书架", alias={'加书架'})
     async def add_to_bookshelf(self, event: AstrMessageEvent):
         """添加书籍到书架"""
@@ -466,9 +832,8 @@ class WebnovelInfoPlugin(Star):
             target = self.bookshelf_manager.get_book_by_index(user_id, idx)
             if target:
                 state["last_viewed"] = target
-                details = await self.source_manager.get_source(target['origin']).get_book_details(target["url"])
-                if details:
-                    yield event.chain_result(await self._format_book_details(details))
+                async for result in self._detail_results(event, target['origin'], target["url"], self._deadline("shelf")):
+                    yield result
                 return
             else:
                 yield event.plain_result(f"❌ 书架中没有序号为 {idx} 的书籍。")
@@ -529,7 +894,7 @@ class WebnovelInfoPlugin(Star):
         
         yield event.plain_result(msg.strip())
 
-    async def _get_page_data(self, state, source_name, keyword, target_page):
+    async def _get_page_data(self, state, source_name, keyword, target_page, deadline=None):
         """获取指定页码数据（优先读取缓存）
         
         Args:
@@ -537,17 +902,20 @@ class WebnovelInfoPlugin(Star):
             source_name: 数据源名称（qidian/ciweimao/tomato）
             keyword: 搜索关键词
             target_page: 目标页码
+            deadline: 指令延迟预算
         
         Returns:
             list: 该页码的书籍列表
         """
         # 缓存命中：直接返回
         if target_page in state["cached_pages"]:
+            if target_page in state["prefetched_pages"]:
+                state["prefetched_pages"].discard(target_page)
+                self.prefetcher.used += 1
             return state["cached_pages"][target_page]
         
         # 缓存未命中：拉取数据并缓存
-        source = self.source_manager.get_source(source_name)
-        res = await source.search_book(keyword, page=target_page, return_metadata=True)
+        res = await self.source_manager.search_book(source_name, keyword, page=target_page, return_metadata=True, deadline=deadline)
         page_data = res.get("books", [])
         state["cached_pages"][target_page] = page_data
         return page_data
@@ -573,6 +941,7 @@ class WebnovelInfoPlugin(Star):
         user_id = event.get_sender_id()
         action = parts[1]
         state = self._get_user_search_state(user_id)
+        deadline = self._deadline(cmd_alias)
 
         # 1. 序号查询：查看当前搜索结果池的书籍详情 (e.g. /qd 1)
         if action.isdigit() and len(parts) == 2:
@@ -589,15 +958,21 @@ class WebnovelInfoPlugin(Star):
             if not state["keyword"] or state["source"] != source_name:
                 yield event.plain_result(f"❌ 请先使用 /{cmd_alias} 搜索一本书。")
                 return
+            if target_page > state["max_pages"]:
+                await self._drain_page_feed(state, deadline)
             if target_page > state["max_pages"]:
                 yield event.plain_result(f"🤔 序号 {seq} 不在当前结果中。")
                 return
             
-            # 获取目标页数据
-            if target_page in state["cached_pages"]:
-                page_data = state["cached_pages"][target_page]
-            else:
-                page_data = await self._get_page_data(state, source_name, state["keyword"], target_page)
+            # 获取目标页数据（优先读取页码缓存）
+            try:
+                page_data = await self._get_page_data(state, source_name, state["keyword"], target_page, deadline)
+            except SourceUnavailableError:
+                yield event.plain_result(f"⚠️ {platform_name} 暂时无法访问，请稍后再试。")
+                return
+            except DeadlineExceeded:
+                yield event.plain_result(f"⏱️ {platform_name} 响应超时，请稍后再试。")
+                return
             
             if not page_data or page_inner_idx >= len(page_data):
                 yield event.plain_result(f"🤔 序号 {seq} 不在当前结果中。")
@@ -606,9 +981,8 @@ class WebnovelInfoPlugin(Star):
             # 查询并返回书籍详情
             target_book = page_data[page_inner_idx]
             state["last_viewed"] = target_book # 记录最近查看
-            details = await self.source_manager.get_source(source_name).get_book_details(target_book["url"])
-            if details:
-                yield event.chain_result(await self._format_book_details(details))
+            async for result in self._detail_results(event, source_name, target_book["url"], deadline):
+                yield result
             return
 
         # 2. 翻页操作 (e.g. /qd 下一页)
@@ -618,20 +992,32 @@ class WebnovelInfoPlugin(Star):
                 return
             
             next_p = state["current_page"] + (1 if action == "下一页" else -1)
+            if next_p > state["max_pages"]:
+                await self._drain_page_feed(state, deadline)
             if next_p < 1 or next_p > state["max_pages"]:
                 yield event.plain_result("➡️ 已经没有更多了。")
                 return
             
             # 获取翻页数据
-            page_data = await self._get_page_data(state, source_name, state["keyword"], next_p)
+            try:
+                page_data = await self._get_page_data(state, source_name, state["keyword"], next_p, deadline)
+            except SourceUnavailableError:
+                yield event.plain_result(f"⚠️ {platform_name} 暂时无法访问，请稍后再试。")
+                return
+            except DeadlineExceeded:
+                yield event.plain_result(f"⏱️ {platform_name} 响应超时，请稍后再试。")
+                return
             state["current_page"] = next_p
             state["results"] = page_data
             
             # 发送翻页结果
             yield event.plain_result(self._build_search_message(
                 state["keyword"], next_p, state["max_pages"], 
-                page_data, cmd_alias, self.page_size, source_name
+                page_data, cmd_alias, self.page_size, source_name,
+                more_pending=self._feed_pending(state)
             ))
+            self._prefetch_next_page(state, source_name, cmd_alias, next_p + 1)
+            self._prefetch_details(state, source_name, page_data)
             return
 
         # 3. 首次搜索逻辑 或 直接查看详情 (e.g. /qd 诡秘之主 或 /qd 诡秘之主 1)
@@ -645,34 +1031,44 @@ class WebnovelInfoPlugin(Star):
                 book_name = " ".join(parts[1:])
         else:
             book_name = " ".join(parts[1:])
+        book_name = self.canonicalizer.query(book_name)
 
         yield event.plain_result(f"🔍 正在{platform_name}搜索“{book_name}”...") 
+        # 本地书目中已有的结果先行展示，实时结果随后送达
+        if direct_index is None and self.catalog is not None and self.catalog_instant \
+                and not self.source_manager.has_cached_search(source_name, book_name, 1, True):
+            cached_books = self.catalog.search(book_name, origins={source_name}, limit=self.page_size)
+            if cached_books:
+                yield event.plain_result(self._build_catalog_message(book_name, cached_books, cmd_alias))
         try:
-            # 拉取第一页数据
-            source = self.source_manager.get_source(source_name)
-            res = await source.search_book(book_name, page=1, return_metadata=True)
+            # 拉取第一页数据（起点拿到第 1 页即返回，其余分页在后台并发拉取）
+            extra = {"stream": True} if source_name == "qidian" else {}
+            res = await self.source_manager.search_book(source_name, book_name, page=1, return_metadata=True, deadline=deadline, **extra)
             
             # 无结果提示
             if not res or not res.get("books"):
+                if self._catalog_fallback(state, source_name, book_name):
+                    yield event.plain_result(f"⚠️ {platform_name}未返回结果，以下为本地书目中的缓存结果：\n" + self._build_search_message(
+                        book_name, 1, state["max_pages"], state["results"], cmd_alias, self.page_size, source_name))
+                    return
                 yield event.plain_result(f"在{platform_name}找不到“{book_name}”。")
                 return
             
-            # 处理起点返回的100条数据
             first_page_data = res.get("books", [])
             
             # 清空旧的缓存页面，防止跨搜索/跨平台数据污染
             state["cached_pages"].clear()
+            self._cancel_page_feed(state)
+            self._cancel_prefetch(state)
             
             if source_name == "qidian":
-                # 起点一次性返回100条，全部存入single_pool
-                state["single_pool"] = first_page_data
-                # 计算总页数（10条/页）
-                state["max_pages"] = (len(first_page_data) + self.page_size - 1) // self.page_size
-                # 缓存所有分页数据
-                for i in range(state["max_pages"]):
-                    start = i * self.page_size
-                    end = start + self.page_size
-                    state["cached_pages"][i+1] = first_page_data[start:end]
+                # 起点结果全部存入single_pool，后续分页到达后继续并入
+                self._set_single_pool(state, first_page_data)
+                feed = res.get("feed")
+                if feed is not None:
+                    feed.hold()
+                    state["page_feed"] = feed
+                    state["page_feed_task"] = self._spawn(self._merge_page_feed(state, feed))
             else:
                 state["max_pages"] = res.get("max_pages", 1)
                 state["cached_pages"][1] = first_page_data
@@ -688,12 +1084,14 @@ class WebnovelInfoPlugin(Star):
 
             # 如果是直接查看详情模式
             if direct_index is not None:
+                if direct_index > len(first_page_data) and source_name == "qidian":
+                    await self._drain_page_feed(state, deadline)
+                    first_page_data = state["single_pool"]
                 if 1 <= direct_index <= len(first_page_data):
                     target_book = first_page_data[direct_index - 1]
                     state["last_viewed"] = target_book
-                    details = await self.source_manager.get_source(source_name).get_book_details(target_book["url"])
-                    if details:
-                        yield event.chain_result(await self._format_book_details(details))
+                    async for result in self._detail_results(event, source_name, target_book["url"], deadline):
+                        yield result
                     return
                 else:
                     yield event.plain_result(f"⚠️ 序号 {direct_index} 超出结果范围 (1-{len(first_page_data)})，将显示搜索列表。")
@@ -701,13 +1099,192 @@ class WebnovelInfoPlugin(Star):
             # 发送第一页结果
             yield event.plain_result(self._build_search_message(
                 book_name, 1, state["max_pages"], 
-                first_page_data[:self.page_size], cmd_alias, self.page_size, source_name
+                first_page_data[:self.page_size], cmd_alias, self.page_size, source_name,
+                more_pending=self._feed_pending(state)
             ))
+            self._prefetch_next_page(state, source_name, cmd_alias, 2)
+            self._prefetch_details(state, source_name, first_page_data[:self.page_size])
+        except (SourceUnavailableError, DeadlineExceeded) as e:
+            reason = "暂时无法访问" if isinstance(e, SourceUnavailableError) else "响应超时"
+            if self._catalog_fallback(state, source_name, book_name):
+                yield event.plain_result(f"⚠️ {platform_name} {reason}，以下为本地书目中的缓存结果：\n" + self._build_search_message(
+                    book_name, 1, state["max_pages"], state["results"], cmd_alias, self.page_size, source_name))
+            elif isinstance(e, SourceUnavailableError):
+                yield event.plain_result(f"⚠️ {platform_name} 暂时无法访问，请稍后再试。")
+            else:
+                yield event.plain_result(f"⏱️ {platform_name} 响应超时，请稍后再试。")
         except Exception as e:
             logger.error(f"{platform_name} Search Error: {e}")
             yield event.plain_result("⚠️ 搜索失败。")
 
-    def _build_search_message(self, keyword, current_page, max_pages, results, cmd_alias, page_size, source_name=None):
+    def _catalog_fallback(self, state, source_name, keyword) -> bool:
+        """上游无法返回结果时，用本地书目中的书籍作为本次搜索的结果池"""
+        if self.catalog is None:
+            return False
+        books = self.catalog.search(keyword, origins={source_name})
+        if not books:
+            return False
+        self.catalog.fallbacks += 1
+        self._cancel_page_feed(state)
+        self._cancel_prefetch(state)
+        self._set_single_pool(state, books)
+        state.update({
+            "keyword": keyword,
+            "current_page": 1,
+            "source": source_name,
+            "results": books[:self.page_size],
+            "last_viewed": None
+        })
+        return True
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """启动后台任务，插件卸载时统一取消"""
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _set_single_pool(self, state, books):
+        """更新单平台结果池并按每页条数重建页码缓存"""
+        state["single_pool"] = books
+        state["max_pages"] = (len(books) + self.page_size - 1) // self.page_size
+        state["cached_pages"] = {
+            i + 1: books[i * self.page_size:(i + 1) * self.page_size] for i in range(state["max_pages"])
+        }
+
+    async def _merge_page_feed(self, state, feed):
+        """把后台拉取到的后续分页按页码顺序追加到用户结果池，已显示的序号保持不变"""
+        async for _, records in feed:
+            if state["page_feed_task"] is not asyncio.current_task():
+                return  # 用户已发起新的搜索
+            self._set_single_pool(state, state["single_pool"] + records)
+
+    def _feed_pending(self, state) -> bool:
+        task = state.get("page_feed_task")
+        return task is not None and not task.done()
+
+    async def _drain_page_feed(self, state, deadline=None):
+        """等待后台分页并入完成（不超过指令剩余预算）"""
+        if not self._feed_pending(state):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(state["page_feed_task"]), deadline.remaining() if deadline else None)
+        except asyncio.TimeoutError:
+            logger.debug("[分页] 等待后续分页超时，使用已到达的结果")
+
+    def _cancel_page_feed(self, state):
+        """停止并入后台分页；没有其他用户在等待同一个 PageFeed 时一并停止拉取"""
+        if self._feed_pending(state):
+            state["page_feed_task"].cancel()
+        state["page_feed_task"] = None
+        if state.get("page_feed") is not None:
+            state["page_feed"].release()
+            state["page_feed"] = None
+
+    def _prefetch_next_page(self, state, source_name, cmd_alias, page):
+        """页面展示后在后台预取下一页（起点由 PageFeed 拉取全部分页，不需要预取）"""
+        if source_name == "qidian" or page > state["max_pages"] or page in state["cached_pages"]:
+            return
+        if state.get("prefetch_task") is not None and not state["prefetch_task"].done():
+            return
+        budget = self.command_budgets.get(cmd_alias) or DEFAULT_COMMAND_BUDGETS.get(cmd_alias, 15)
+        keyword = state["keyword"]
+        state["prefetch_task"] = self.prefetcher.schedule(
+            source_name, lambda: self._prefetch_page(state, source_name, keyword, page, Deadline(float(budget), "prefetch")))
+
+    async def _prefetch_page(self, state, source_name, keyword, page, deadline):
+        res = await self.source_manager.search_book(source_name, keyword, page=page, return_metadata=True, deadline=deadline)
+        books = res.get("books", []) if res else []
+        # 用户已发起新的搜索时丢弃结果
+        if not books or state.get("prefetch_task") is not asyncio.current_task():
+            return
+        state["cached_pages"][page] = books
+        state["prefetched_pages"].add(page)
+        self.prefetcher.fetched += 1
+
+    def _prefetch_details(self, state, source_name, books):
+        """预取当前页前几条结果的详情与封面；source_name 为 None 时按每本书的来源"""
+        if self.detail_prefetch_top <= 0 or not books:
+            return
+        task = state.get("detail_prefetch_task")
+        if task is not None and not task.done():
+            task.cancel()
+        targets = [(source_name or b.get("origin"), b["url"]) for b in books[:self.detail_prefetch_top] if b.get("url")]
+        state["detail_prefetch_task"] = self._spawn(self._run_detail_prefetch(targets))
+
+    async def _run_detail_prefetch(self, targets):
+        """依次预取详情；站点没有富余配额时放弃，不与用户的请求争抢"""
+        for source_name, book_url in targets:
+            key = (source_name, book_url)
+            if key in self.detail_cache or not self.source_manager.is_available(source_name):
+                continue
+            if not self.rate_limiter.has_spare(URL(book_url).host):
+                self.prefetcher.detail_busy += 1
+                continue
+            budget = DEFAULT_COMMAND_BUDGETS.get("ss", 15)
+            deadline = Deadline(float(budget), "prefetch")
+            try:
+                details = await self.source_manager.get_book_details(source_name, book_url, deadline=deadline)
+            except Exception as e:
+                logger.debug(f"[预取] 详情预取失败 {book_url}: {e}")
+                continue
+            if not details:
+                continue
+            self.detail_cache.put(key, source_name, details)
+            self.prefetcher.detail_fetched += 1
+            cover_url = details.get("cover")
+            if cover_url and cover_url != "无" and self.rate_limiter.has_spare(URL(cover_url).host):
+                await self._download_cover(cover_url, deadline)
+
+    def _cancel_prefetch(self, state):
+        for name in ("prefetch_task", "detail_prefetch_task"):
+            task = state.get(name)
+            if task is not None and not task.done():
+                task.cancel()
+            state[name] = None
+        self.prefetcher.wasted += len(state.get("prefetched_pages", ()))
+        state["prefetched_pages"] = set()
+
+    async def _detail_results(self, event: AstrMessageEvent, source_name: str, book_url: str, deadline=None):
+        """获取并输出书籍详情，数据源熔断或超时时给出提示
+        
+        Args:
+            event: 消息事件对象
+            source_name: 数据源名称
+            book_url: 书籍链接
+            deadline: 指令延迟预算
+        
+        Yields:
+            详情消息链/提示信息
+        """
+        platform_name = PLATFORM_NAMES.get(source_name, source_name)
+        details = self.detail_cache.get((source_name, book_url))
+        if details is not None:
+            self.prefetcher.detail_used += 1
+            yield event.chain_result(await self._format_book_details(details, deadline))
+            return
+        error = None
+        try:
+            details = await self.source_manager.get_book_details(source_name, book_url, deadline=deadline)
+        except (SourceUnavailableError, DeadlineExceeded) as e:
+            details, error = None, e
+        if details:
+            yield event.chain_result(await self._format_book_details(details, deadline))
+            return
+        # 上游不可用或请求失败（数据源返回 None）时展示详情库中的过期记录
+        stored = self.metadata_store.get_stale(source_name, book_url) if self.metadata_store is not None else None
+        if stored is not None:
+            details, fetched_at = stored
+            yield event.chain_result(await self._format_book_details(details, deadline))
+            yield event.plain_result(
+                f"⚠️ {platform_name} 暂时无法获取最新信息，以上为 {time.strftime('%m-%d %H:%M', time.localtime(fetched_at))} 的缓存。")
+        elif isinstance(error, SourceUnavailableError):
+            yield event.plain_result(f"⚠️ {platform_name} 暂时无法访问，请稍后再试。")
+        elif isinstance(error, DeadlineExceeded):
+            yield event.plain_result(f"⏱️ {platform_name} 响应超时，请稍后再试。")
+
+    def _build_search_message(self, keyword, current_page, max_pages, results, cmd_alias, page_size, source_name=None,
+                              more_pending=False):
         """构建单平台搜索结果消息
         
         Args:
@@ -718,6 +1295,7 @@ class WebnovelInfoPlugin(Star):
             cmd_alias: 指令别名
             page_size: 每页条数
             source_name: 数据源名称
+            more_pending: 后续分页是否仍在后台拉取（总页数未定）
         
         Returns:
             str: 格式化后的搜索结果消息
@@ -725,7 +1303,7 @@ class WebnovelInfoPlugin(Star):
         # 计算起始序号
         start_num = (current_page - 1) * page_size + 1
         
-        if source_name == 'faloo':
+        if source_name == 'faloo' or more_pending:
             msg = f"以下是【{keyword}】的第 {current_page} 页搜索结果：\n"
         else:
             msg = f"以下是【{keyword}】的第 {current_page}/{max_pages} 页搜索结果：\n"
@@ -738,7 +1316,7 @@ class WebnovelInfoPlugin(Star):
         flip_tips = []
         if current_page > 1:
             flip_tips.append(f"/{cmd_alias} 上一页")
-        if current_page < max_pages:
+        if current_page < max_pages or more_pending:
             flip_tips.append(f"/{cmd_alias} 下一页")
         
         if flip_tips:
@@ -746,6 +1324,15 @@ class WebnovelInfoPlugin(Star):
         
         return msg
 
+    def _build_catalog_message(self, keyword, books, cmd_alias):
+        """本地书目先行展示的消息（序号以随后送达的实时结果为准）"""
+        msg = f"📚 本地书目中与【{keyword}】相关的书籍（缓存，实时结果稍后送达）：\n"
+        for b in books:
+            tag = f"[{PLATFORM_NAMES.get(b.get('origin'), '未知')}] " if cmd_alias == "ss" else ""
+            msg += f"· {b['name']}\n    {tag}作者：{b.get('author') or '未知'}\n"
+        msg += f"\n💡 `/{cmd_alias} <序号>` 请以实时结果中的序号为准"
+        return msg
+
     def _truncate_trial_content(self, content):
         """截断试读内容（超出长度限制添加省略号）
         
@@ -766,39 +1353,46 @@ class WebnovelInfoPlugin(Star):
             truncated = truncated[:-1]
         return f"{truncated}……"
 
-    async def _format_book_details(self, details):
+    async def _download_cover(self, cover_url, deadline=None):
+        """下载封面图片，优先使用预取的结果；失败时返回 None"""
+        cached = self.detail_cache.get(("cover", cover_url))
+        if cached is not None:
+            return cached
+        try:
+            # 针对番茄小说的 URL 使用 encoded=True，防止 aiohttp 对已签名的 URL 进行二次编码
+            # 番茄封面通常包含签名信息，二次编码会导致 403
+            is_tomato = "p3-novel.byteimg.com" in cover_url or "p6-novel.byteimg.com" in cover_url or "p9-novel.byteimg.com" in cover_url
+            
+            with deadline_scope(deadline):
+                resp = await self.http.get(cover_url, timeout=15, encoded=is_tomato)
+            if resp.status == 200:
+                if resp.body:
+                    self.detail_cache.put(("cover", cover_url), "cover", resp.body)
+                    return resp.body
+                logger.warning(f"封面图片数据为空: {cover_url}")
+            else:
+                logger.warning(f"封面下载失败，状态码: {resp.status}, URL: {cover_url}")
+        except Exception as e:
+            logger.error(f"封面下载异常: {type(e).__name__} - {e}, URL: {cover_url}")
+        return None
+
+    async def _format_book_details(self, details, deadline=None):
         """格式化书籍详情消息（含封面、基础信息、试读内容）
         
         Args:
             details: 书籍详情字典
+            deadline: 指令延迟预算，剩余时间不足时不再下载封面
         
         Returns:
             list: 消息链（图片+文本）
         """
         chain = []
-        # 处理封面图片（base64编码）
-        if details.get("cover") and details["cover"] not in ["无", None]:
-            cover_url = details["cover"]
-            try:
-                session = await self.get_session()
-                # 针对番茄小说的 URL 使用 encoded=True，防止 aiohttp 对已签名的 URL 进行二次编码
-                # 番茄封面通常包含签名信息，二次编码会导致 403
-                is_tomato = "p3-novel.byteimg.com" in cover_url or "p6-novel.byteimg.com" in cover_url or "p9-novel.byteimg.com" in cover_url
-                
-                request_url = URL(cover_url, encoded=True) if is_tomato else cover_url
-                
-                async with session.get(request_url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                    if resp.status == 200:
-                        image_bytes = await resp.read()
-                        if image_bytes:
-                            base64_str = base64.b64encode(image_bytes).decode()
-                            chain.append(Comp.Image(file=f"base64://{base64_str}"))
-                        else:
-                            logger.warning(f"封面图片数据为空: {cover_url}")
-                    else:
-                        logger.warning(f"封面下载失败，状态码: {resp.status}, URL: {cover_url}")
-            except Exception as e:
-                logger.error(f"封面下载异常: {type(e).__name__} - {e}, URL: {cover_url}")
+        # 处理封面图片（base64编码），封面为可选内容，预算不足时直接跳过
+        if details.get("cover") and details["cover"] not in ["无", None] and (deadline is None or deadline.allows(1)):
+            image_bytes = await self._download_cover(details["cover"], deadline)
+            if image_bytes:
+                base64_str = base64.b64encode(image_bytes).decode()
+                chain.append(Comp.Image(file=f"base64://{base64_str}"))
         
         # 构建基础信息
         msg = f"---【{details['name']}】---\n✍️ 作者: {details['author']}\n"
@@ -904,9 +1498,12 @@ class WebnovelInfoPlugin(Star):
 
     async def terminate(self):
         """插件卸载回调"""
-        # 关闭持久化会话
-        if self._session and not self._session.closed:
-            await self._session.close()
+        # 停止后台任务、数据源后台任务并关闭共享连接池
+        for task in list(self._background_tasks):
+            task.cancel()
+        self.prefetcher.close()
+        await self.source_manager.close()
+        await self.http.close()
         # 清理缓存，释放内存
         self.user_search_state.clear()
         logger.info("网文搜索助手插件卸载，缓存已清理")
\ No newline at end of file
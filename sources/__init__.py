@@ -1,12 +1,33 @@
+import asyncio
+import time
+import weakref
 from .qidian_source import QidianSource
 from .ciweimao_source import CiweimaoSource
 from .tomato_source import TomatoSource
 from .sfacg_source import SfacgSource
 from .faloo_source import FalooSource
 from .qimao_source import QiMaoSource
+from ..core.single_flight import SingleFlight
+from ..core.circuit_breaker import CircuitBreaker, SourceUnavailableError
+from ..core.deadline import DeadlineExceeded, deadline_scope
+from ..core.text_norm import KeywordCanonicalizer
+from ..core.endpoint_router import EndpointHealth
 
 class SourceManager:
-    def __init__(self):
+    DEADLINE_GRACE = 0.5
+    BUDGET_MIN_SAMPLES = 5  # 样本不足时不限制单个数据源的搜索耗时
+    BUDGET_FLOOR = 1.0      # 单个数据源搜索预算的下限（秒）
+
+    def __init__(self, http_client, detail_cache_ttl: int = 600, offloader=None, search_cache=None, canonicalizer=None,
+                 budget_factor: float = 1.5, catalog=None, metadata_store=None):
+        self.http = http_client
+        self.offloader = offloader
+        self.search_cache = search_cache  # 跨用户共享的搜索结果缓存（SearchCache）
+        self.canonicalizer = canonicalizer or KeywordCanonicalizer()
+        self.catalog = catalog  # 本地书目（BookCatalog），自动收录上游返回的书籍
+        self.metadata_store = metadata_store  # 持久化的书籍详情（MetadataStore）
+        self._cache_tasks = set()
+        self._feeds = weakref.WeakSet()  # 仍可能在后台拉取分页的 PageFeed
         self.sources = {
             "qidian": QidianSource(),
             "ciweimao": CiweimaoSource(),
@@ -15,6 +36,193 @@ class SourceManager:
             "faloo": FalooSource(),
             "qimao": QiMaoSource(),
         }
+        # 所有数据源共用插件持有的连接池，各自的请求结果回报给各自的熔断器
+        self.breakers = {name: CircuitBreaker() for name in self.sources}
+        for name, source in self.sources.items():
+            source.http = http_client.bind(self.breakers[name])
+            source.detail_cache_ttl = detail_cache_ttl
+            source.offloader = offloader
+        # 相同 (数据源, 操作, 参数) 的并发请求只向上游发一次
+        self.flights = SingleFlight()
+        # 各数据源最近的搜索耗时，聚合搜索据此为每个平台分配延迟预算
+        self.search_latency = {name: EndpointHealth() for name in self.sources}
+        self.budget_factor = budget_factor
     
     def get_source(self, source_name: str):
-        return self.sources.get(source_name)
\ No newline at end of file
+        return self.sources.get(source_name)
+
+    @staticmethod
+    def _normalize_arg(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        return value
+
+    def is_available(self, source_name: str) -> bool:
+        """数据源是否可调用（熔断器未打开）"""
+        return self.breakers[source_name].available()
+
+    def search_budget(self, source_name: str):
+        """数据源的搜索延迟预算，样本不足时返回 None（不限制）
+
+        以最近成功搜索耗时的 p90 × budget_factor 为基础，再按近期超出预算的比例放宽：
+        超时的搜索没有真实耗时可记，只记为一次超时，持续超时的数据源预算会逐步变宽。
+        """
+        health = self.search_latency[source_name]
+        if len(health.latencies) < self.BUDGET_MIN_SAMPLES:
+            return None
+        return max(self.BUDGET_FLOOR, health.percentile(0.9) * self.budget_factor * (1 + health.error_rate))
+
+    async def _timed_search(self, source_name: str, keyword: str, page: int, return_metadata: bool, deadline, **kwargs):
+        """向上游搜索并记录耗时；超出预算的搜索只记为超时，熔断等其他异常不计入"""
+        start = time.monotonic()
+        try:
+            result = await self.call(source_name, "search_book", keyword, page=page, return_metadata=return_metadata, deadline=deadline, **kwargs)
+        except DeadlineExceeded:
+            self.search_latency[source_name].record(0.0, False)
+            raise
+        self.search_latency[source_name].record(time.monotonic() - start, True)
+        feed = result.get("feed") if isinstance(result, dict) else None
+        if feed is not None:
+            self._feeds.add(feed)
+        if self.catalog is not None:
+            self._catalog_search(result)
+        return result
+
+    def _catalog_search(self, result):
+        books = result.get("books") if isinstance(result, dict) else result
+        if books:
+            self.catalog.add(books)
+        feed = result.get("feed") if isinstance(result, dict) else None
+        if feed is not None:
+            # 后台拉取的后续分页到齐后一并收录
+            task = asyncio.ensure_future(self._catalog_when_complete(feed))
+            self._cache_tasks.add(task)
+            task.add_done_callback(self._cache_tasks.discard)
+
+    async def _catalog_when_complete(self, feed):
+        records = await feed.wait()
+        if records:
+            self.catalog.add(records)
+
+    def has_cached_search(self, source_name: str, keyword: str, page: int = 1, return_metadata: bool = False) -> bool:
+        """共享缓存中是否已有该搜索的有效结果（有则无需展示本地书目）"""
+        if self.search_cache is None:
+            return False
+        keyword = self.canonicalizer.query(keyword)
+        return (source_name, self.canonicalizer.key(keyword), page, return_metadata) in self.search_cache
+
+    async def call(self, source_name: str, operation: str, *args, deadline=None, **kwargs):
+        """调用数据源方法，并发的相同调用共享同一次上游请求
+
+        传入 deadline 时，数据源发出的每个子请求只能使用该预算的剩余时间。
+
+        Raises:
+            SourceUnavailableError: 数据源熔断中
+            DeadlineExceeded: 预算耗尽仍未得到结果
+        """
+        source = self.get_source(source_name)
+        key = (
+            source_name,
+            operation,
+            tuple(self._normalize_arg(a) for a in args),
+            tuple(sorted((k, self._normalize_arg(v)) for k, v in kwargs.items())),
+        )
+        breaker = self.breakers[source_name]
+        took_probe = False
+        if key not in self.flights:
+            # 已在进行中的相同调用直接合并，不再重复判断熔断
+            if not breaker.allow():
+                raise SourceUnavailableError(source_name)
+            took_probe = breaker.state == breaker.HALF_OPEN
+        try:
+            with deadline_scope(deadline):
+                work = self.flights.do(key, lambda: getattr(source, operation)(*args, **kwargs))
+                if deadline is None:
+                    return await work
+                # 合并到他人发起的调用时也不超出自己的预算；留少许余量让数据源先返回部分结果
+                try:
+                    return await asyncio.wait_for(work, deadline.remaining() + self.DEADLINE_GRACE)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded() from None
+        finally:
+            if took_probe:
+                breaker.end_probe()
+
+    async def search_book(self, source_name: str, keyword: str, page: int = 1, return_metadata: bool = False, deadline=None, **kwargs):
+        """搜索书籍；启用共享缓存时，有效期内相同 (数据源, 关键词, 页码) 的结果直接复用
+
+        关键词先经过规范化，各数据源收到的都是同一形式的查询串。
+        返回值可能被多个用户共享，调用方不得修改。
+        """
+        keyword = self.canonicalizer.query(keyword)
+        cache = self.search_cache
+        if cache is None:
+            return await self._timed_search(source_name, keyword, page, return_metadata, deadline, **kwargs)
+        key = (source_name, self.canonicalizer.key(keyword), page, return_metadata)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        result = await self._timed_search(source_name, keyword, page, return_metadata, deadline, **kwargs)
+        self._cache_search(key, source_name, result)
+        return result
+
+    def _cache_search(self, key, source_name, result):
+        books = result.get("books") if isinstance(result, dict) else result
+        if not books:
+            return  # 数据源出错时也会返回空结果，不缓存
+        feed = result.get("feed") if isinstance(result, dict) else None
+        if feed is None:
+            self.search_cache.put(key, source_name, result)
+            return
+        # 后续分页仍在后台拉取：全部到齐后再缓存合并后的完整结果
+        task = asyncio.ensure_future(self._cache_when_complete(key, source_name, result, feed))
+        self._cache_tasks.add(task)
+        task.add_done_callback(self._cache_tasks.discard)
+
+    async def _cache_when_complete(self, key, source_name, result, feed):
+        records = await feed.wait()
+        if not feed.complete:
+            return
+        books = result["books"] + records
+        full = {k: v for k, v in result.items() if k != "feed"}
+        full.update({"books": books, "total": len(books), "is_last": True})
+        self.search_cache.put(key, source_name, full)
+
+    async def get_book_details(self, source_name: str, book_url: str, deadline=None):
+        """获取书籍详情；详情库中的记录所有字段都未过期时不再请求上游"""
+        store = self.metadata_store
+        if store is not None:
+            details = store.get(source_name, book_url)
+            if details is not None:
+                return details
+        details = await self.call(source_name, "get_book_details", book_url, deadline=deadline)
+        # 剩余预算不足以请求试读时，数据源会跳过试读返回不完整的详情，这样的结果不落盘
+        complete = deadline is None or deadline.allows(self.get_source(source_name).trial_min_budget)
+        if store is not None and complete and isinstance(details, dict) and details.get("name"):
+            self._store_details(source_name, book_url, dict(details))
+        if self.catalog is not None and isinstance(details, dict) and details.get("name"):
+            self.catalog.add([dict(details, origin=details.get("origin") or source_name, url=details.get("url") or book_url)])
+        return details
+
+    def _store_details(self, source_name, book_url, details):
+        """详情落盘；有工作池时在后台线程中写入，不阻塞事件循环"""
+        if self.offloader is None:
+            self.metadata_store.put(source_name, book_url, details)
+            return
+        task = asyncio.ensure_future(self.offloader.run_io(self.metadata_store.put, source_name, book_url, details))
+        self._cache_tasks.add(task)
+        task.add_done_callback(self._cache_tasks.discard)
+
+    async def close(self):
+        """停止各数据源的后台任务与解析工作池"""
+        for task in self._cache_tasks:
+            task.cancel()
+        for feed in list(self._feeds):
+            feed.cancel()
+        for source in self.sources.values():
+            if hasattr(source, "close"):
+                await source.close()
+        if self.offloader is not None:
+            self.offloader.close()
+        if self.metadata_store is not None:
+            self.metadata_store.close()
\ No newline at end of file
@@ -3,6 +3,25 @@ from abc import ABC, abstractmethod
 
 class BaseSource(ABC):
     """Base class for all novel sources"""
+
+    # 由 SourceManager 注入的共享 HTTP 客户端
+    http = None
+    # 由 SourceManager 注入的解析工作池，为 None 时直接在事件循环上执行
+    offloader = None
+    # 响应缓存新鲜期（秒）：详情/目录页较易变化，章节正文基本不变
+    detail_cache_ttl = 600
+    chapter_cache_ttl = 86400
+    # 指令剩余预算低于此值（秒）时跳过试读等可选请求，优先按时返回基础信息
+    trial_min_budget = 2.0
+
+    async def parse(self, func, *args, size: int = 0):
+        """执行 CPU 密集的解析/解密函数，较大的输入交给工作池
+
+        func 须为模块级函数，以便进程池模式下序列化；size 为输入字节数。
+        """
+        if self.offloader is None:
+            return func(*args)
+        return await self.offloader.run(func, *args, size=size)
     
     @abstractmethod
     async def search_book(self, keyword: str):
@@ -1,9 +1,221 @@
-import aiohttp
+import asyncio
 import re
 import urllib.parse
-from bs4 import BeautifulSoup
 from astrbot.api import logger
 from .base_source import BaseSource
+from ..core.deadline import DeadlineExceeded, has_budget
+from ..core.html_engine import compile_selectors, parse, select, select_one, get_text
+
+_SEL = compile_selectors({
+    "search_items": ".novelList li",
+    "search_name": ".bl_r1_tit a",
+    "search_author": ".nl_r1_author a",
+    "search_cover": ".nl_r1 a img",
+    "search_intro": ".bl_r1_into a",
+    "search_word_count": ".nl_r2 i",
+    "name": ".name",
+    "author_links": ".color999 a",
+    "status": ".color999 .tag.textHide",
+    "tags": ".tagList a",
+    "cover": ".cover_box img",
+    "intro": "#novel_intro",
+    "last_chapter": ".newNode",
+    "count_text": ".countText",
+    "info": "ul.info",
+    "li": "li",
+    "rewards": ".reward li",
+    "span": "span",
+    "nav_links": ".display_flex_between a",
+    "catalog_links": ".v_nodeList li a",
+    "vip_mark": ".icon_close, img[src*=\"vip\"]",
+    "h1": "h1",
+    "title": ".title",
+    "chapter_body": ".nodeContent",
+    "p": "p",
+})
+
+def _parse_search(content_bytes):
+    """解码并解析搜索页，返回本页全部结果"""
+    # 读取二进制并解码
+    content = content_bytes.decode('gb18030', errors='ignore')
+    
+    root = parse(content)
+    results = []
+    
+    # 解析列表
+    items = select(root, _SEL["search_items"])
+    for item in items:
+        try:
+            name_tag = select_one(item, _SEL["search_name"])
+            if name_tag is None: continue
+            
+            author_tag = select_one(item, _SEL["search_author"])
+            cover_img = select_one(item, _SEL["search_cover"])
+            intro_tag = select_one(item, _SEL["search_intro"])
+            word_count_tag = select_one(item, _SEL["search_word_count"])
+            
+            href = name_tag.attrib['href']
+            if href.startswith('//'):
+                book_url = "https:" + href
+            elif href.startswith('/'):
+                book_url = "https://wap.faloo.com" + href
+            else:
+                book_url = href
+                
+            results.append({
+                'name': get_text(name_tag, strip=True),
+                'author': get_text(author_tag, strip=True) if author_tag is not None else "未知",
+                'url': book_url,
+                'origin': 'faloo',
+                'cover': cover_img.get('src') if cover_img is not None else None,
+                'intro': get_text(intro_tag, strip=True) if intro_tag is not None else None,
+                'word_count': get_text(word_count_tag, strip=True) if word_count_tag is not None else None,
+                'bid': re.search(r'(\d+)\.html', book_url).group(1) if re.search(r'(\d+)\.html', book_url) else None
+            })
+        except Exception as e:
+            continue
+    return results
+
+
+def _parse_detail(content_bytes, book_url):
+    """解码并解析详情页，返回 (基础信息, 目录页链接)"""
+    content = content_bytes.decode('gb18030', errors='ignore')
+    root = parse(content)
+    
+    book_info = {
+        "url": book_url,
+        "origin": "faloo"
+    }
+    
+    # Extract BID
+    match_bid = re.search(r'(\d+)\.html', book_url)
+    if match_bid:
+        book_info['bid'] = match_bid.group(1)
+    
+    # 1. 基本信息
+    name_tag = select_one(root, _SEL["name"])
+    if name_tag is not None: book_info['name'] = get_text(name_tag, strip=True)
+    
+    author_links = select(root, _SEL["author_links"])
+    if author_links:
+        book_info['author'] = get_text(author_links[0], strip=True)
+        if len(author_links) > 1:
+            book_info['category'] = get_text(author_links[1], strip=True)
+            
+    status_tag = select_one(root, _SEL["status"])
+    if status_tag is not None: book_info['status'] = get_text(status_tag, strip=True)
+    
+    tags = [get_text(a, strip=True) for a in select(root, _SEL["tags"])]
+    if tags: 
+        # Deduplicate tags while preserving order
+        book_info['tags'] = list(dict.fromkeys(tags))
+    
+    cover_img = select_one(root, _SEL["cover"])
+    if cover_img is not None: book_info['cover'] = cover_img.get('src')
+    
+    intro_p = select_one(root, _SEL["intro"])
+    if intro_p is not None: book_info['intro'] = get_text(intro_p, '\n', strip=True)
+    
+    last_chap = select_one(root, _SEL["last_chapter"])
+    if last_chap is not None: book_info['last_chapter'] = get_text(last_chap, strip=True)
+    
+    # Total Chapters
+    count_text = select_one(root, _SEL["count_text"])
+    if count_text is not None:
+        # Extract digits from "本书已更592章"
+        raw_count = get_text(count_text, strip=True)
+        match = re.search(r'(\d+)', raw_count)
+        if match:
+            book_info['total_chapters'] = match.group(1)
+        else:
+            book_info['total_chapters'] = raw_count
+
+    # 2. 统计信息
+    info_ul = select_one(root, _SEL["info"])
+    if info_ul is not None:
+        lis = select(info_ul, _SEL["li"])
+        for li in lis:
+            text = get_text(li, strip=True)
+            if '万字' in text:
+                parts = text.split('|')
+                if len(parts) >= 1: book_info['word_count'] = parts[0].strip()
+                if len(parts) >= 2: book_info['total_click'] = parts[1].strip()
+            if '更新时间：' in text:
+                book_info['last_update'] = text.replace('更新时间：', '').strip()
+            if '分' in text and '已评' in text:
+                # "9.4分 / 1912人已评"
+                raw_score = text.strip()
+                try:
+                    score_parts = raw_score.split('/')
+                    if len(score_parts) >= 1:
+                        book_info['rating'] = score_parts[0].replace('分', '').strip()
+                    if len(score_parts) >= 2:
+                        book_info['rating_users'] = score_parts[1].replace('人已评', '').strip()
+                except:
+                    book_info['rating'] = raw_score
+
+    # Reward Stats (Flowers, Tickets, etc.)
+    rewards = select(root, _SEL["rewards"])
+    if len(rewards) >= 4:
+        try:
+            book_info['reward_coin'] = get_text(select_one(rewards[0], _SEL["span"]), strip=True)
+            book_info['reward_flower'] = get_text(select_one(rewards[1], _SEL["span"]), strip=True)
+            book_info['reward_ticket'] = get_text(select_one(rewards[2], _SEL["span"]), strip=True)
+            book_info['reward_review'] = get_text(select_one(rewards[3], _SEL["span"]), strip=True)
+        except:
+            pass
+
+    nav_links = select(root, _SEL["nav_links"])
+    catalog_href = nav_links[1].attrib['href'] if len(nav_links) > 1 else None
+    return book_info, catalog_href
+
+
+def _parse_catalog(content_bytes):
+    """解码并解析目录页，返回第一个免费章节的地址"""
+    c_content = content_bytes.decode('gb18030', errors='ignore')
+    c_root = parse(c_content)
+
+    # 查找免费章节
+    chapter_url = None
+    chapters = select(c_root, _SEL["catalog_links"])
+    for link in chapters:
+        # 排除 VIP 章节 (通常有 icon_close 或 vip 图标)
+        if select_one(link, _SEL["vip_mark"]) is not None:
+            continue
+
+        c_href = link.get('href')
+        if c_href:
+            if c_href.startswith('//'):
+                chapter_url = "https:" + c_href
+            elif c_href.startswith('/'):
+                chapter_url = "https://wap.faloo.com" + c_href
+            else:
+                chapter_url = c_href
+            break
+    return chapter_url
+
+
+def _parse_chapter(content_bytes):
+    """解码并解析章节页，返回试读标题与正文"""
+    chapter = {}
+    ch_content = content_bytes.decode('gb18030', errors='ignore')
+    ch_root = parse(ch_content)
+
+    title = select_one(ch_root, _SEL["h1"])
+    if title is None:
+        title = select_one(ch_root, _SEL["title"])
+    if title is not None: chapter['first_chapter_title'] = get_text(title, strip=True)
+
+    content_div = select_one(ch_root, _SEL["chapter_body"])
+    if content_div is not None:
+        ps = select(content_div, _SEL["p"])
+        if ps:
+            lines = [get_text(p, strip=True) for p in ps]
+            chapter['first_chapter_content'] = "\n".join(lines)
+        else:
+            chapter['first_chapter_content'] = get_text(content_div, '\n', strip=True)
+    return chapter
+
 
 class FalooSource(BaseSource):
     def __init__(self):
@@ -36,239 +248,86 @@ class FalooSource(BaseSource):
         url = f"https://wap.faloo.com/search_1_{faloo_page}.html?k={encoded_key}"
         logger.info(f"[飞卢] 正在搜索: {url} (Bot Page {bot_page} -> Faloo Page {faloo_page}, Offset {offset_idx})")
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                async with session.get(url, timeout=10) as resp:
-                    if resp.status != 200:
-                        logger.error(f"[飞卢] 搜索请求失败: {resp.status}")
-                        return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
-                    
-                    # 读取二进制并解码
-                    content_bytes = await resp.read()
-                    content = content_bytes.decode('gb18030', errors='ignore')
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    results = []
-                    
-                    # 解析列表
-                    items = soup.select('.novelList li')
-                    for item in items:
-                        try:
-                            name_tag = item.select_one('.bl_r1_tit a')
-                            if not name_tag: continue
-                            
-                            author_tag = item.select_one('.nl_r1_author a')
-                            cover_img = item.select_one('.nl_r1 a img')
-                            intro_tag = item.select_one('.bl_r1_into a')
-                            word_count_tag = item.select_one('.nl_r2 i')
-                            
-                            href = name_tag['href']
-                            if href.startswith('//'):
-                                book_url = "https:" + href
-                            elif href.startswith('/'):
-                                book_url = "https://wap.faloo.com" + href
-                            else:
-                                book_url = href
-                                
-                            results.append({
-                                'name': name_tag.get_text(strip=True),
-                                'author': author_tag.get_text(strip=True) if author_tag else "未知",
-                                'url': book_url,
-                                'origin': 'faloo',
-                                'cover': cover_img.get('src') if cover_img else None,
-                                'intro': intro_tag.get_text(strip=True) if intro_tag else None,
-                                'word_count': word_count_tag.get_text(strip=True) if word_count_tag else None,
-                                'bid': re.search(r'(\d+)\.html', book_url).group(1) if re.search(r'(\d+)\.html', book_url) else None
-                            })
-                        except Exception as e:
-                            continue
-                            
-                    # 飞卢固定每页 30 条，如果少于 30 条说明是最后一页
-                    page_size_faloo = 30
-                    current_count = len(results)
-                    is_faloo_page_last = current_count < page_size_faloo
-                    
-                    # 切片获取当前 Bot 页的数据
-                    sliced_results = results[offset_idx : offset_idx + 10]
-                    
-                    # 判断是否为最后一页
-                    if is_faloo_page_last:
-                         # 如果飞卢页是最后一页，检查当前切片是否已包含剩下的所有数据
-                         is_last = (offset_idx + 10) >= current_count
-                    else:
-                         # 如果飞卢页不是最后一页，说明还有下一页飞卢数据
-                         is_last = False
-                    
-                    # 处理空切片的情况 (例如请求了 Bot Page 4 但 Faloo Page 2 其实是空的)
-                    if not sliced_results and offset_idx >= current_count:
-                         is_last = True
-                    
-                    if return_metadata:
-                        return {
-                            "books": sliced_results,
-                            "total": 9999, # 无法获取精确总数
-                            "max_pages": 999, # 无法获取精确最大页数
-                            "current_page": bot_page,
-                            "is_last": is_last
-                        }
-                    
-                    return sliced_results
-
-            except Exception as e:
-                logger.error(f"[飞卢] 搜索异常: {e}")
+        try:
+            resp = await self.http.get(url, headers=self.headers, timeout=10)
+            if resp.status != 200:
+                logger.error(f"[飞卢] 搜索请求失败: {resp.status}")
                 return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
-
-    async def get_book_details(self, book_url):
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                async with session.get(book_url, timeout=10) as resp:
-                    if resp.status != 200:
-                        return None
-                    
-                    content_bytes = await resp.read()
-                    content = content_bytes.decode('gb18030', errors='ignore')
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    book_info = {
-                        "url": book_url,
-                        "origin": "faloo"
-                    }
-                    
-                    # Extract BID
-                    match_bid = re.search(r'(\d+)\.html', book_url)
-                    if match_bid:
-                        book_info['bid'] = match_bid.group(1)
-                    
-                    # 1. 基本信息
-                    name_tag = soup.select_one('.name')
-                    if name_tag: book_info['name'] = name_tag.get_text(strip=True)
-                    
-                    author_links = soup.select('.color999 a')
-                    if author_links:
-                        book_info['author'] = author_links[0].get_text(strip=True)
-                        if len(author_links) > 1:
-                            book_info['category'] = author_links[1].get_text(strip=True)
-                            
-                    status_tag = soup.select_one('.color999 .tag.textHide')
-                    if status_tag: book_info['status'] = status_tag.get_text(strip=True)
+            
+            results = await self.parse(_parse_search, resp.body, size=len(resp.body))
                     
-                    tags = [a.get_text(strip=True) for a in soup.select('.tagList a')]
-                    if tags: 
-                        # Deduplicate tags while preserving order
-                        book_info['tags'] = list(dict.fromkeys(tags))
-                    
-                    cover_img = soup.select_one('.cover_box img')
-                    if cover_img: book_info['cover'] = cover_img.get('src')
-                    
-                    intro_p = soup.select_one('#novel_intro')
-                    if intro_p: book_info['intro'] = intro_p.get_text('\n', strip=True)
-                    
-                    last_chap = soup.select_one('.newNode')
-                    if last_chap: book_info['last_chapter'] = last_chap.get_text(strip=True)
-                    
-                    # Total Chapters
-                    count_text = soup.select_one('.countText')
-                    if count_text:
-                        # Extract digits from "本书已更592章"
-                        raw_count = count_text.get_text(strip=True)
-                        match = re.search(r'(\d+)', raw_count)
-                        if match:
-                            book_info['total_chapters'] = match.group(1)
-                        else:
-                            book_info['total_chapters'] = raw_count
+            # 飞卢固定每页 30 条，如果少于 30 条说明是最后一页
+            page_size_faloo = 30
+            current_count = len(results)
+            is_faloo_page_last = current_count < page_size_faloo
+            
+            # 切片获取当前 Bot 页的数据
+            sliced_results = results[offset_idx : offset_idx + 10]
+            
+            # 判断是否为最后一页
+            if is_faloo_page_last:
+                 # 如果飞卢页是最后一页，检查当前切片是否已包含剩下的所有数据
+                 is_last = (offset_idx + 10) >= current_count
+            else:
+                 # 如果飞卢页不是最后一页，说明还有下一页飞卢数据
+                 is_last = False
+            
+            # 处理空切片的情况 (例如请求了 Bot Page 4 但 Faloo Page 2 其实是空的)
+            if not sliced_results and offset_idx >= current_count:
+                 is_last = True
+            
+            if return_metadata:
+                return {
+                    "books": sliced_results,
+                    "total": 9999, # 无法获取精确总数
+                    "max_pages": 999, # 无法获取精确最大页数
+                    "current_page": bot_page,
+                    "is_last": is_last
+                }
+            
+            return sliced_results
 
-                    # 2. 统计信息
-                    info_ul = soup.select_one('ul.info')
-                    if info_ul:
-                        lis = info_ul.find_all('li')
-                        for li in lis:
-                            text = li.get_text(strip=True)
-                            if '万字' in text:
-                                parts = text.split('|')
-                                if len(parts) >= 1: book_info['word_count'] = parts[0].strip()
-                                if len(parts) >= 2: book_info['total_click'] = parts[1].strip()
-                            if '更新时间：' in text:
-                                book_info['last_update'] = text.replace('更新时间：', '').strip()
-                            if '分' in text and '已评' in text:
-                                # "9.4分 / 1912人已评"
-                                raw_score = text.strip()
-                                try:
-                                    score_parts = raw_score.split('/')
-                                    if len(score_parts) >= 1:
-                                        book_info['rating'] = score_parts[0].replace('分', '').strip()
-                                    if len(score_parts) >= 2:
-                                        book_info['rating_users'] = score_parts[1].replace('人已评', '').strip()
-                                except:
-                                    book_info['rating'] = raw_score
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 预算耗尽交给调用方处理，不能当作“没有更多结果”
+        except Exception as e:
+            logger.error(f"[飞卢] 搜索异常: {e}")
+            return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
 
-                    # Reward Stats (Flowers, Tickets, etc.)
-                    rewards = soup.select('.reward li')
-                    if len(rewards) >= 4:
-                        try:
-                            book_info['reward_coin'] = rewards[0].select_one('span').get_text(strip=True)
-                            book_info['reward_flower'] = rewards[1].select_one('span').get_text(strip=True)
-                            book_info['reward_ticket'] = rewards[2].select_one('span').get_text(strip=True)
-                            book_info['reward_review'] = rewards[3].select_one('span').get_text(strip=True)
-                        except:
-                            pass
+    async def get_book_details(self, book_url):
+        try:
+            resp = await self.http.get(book_url, headers=self.headers, timeout=10, cache_ttl=self.detail_cache_ttl)
+            if resp.status != 200:
+                return None
+            
+            book_info, catalog_href = await self.parse(_parse_detail, resp.body, book_url, size=len(resp.body))
 
-                    # 3. 获取试读内容（第一章）
-                    nav_links = soup.select('.display_flex_between a')
-                    if len(nav_links) > 1:
-                        href = nav_links[1]['href']
-                        if href.startswith('//'):
-                            catalog_url = "https:" + href
-                        elif href.startswith('/'):
-                            catalog_url = "https://wap.faloo.com" + href
-                        else:
-                            catalog_url = href
-                        
-                        # 请求目录页
-                        async with session.get(catalog_url, timeout=5) as c_resp:
-                            if c_resp.status == 200:
-                                c_bytes = await c_resp.read()
-                                c_content = c_bytes.decode('gb18030', errors='ignore')
-                                c_soup = BeautifulSoup(c_content, 'html.parser')
-                                
-                                # 查找免费章节
-                                chapter_url = None
-                                chapters = c_soup.select('.v_nodeList li a')
-                                for link in chapters:
-                                    # 排除 VIP 章节 (通常有 icon_close 或 vip 图标)
-                                    if link.select('.icon_close') or link.select('img[src*="vip"]'):
-                                        continue
-                                    
-                                    c_href = link.get('href')
-                                    if c_href:
-                                        if c_href.startswith('//'):
-                                            chapter_url = "https:" + c_href
-                                        elif c_href.startswith('/'):
-                                            chapter_url = "https://wap.faloo.com" + c_href
-                                        else:
-                                            chapter_url = c_href
-                                        break
-                                
-                                if chapter_url:
-                                    async with session.get(chapter_url, timeout=5) as ch_resp:
-                                        if ch_resp.status == 200:
-                                            ch_bytes = await ch_resp.read()
-                                            ch_content = ch_bytes.decode('gb18030', errors='ignore')
-                                            ch_soup = BeautifulSoup(ch_content, 'html.parser')
-                                            
-                                            title = ch_soup.select_one('h1') or ch_soup.select_one('.title')
-                                            if title: book_info['first_chapter_title'] = title.get_text(strip=True)
-                                            
-                                            content_div = ch_soup.select_one('.nodeContent')
-                                            if content_div:
-                                                ps = content_div.find_all('p')
-                                                if ps:
-                                                    lines = [p.get_text(strip=True) for p in ps]
-                                                    book_info['first_chapter_content'] = "\n".join(lines)
-                                                else:
-                                                    book_info['first_chapter_content'] = content_div.get_text('\n', strip=True)
+            # 3. 获取试读内容（第一章），预算不足时跳过
+            if catalog_href and has_budget(self.trial_min_budget):
+                href = catalog_href
+                if href.startswith('//'):
+                    catalog_url = "https:" + href
+                elif href.startswith('/'):
+                    catalog_url = "https://wap.faloo.com" + href
+                else:
+                    catalog_url = href
+                
+                try:
+                    # 请求目录页
+                    c_resp = await self.http.get(catalog_url, headers=self.headers, timeout=5, cache_ttl=self.detail_cache_ttl)
+                    if c_resp.status == 200:
+                        chapter_url = await self.parse(_parse_catalog, c_resp.body, size=len(c_resp.body))
+                    
+                        if chapter_url and has_budget(self.trial_min_budget):
+                            ch_resp = await self.http.get(chapter_url, headers=self.headers, timeout=5, cache_ttl=self.chapter_cache_ttl)
+                            if ch_resp.status == 200:
+                                book_info.update(await self.parse(_parse_chapter, ch_resp.body, size=len(ch_resp.body)))
+                except Exception as e:
+                    logger.warning(f"[飞卢] 试读获取失败: {e}")
 
-                    return book_info
+            return book_info
 
-            except Exception as e:
-                logger.error(f"[飞卢] 详情获取异常: {e}")
-                return None
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 主请求超出预算时如实上报，由调用方提示超时
+        except Exception as e:
+            logger.error(f"[飞卢] 详情获取异常: {e}")
+            return None
@@ -1,10 +1,10 @@
-import aiohttp
-import json
-import re
-from lxml import html
+import asyncio
 from urllib.parse import quote
 from astrbot.api import logger
 from .base_source import BaseSource
+from ..core.deadline import DeadlineExceeded
+from ..core.ssr_extract import extract_page_data
+from ..core.page_feed import PageFeed
 
 class QidianSource(BaseSource):
     def __init__(self):
@@ -14,152 +14,151 @@ class QidianSource(BaseSource):
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
         }
 
-    async def search_book(self, keyword, page=1, return_metadata=False):
-        """强制一次性拉取所有100条结果（忽略page参数）"""
-        all_records = []
-        max_api_page = 5  # 最多5页=100条
-        current_api_page = 1
+    MAX_API_PAGE = 5  # 最多5页=100条
+    API_PAGE_SIZE = 20
+
+    async def _fetch_search_page(self, keyword, page_num):
+        """拉取一页搜索结果，返回 (书籍列表, 是否最后一页)"""
+        search_url = f"https://m.qidian.com/so/{quote(keyword)}.html?pageNum={page_num}"
+        logger.info(f"正在搜索起点第{page_num}页: {search_url}")
         
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                while current_api_page <= max_api_page:
-                    search_url = f"https://m.qidian.com/so/{quote(keyword)}.html?pageNum={current_api_page}"
-                    logger.info(f"正在搜索起点第{current_api_page}页: {search_url}")
-                    
-                    async with session.get(search_url, timeout=10) as resp:
-                        content = await resp.text()
-                        tree = html.fromstring(content)
-                        script_node = tree.xpath("//script[@id='vite-plugin-ssr_pageContext']/text()")
-                        
-                        if not script_node:
-                            break
+        resp = await self.http.get(search_url, headers=self.headers, timeout=10)
+        page_data = await self.parse(extract_page_data, resp.body, resp.charset or "utf-8", ("bookInfo",), size=len(resp.body))
+        if page_data is None:
+            return [], True
 
-                        data = json.loads(script_node[0])
-                        page_data = data.get('pageContext', {}).get('pageProps', {}).get('pageData', {})
-                        book_info = page_data.get('bookInfo', {})
-                        records = book_info.get('records', [])
-                        
-                        if not records:  # 没有数据则终止
-                            break
-                            
-                        # 合并数据
-                        for r in records:
-                            all_records.append({
-                                "name": r.get("bName"),
-                                "author": r.get("bAuth"),
-                                "bid": r.get("bid"),
-                                "url": f"https://m.qidian.com/book/{r.get('bid')}/",
-                                "origin": "qidian"
-                            })
-                        
-                        # 检查是否最后一页
-                        if bool(book_info.get('isLast')) or len(records) < 20:
-                            break
-                            
-                        current_api_page += 1
-                
-                # 最多保留100条
-                all_records = all_records[:100]
-                total = len(all_records)
-                
-                if return_metadata:
-                    return {
-                        "books": all_records, 
-                        "total": total, 
-                        "current_page": 1, 
-                        "is_last": True  # 标记为最后一页，因为已拉取全部
-                    }
-                return all_records
-                
-            except Exception as e:
-                logger.error(f"起点搜索异常: {e}")
-                return {"books": [], "total": 0, "current_page": page, "is_last": True} if return_metadata else []
+        book_info = page_data.get('bookInfo', {})
+        records = book_info.get('records', [])
+        books = [{
+            "name": r.get("bName"),
+            "author": r.get("bAuth"),
+            "bid": r.get("bid"),
+            "url": f"https://m.qidian.com/book/{r.get('bid')}/",
+            "origin": "qidian"
+        } for r in records]
+        return books, bool(book_info.get('isLast')) or len(records) < self.API_PAGE_SIZE
+
+    async def search_book(self, keyword, page=1, return_metadata=False, stream=False):
+        """拉取所有结果，最多100条（忽略page参数）
+
+        第 1 页返回后，第 2~5 页并发拉取，遇到最后一页即取消其后的请求。
+        stream 为 True 时拿到第 1 页即返回，后续分页通过元数据中的 feed（PageFeed）陆续交付。
+        """
+        try:
+            first_records, is_last = await self._fetch_search_page(keyword, 1)
+            feed = None
+            if first_records and not is_last:
+                feed = PageFeed(lambda p: self._fetch_search_page(keyword, p), range(2, self.MAX_API_PAGE + 1))
+
+            if stream and return_metadata:
+                return {
+                    "books": first_records,
+                    "total": len(first_records),
+                    "current_page": 1,
+                    "is_last": feed is None,
+                    "feed": feed
+                }
+
+            all_records = first_records + (await feed.wait() if feed else [])
+            # 最多保留100条
+            all_records = all_records[:100]
+            total = len(all_records)
+            
+            if return_metadata:
+                return {
+                    "books": all_records, 
+                    "total": total, 
+                    "current_page": 1, 
+                    "is_last": True  # 标记为最后一页，因为已拉取全部
+                }
+            return all_records
+            
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 预算耗尽交给调用方处理，不能当作“没有更多结果”
+        except Exception as e:
+            logger.error(f"起点搜索异常: {e}")
+            return {"books": [], "total": 0, "current_page": page, "is_last": True} if return_metadata else []
 
     async def get_book_details(self, book_url):
         book_url = book_url.replace("www.qidian.com", "m.qidian.com")
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                async with session.get(book_url, timeout=10) as resp:
-                    content = await resp.text()
-                    tree = html.fromstring(content)
-                    script_node = tree.xpath("//script[@id='vite-plugin-ssr_pageContext']/text()")
-                    if script_node:
-                        try:
-                            data = json.loads(script_node[0])
-                            page_data = data['pageContext']['pageProps']['pageData']
-                            info = page_data['bookInfo']
-                            book_extra = page_data.get('bookExtra', {})
-                            chapter_data = page_data.get('chapterContentInfo', {})
+        try:
+            resp = await self.http.get(book_url, headers=self.headers, timeout=10, cache_ttl=self.detail_cache_ttl)
+            page_data = await self.parse(extract_page_data, resp.body, resp.charset or "utf-8", ("bookInfo",), size=len(resp.body))
+            if page_data is not None:
+                try:
+                    info = page_data['bookInfo']
+                    book_extra = page_data.get('bookExtra', {})
+                    chapter_data = page_data.get('chapterContentInfo', {})
 
-                            tags = [t.get("TagName") for t in book_extra.get("ugcTagInfos", []) if t.get("TagName")]
+                    tags = [t.get("TagName") for t in book_extra.get("ugcTagInfos", []) if t.get("TagName")]
                             
-                            raw_intro = info.get("desc", "").strip()
-                            formatted_intro = "　　" + raw_intro if raw_intro else ""
+                    raw_intro = info.get("desc", "").strip()
+                    formatted_intro = "　　" + raw_intro if raw_intro else ""
                             
-                            raw_chapter_content = chapter_data.get("firstChapterC", "").strip()
-                            formatted_content = "　　" + raw_chapter_content if raw_chapter_content else ""
+                    raw_chapter_content = chapter_data.get("firstChapterC", "").strip()
+                    formatted_content = "　　" + raw_chapter_content if raw_chapter_content else ""
 
-                            return {
-                                "name": info.get("bookName"),
-                                "author": info.get("authorName"),
-                                "intro": formatted_intro,
-                                "cover": f"https://bookcover.yuewen.com/qdbimg/349573/{info.get('bookId')}/600",
-                                "status": info.get("bookStatus"),
-                                "word_count": info.get("showWordsCnt"),
-                                "total_chapters": page_data.get("cTCnt"),
-                                "rank": page_data.get("monthTicketInfo", {}).get("rank", "未上榜"),
-                                "category": f"{info.get('chanName')}·{info.get('subCateName')}",
-                                "tags": tags,
-                                "rating": info.get("rateInfo", {}).get("rate", "暂无"),
-                                "rating_users": info.get("rateInfo", {}).get("userCount", "0"),
-                                "collection": info.get("collect", 0),
-                                "all_recommend": info.get("recomAll", 0),
-                                "last_chapter": info.get("updChapterName"),
-                                "last_update": info.get("updTime"),
-                                "first_chapter_title": chapter_data.get("firstChapterT"),
-                                "first_chapter_content": formatted_content,
-                                "url": book_url
-                            }
-                        except Exception as e:
-                            logger.warning(f"详情页 JSON 解析失败: {e}")
-                    return None
-            except Exception as e:
-                logger.error(f"起点详情获取异常: {e}")
-                return None
+                    return {
+                        "bid": info.get("bookId"),
+                        "name": info.get("bookName"),
+                        "author": info.get("authorName"),
+                        "intro": formatted_intro,
+                        "cover": f"https://bookcover.yuewen.com/qdbimg/349573/{info.get('bookId')}/600",
+                        "status": info.get("bookStatus"),
+                        "word_count": info.get("showWordsCnt"),
+                        "total_chapters": page_data.get("cTCnt"),
+                        "rank": page_data.get("monthTicketInfo", {}).get("rank", "未上榜"),
+                        "category": f"{info.get('chanName')}·{info.get('subCateName')}",
+                        "tags": tags,
+                        "rating": info.get("rateInfo", {}).get("rate", "暂无"),
+                        "rating_users": info.get("rateInfo", {}).get("userCount", "0"),
+                        "collection": info.get("collect", 0),
+                        "all_recommend": info.get("recomAll", 0),
+                        "last_chapter": info.get("updChapterName"),
+                        "last_update": info.get("updTime"),
+                        "first_chapter_title": chapter_data.get("firstChapterT"),
+                        "first_chapter_content": formatted_content,
+                        "url": book_url
+                    }
+                except Exception as e:
+                    logger.warning(f"详情页 JSON 解析失败: {e}")
+            return None
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 主请求超出预算时如实上报，由调用方提示超时
+        except Exception as e:
+            logger.error(f"起点详情获取异常: {e}")
+            return None
 
     async def get_sanjiang_books(self):
         """获取三江频道书籍"""
         url = "https://m.qidian.com/sanjiang"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                async with session.get(url, timeout=10) as resp:
-                    content = await resp.text()
-                    tree = html.fromstring(content)
-                    script_node = tree.xpath("//script[@id='vite-plugin-ssr_pageContext']/text()")
-                    if not script_node:
-                        return []
+        try:
+            resp = await self.http.get(url, headers=self.headers, timeout=10)
+            page_data = await self.parse(extract_page_data, resp.body, resp.charset or "utf-8", ("records",), size=len(resp.body))
+            if page_data is None:
+                return []
                     
-                    data = json.loads(script_node[0])
-                    # 三江的数据通常在 pageContext.pageProps.pageData.records 中
-                    page_data = data.get('pageContext', {}).get('pageProps', {}).get('pageData', {})
-                    records = page_data.get('records', [])
+            # 三江的数据通常在 pageContext.pageProps.pageData.records 中
+            records = page_data.get('records', [])
                     
-                    all_books = []
-                    for r in records:
-                        all_books.append({
-                            "rec": r.get("rec"),
-                            "name": r.get("bName"),
-                            "cat": r.get("cat"),
-                            "cnt": r.get("cnt"),
-                            "state": r.get("state"),
-                            "bid": r.get("bid"),
-                            "author": r.get("bAuth"),
-                            "desc": r.get("desc"),
-                            "url": f"https://m.qidian.com/book/{r.get('bid')}/",
-                            "origin": "qidian"
-                        })
+            all_books = []
+            for r in records:
+                all_books.append({
+                    "rec": r.get("rec"),
+                    "name": r.get("bName"),
+                    "cat": r.get("cat"),
+                    "cnt": r.get("cnt"),
+                    "state": r.get("state"),
+                    "bid": r.get("bid"),
+                    "author": r.get("bAuth"),
+                    "desc": r.get("desc"),
+                    "url": f"https://m.qidian.com/book/{r.get('bid')}/",
+                    "origin": "qidian"
+                })
                             
-                    return all_books
-            except Exception as e:
-                logger.error(f"获取三江数据异常: {e}")
-                return []
\ No newline at end of file
+            return all_books
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 超出预算时如实上报，由调用方提示超时
+        except Exception as e:
+            logger.error(f"获取三江数据异常: {e}")
+            return []
\ No newline at end of file
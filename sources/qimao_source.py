@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import json
 import hashlib
@@ -9,6 +8,26 @@ from datetime import datetime
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 from .base_source import BaseSource
+from ..core.deadline import DeadlineExceeded, has_budget
+
+
+def _aes_decrypt(encrypted_base64):
+    """Decrypt content using AES/CBC/PKCS5Padding with fixed key/iv logic from source"""
+    # Key: "242ccb8230d709e1"
+    key = b"242ccb8230d709e1"
+    
+    try:
+        iv_enc_data = base64.b64decode(encrypted_base64)
+        iv = iv_enc_data[:16]
+        ciphertext = iv_enc_data[16:]
+        
+        cipher = AES.new(key, AES.MODE_CBC, iv)
+        decrypted = unpad(cipher.decrypt(ciphertext), AES.block_size)
+        return decrypted.decode('utf-8')
+    except Exception as e:
+        # print(f"DEBUG: Decryption failed: {e}")
+        return None
+
 
 class QiMaoSource(BaseSource):
     BASE_URL = "https://api-bc.wtzw.com"
@@ -40,23 +59,6 @@ class QiMaoSource(BaseSource):
         # 3. Add sign_key and md5
         return self._get_md5(raw_str + self.SIGN_KEY)
 
-    def _aes_decrypt(self, encrypted_base64):
-        """Decrypt content using AES/CBC/PKCS5Padding with fixed key/iv logic from source"""
-        # Key: "242ccb8230d709e1"
-        key = b"242ccb8230d709e1"
-        
-        try:
-            iv_enc_data = base64.b64decode(encrypted_base64)
-            iv = iv_enc_data[:16]
-            ciphertext = iv_enc_data[16:]
-            
-            cipher = AES.new(key, AES.MODE_CBC, iv)
-            decrypted = unpad(cipher.decrypt(ciphertext), AES.block_size)
-            return decrypted.decode('utf-8')
-        except Exception as e:
-            # print(f"DEBUG: Decryption failed: {e}")
-            return None
-
     async def search_book(self, keyword: str, page: int = 1, return_metadata: bool = False):
         url = f"{self.BASE_URL}/api/v5/search/words"
         
@@ -72,59 +74,61 @@ class QiMaoSource(BaseSource):
         params['sign'] = self._sign_params(params)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params, timeout=10) as resp:
-                    data = await resp.json()
-                    
-                    root_data = data.get('data', {})
-                    books = root_data.get('books', [])
-                    
-                    results = []
-                    for b in books:
-                        # Extract tags
-                        tags = []
-                        if b.get('ptags'):
-                            # ptags can be a list of dicts or strings, based on test file logic it seemed direct or we check structure
-                            # Test file said: '分类': b.get('ptags')
-                            # Let's assume it's a list of strings or list of objects with title.
-                            # In `final_test_qimao.py`: '分类': b.get('ptags')
-                            # If it is just a string/list, we use it.
-                            ptags = b.get('ptags')
-                            if isinstance(ptags, list):
-                                tags = [str(t) for t in ptags]
-                            elif isinstance(ptags, str):
-                                tags = [ptags]
-                        
-                        book_info = {
-                            'origin': 'qimao',
-                            'name': b.get('original_title'),
-                            'author': b.get('original_author'),
-                            'cover': b.get('image_link'),
-                            'intro': b.get('intro'),
-                            'word_count': b.get('words_num'),
-                            'tags': tags,
-                            'rating': b.get('score'),
-                            'book_id': b.get('id'),
-                            'bid': b.get('id'),
-                            'url': f"https://www.qimao.com/shuku/{b.get('id')}/"
-                        }
-                        results.append(book_info)
+            resp = await self.http.get(url, headers=headers, params=params, timeout=10)
+            data = resp.json()
+            
+            root_data = data.get('data', {})
+            books = root_data.get('books', [])
+            
+            results = []
+            for b in books:
+                # Extract tags
+                tags = []
+                if b.get('ptags'):
+                    # ptags can be a list of dicts or strings, based on test file logic it seemed direct or we check structure
+                    # Test file said: '分类': b.get('ptags')
+                    # Let's assume it's a list of strings or list of objects with title.
+                    # In `final_test_qimao.py`: '分类': b.get('ptags')
+                    # If it is just a string/list, we use it.
+                    ptags = b.get('ptags')
+                    if isinstance(ptags, list):
+                        tags = [str(t) for t in ptags]
+                    elif isinstance(ptags, str):
+                        tags = [ptags]
+                
+                book_info = {
+                    'origin': 'qimao',
+                    'name': b.get('original_title'),
+                    'author': b.get('original_author'),
+                    'cover': b.get('image_link'),
+                    'intro': b.get('intro'),
+                    'word_count': b.get('words_num'),
+                    'tags': tags,
+                    'rating': b.get('score'),
+                    'book_id': b.get('id'),
+                    'bid': b.get('id'),
+                    'url': f"https://www.qimao.com/shuku/{b.get('id')}/"
+                }
+                results.append(book_info)
 
-                    # Meta info for pagination
-                    meta = root_data.get('meta', {})
-                    total_page = int(meta.get('total_page', 0))
-                    
-                    if return_metadata:
-                        return {
-                            "books": results,
-                            "max_pages": total_page if total_page > 0 else 1
-                        }
-                    return results
+            # Meta info for pagination
+            meta = root_data.get('meta', {})
+            total_page = int(meta.get('total_page', 0))
+            
+            if return_metadata:
+                return {
+                    "books": results,
+                    "max_pages": total_page if total_page > 0 else 1,
+                    "is_last": page >= total_page
+                }
+            return results
 
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 预算耗尽交给调用方处理，不能当作“没有更多结果”
         except Exception as e:
             print(f"QiMao Search Error: {e}")
             if return_metadata:
-                return {"books": [], "max_pages": 1}
+                return {"books": [], "max_pages": 1, "is_last": True}
             return []
 
     async def get_book_details(self, book_url: str):
@@ -155,119 +159,122 @@ class QiMaoSource(BaseSource):
         c_params['sign'] = self._sign_params(c_params)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                # Concurrent requests: Detail + Chapter List
-                task_detail = session.get(url, headers=headers, params=params, timeout=10)
-                task_chapters = session.get(chapter_url, headers=c_headers, params=c_params, timeout=5)
-                
-                resp_detail, resp_chapters = await asyncio.gather(task_detail, task_chapters, return_exceptions=True)
-                
-                # 1. Process Book Detail
-                if isinstance(resp_detail, Exception) or resp_detail.status != 200:
-                    return None
-                
-                data = await resp_detail.json()
-                book_data = data.get('data', {}).get('book', {})
-                if not book_data:
-                    return None
-                
-                # Status and Category logic
-                cat_over_words = str(book_data.get('category_over_words', ''))
-                category = cat_over_words
-                word_count = book_data.get('words_num')
-                status = "完结" # Default
+            # Concurrent requests: Detail + Chapter List
+            task_detail = self.http.get(url, headers=headers, params=params, timeout=10, cache_ttl=self.detail_cache_ttl)
+            task_chapters = self.http.get(chapter_url, headers=c_headers, params=c_params, timeout=5, cache_ttl=self.detail_cache_ttl)
+            
+            resp_detail, resp_chapters = await asyncio.gather(task_detail, task_chapters, return_exceptions=True)
+            
+            # 1. Process Book Detail
+            if isinstance(resp_detail, DeadlineExceeded):
+                raise resp_detail
+            if isinstance(resp_detail, Exception) or resp_detail.status != 200:
+                return None
+            
+            data = resp_detail.json()
+            book_data = data.get('data', {}).get('book', {})
+            if not book_data:
+                return None
+            
+            # Status and Category logic
+            cat_over_words = str(book_data.get('category_over_words', ''))
+            category = cat_over_words
+            word_count = book_data.get('words_num')
+            status = "完结" # Default
 
-                parts = cat_over_words.split('・')
-                if len(parts) >= 1:
-                    category = parts[0]
-                
-                for p in parts:
-                    if '万字' in p:
-                        word_count = p
-                    elif '完结' in p:
-                        status = "完结"
-                    elif '连载' in p:
-                        status = "连载"
-                
-                update_status = str(book_data.get('update_status'))
-                if update_status == "0":
-                        status = "连载"
+            parts = cat_over_words.split('・')
+            if len(parts) >= 1:
+                category = parts[0]
+            
+            for p in parts:
+                if '万字' in p:
+                    word_count = p
+                elif '完结' in p:
+                    status = "完结"
+                elif '连载' in p:
+                    status = "连载"
+            
+            update_status = str(book_data.get('update_status'))
+            if update_status == "0":
+                    status = "连载"
 
-                # Timestamp formatting
-                update_time = book_data.get('update_time')
-                if update_time:
-                    try:
-                        ts = int(update_time)
-                        update_time = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
-                    except:
-                        pass
-                
-                tags = [t['title'] for t in book_data.get('book_tag_list', [])]
-                
-                info = {
-                    'origin': 'qimao',
-                    'name': book_data.get('title'),
-                    'author': book_data.get('author'),
-                    'cover': book_data.get('image_link'),
-                    'intro': book_data.get('intro'),
-                    'word_count': word_count,
-                    'status': status,
-                    'last_update': update_time,
-                    'last_chapter': book_data.get('latest_chapter_title'),
-                    'tags': tags,
-                    'category': category,
-                    'rating': book_data.get('score'),
-                    'url': f"https://www.qimao.com/shuku/{book_id}/",
-                    'book_id': str(book_id),
-                    'bid': str(book_id),
-                    'copyright': book_data.get('statement')
-                }
-                
-                # 2. Process Chapter List (Total Chapters & Trial Target)
-                target_chap = None
-                if not isinstance(resp_chapters, Exception) and resp_chapters.status == 200:
-                    try:
-                        c_data = await resp_chapters.json()
-                        chapter_lists = c_data.get('data', {}).get('chapter_lists', [])
-                        info['total_chapters'] = len(chapter_lists)
+            # Timestamp formatting
+            update_time = book_data.get('update_time')
+            if update_time:
+                try:
+                    ts = int(update_time)
+                    update_time = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+                except:
+                    pass
+            
+            tags = [t['title'] for t in book_data.get('book_tag_list', [])]
+            
+            info = {
+                'origin': 'qimao',
+                'name': book_data.get('title'),
+                'author': book_data.get('author'),
+                'cover': book_data.get('image_link'),
+                'intro': book_data.get('intro'),
+                'word_count': word_count,
+                'status': status,
+                'last_update': update_time,
+                'last_chapter': book_data.get('latest_chapter_title'),
+                'tags': tags,
+                'category': category,
+                'rating': book_data.get('score'),
+                'url': f"https://www.qimao.com/shuku/{book_id}/",
+                'book_id': str(book_id),
+                'bid': str(book_id),
+                'copyright': book_data.get('statement')
+            }
+            
+            # 2. Process Chapter List (Total Chapters & Trial Target)
+            target_chap = None
+            if not isinstance(resp_chapters, Exception) and resp_chapters.status == 200:
+                try:
+                    c_data = await self.parse(json.loads, resp_chapters.body, size=len(resp_chapters.body))
+                    chapter_lists = c_data.get('data', {}).get('chapter_lists', [])
+                    info['total_chapters'] = len(chapter_lists)
+                    
+                    # Find first free chapter
+                    for ch in chapter_lists:
+                        is_free = False
+                        is_vip = ch.get('is_vip')
+                        if is_vip is None or str(is_vip) == '0' or ch.get('price') == 0:
+                            is_free = True
                         
-                        # Find first free chapter
-                        for ch in chapter_lists:
-                            is_free = False
-                            is_vip = ch.get('is_vip')
-                            if is_vip is None or str(is_vip) == '0' or ch.get('price') == 0:
-                                is_free = True
-                            
-                            if is_free:
-                                target_chap = ch
-                                break
-                    except Exception as e:
-                        print(f"QiMao Chapter List Parse Error: {e}")
+                        if is_free:
+                            target_chap = ch
+                            break
+                except Exception as e:
+                    print(f"QiMao Chapter List Parse Error: {e}")
 
-                # 3. Fetch Trial Content (if target found)
-                if target_chap:
-                    content_url = "https://api-ks.wtzw.com/api/v1/chapter/content"
-                    cc_params = {
-                        'id': str(book_id),
-                        'chapterId': str(target_chap['id'])
-                    }
-                    cc_params['sign'] = self._sign_params(cc_params)
-                    
-                    try:
-                        async with session.get(content_url, headers=headers, params=cc_params, timeout=5) as c_resp:
-                            if c_resp.status == 200:
-                                c_data = await c_resp.json()
-                                encrypted_content = c_data.get('data', {}).get('content')
-                                if encrypted_content:
-                                    content = self._aes_decrypt(encrypted_content)
-                                    if content:
-                                        info['first_chapter_title'] = target_chap.get('title')
-                                        info['first_chapter_content'] = content
-                    except Exception as e:
-                         print(f"QiMao Content Error: {e}")
+            # 3. Fetch Trial Content (if target found and time budget allows)
+            if target_chap and has_budget(self.trial_min_budget):
+                content_url = "https://api-ks.wtzw.com/api/v1/chapter/content"
+                cc_params = {
+                    'id': str(book_id),
+                    'chapterId': str(target_chap['id'])
+                }
+                cc_params['sign'] = self._sign_params(cc_params)
+                
+                try:
+                    c_resp = await self.http.get(content_url, headers=headers, params=cc_params, timeout=5, cache_ttl=self.chapter_cache_ttl)
+                    if c_resp.status == 200:
+                        c_data = await self.parse(json.loads, c_resp.body, size=len(c_resp.body))
+                        encrypted_content = c_data.get('data', {}).get('content')
+                        if encrypted_content:
+                            content = await self.parse(_aes_decrypt, encrypted_content, size=len(encrypted_content))
+                            if content:
+                                info['first_chapter_title'] = target_chap.get('title')
+                                info['first_chapter_content'] = content
+                except Exception as e:
+                     print(f"QiMao Content Error: {e}")
 
-                return info
+            return info
 
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 主请求超出预算时如实上报，由调用方提示超时
         except Exception as e:
             print(f"QiMao Details Error: {e}")
             return None
@@ -283,44 +290,43 @@ class QiMaoSource(BaseSource):
         params['sign'] = self._sign_params(params)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(list_url, headers=headers, params=params, timeout=5) as resp:
-                    data = await resp.json()
-                    chapter_lists = data.get('data', {}).get('chapter_lists', [])
-                    
-                    target_chap = None
-                    for ch in chapter_lists:
-                        is_free = False
-                        is_vip = ch.get('is_vip')
-                        if is_vip is None or str(is_vip) == '0' or ch.get('price') == 0:
-                            is_free = True
-                        
-                        if is_free:
-                            target_chap = ch
-                            break
-                    
-                    if not target_chap:
-                        return None
-                        
-                    # Fetch content
-                    content_url = "https://api-ks.wtzw.com/api/v1/chapter/content"
-                    c_params = {
-                        'id': str(book_id),
-                        'chapterId': str(target_chap['id'])
+            resp = await self.http.get(list_url, headers=headers, params=params, timeout=5, cache_ttl=self.detail_cache_ttl)
+            data = await self.parse(json.loads, resp.body, size=len(resp.body))
+            chapter_lists = data.get('data', {}).get('chapter_lists', [])
+            
+            target_chap = None
+            for ch in chapter_lists:
+                is_free = False
+                is_vip = ch.get('is_vip')
+                if is_vip is None or str(is_vip) == '0' or ch.get('price') == 0:
+                    is_free = True
+                
+                if is_free:
+                    target_chap = ch
+                    break
+            
+            if not target_chap:
+                return None
+                
+            # Fetch content
+            content_url = "https://api-ks.wtzw.com/api/v1/chapter/content"
+            c_params = {
+                'id': str(book_id),
+                'chapterId': str(target_chap['id'])
+            }
+            c_params['sign'] = self._sign_params(c_params)
+            
+            c_resp = await self.http.get(content_url, headers=headers, params=c_params, timeout=5, cache_ttl=self.chapter_cache_ttl)
+            c_data = await self.parse(json.loads, c_resp.body, size=len(c_resp.body))
+            encrypted_content = c_data.get('data', {}).get('content')
+            
+            if encrypted_content:
+                content = await self.parse(_aes_decrypt, encrypted_content, size=len(encrypted_content))
+                if content:
+                    return {
+                        'first_chapter_title': target_chap.get('title'),
+                        'first_chapter_content': content
                     }
-                    c_params['sign'] = self._sign_params(c_params)
-                    
-                    async with session.get(content_url, headers=headers, params=c_params, timeout=5) as c_resp:
-                        c_data = await c_resp.json()
-                        encrypted_content = c_data.get('data', {}).get('content')
-                        
-                        if encrypted_content:
-                            content = self._aes_decrypt(encrypted_content)
-                            if content:
-                                return {
-                                    'first_chapter_title': target_chap.get('title'),
-                                    'first_chapter_content': content
-                                }
             return None
         except Exception as e:
             print(f"QiMao Trial Content Error: {e}")
@@ -1,10 +1,161 @@
-
-import aiohttp
+import asyncio
 import re
-from bs4 import BeautifulSoup
 from urllib.parse import quote
 from astrbot.api import logger
 from .base_source import BaseSource
+from ..core.deadline import DeadlineExceeded, has_budget
+from ..core.html_engine import compile_selectors, parse, select, select_one, get_text
+
+_SEL = compile_selectors({
+    "search_items": "table.comic_cover ul",
+    "search_name": "strong a",
+    "img": "img",
+    "title": ".d-summary .title .text",
+    "author": ".author-name span",
+    "cover": ".books-box .pic img",
+    "intro": ".introduce",
+    "tags": ".tag-list .tag .text",
+    "count_detail": ".count-detail .text",
+    "last_chapter": ".chapter-title .link",
+    "catalog_links": ".catalog-list li a",
+    "chapter_title": ".article-title",
+    "chapter_body": "#ChapterBody",
+    "p": "p",
+})
+
+
+def _parse_search(content):
+    """解析搜索页，返回全部结果"""
+    root = parse(content)
+    
+    all_results = []
+    items = select(root, _SEL["search_items"])
+    
+    for item in items:
+        name_tag = select_one(item, _SEL["search_name"])
+        if name_tag is not None:
+            href = name_tag.attrib['href']
+            full_url = "https://book.sfacg.com" + href if href.startswith('/') else href
+            
+            book_id = None
+            match = re.search(r'/Novel/(\d+)', full_url)
+            if match: book_id = match.group(1)
+            
+            author = "未知"
+            text_content = get_text(item)
+            info_match = re.search(r'综合信息：\s*(.*?)/', text_content)
+            if info_match:
+                author = info_match.group(1).strip()
+            
+            cover_img = select_one(item, _SEL["img"])
+            cover_url = cover_img.get('src') if cover_img is not None else None
+            
+            all_results.append({
+                "name": get_text(name_tag, strip=True),
+                "author": author,
+                "url": full_url,
+                "origin": "sfacg",
+                "cover": cover_url,
+                "bid": book_id,
+                "book_id": book_id
+            })
+    return all_results
+
+
+def _parse_detail(content, book_url):
+    """解析详情页基础信息"""
+    root = parse(content)
+    
+    book_info = {
+        "url": book_url,
+        "origin": "sfacg"
+    }
+    
+    # 1. Title
+    title_tag = select_one(root, _SEL["title"])
+    if title_tag is not None:
+        # 只取标题自身文本，忽略内嵌的标记标签
+        book_info['name'] = get_text(title_tag, strip=True, recursive=False)
+    
+    # 2. Author
+    author_tag = select_one(root, _SEL["author"])
+    if author_tag is not None:
+        book_info['author'] = get_text(author_tag, strip=True)
+        
+    # 3. Cover
+    cover_img = select_one(root, _SEL["cover"])
+    if cover_img is not None:
+        book_info['cover'] = cover_img.get('src')
+        
+    # 4. Intro
+    intro_tag = select_one(root, _SEL["intro"])
+    if intro_tag is not None:
+        book_info['intro'] = get_text(intro_tag, strip=True)
+        
+    # 5. Tags
+    tags = [get_text(t, strip=True) for t in select(root, _SEL["tags"])]
+    book_info['tags'] = tags
+    
+    # 6. Metadata
+    count_details = select(root, _SEL["count_detail"])
+    for span in count_details:
+        text = get_text(span, strip=True)
+        if '字数' in text:
+            raw_wc = text.replace('字数：', '')
+            m = re.search(r'(.*?)\[(.*?)\]', raw_wc)
+            if m:
+                book_info['word_count'] = m.group(1)
+                book_info['status'] = m.group(2)
+            else:
+                book_info['word_count'] = raw_wc
+        if '类型' in text:
+            book_info['category'] = text.replace('类型：', '')
+        if '点击' in text:
+            book_info['total_click'] = text.replace('点击：', '')
+        if '更新' in text:
+            book_info['last_update'] = text.replace('更新：', '').strip()
+            
+    # 7. Latest Chapter
+    last_chapter_tag = select_one(root, _SEL["last_chapter"])
+    if last_chapter_tag is not None:
+        book_info['last_chapter'] = get_text(last_chapter_tag, strip=True)
+    return book_info
+
+
+def _parse_catalog(content):
+    """解析目录页，返回第一个免费章节的链接"""
+    c_root = parse(content)
+    catalog_links = select(c_root, _SEL["catalog_links"])
+    first_chap_link = None
+    for a in catalog_links:
+        href = a.get('href')
+        if href and '/c/' in href and '/vip/' not in href:
+            first_chap_link = href
+            break
+    if not first_chap_link:
+        if catalog_links:
+            first_chap_link = catalog_links[0].get('href')
+    return first_chap_link
+
+
+def _parse_chapter(content):
+    """解析章节页，返回试读标题与正文"""
+    chapter = {}
+    chap_root = parse(content)
+    
+    title_tag = select_one(chap_root, _SEL["chapter_title"])
+    if title_tag is not None:
+        chapter['first_chapter_title'] = get_text(title_tag, strip=True)
+    
+    body = select_one(chap_root, _SEL["chapter_body"])
+    if body is not None:
+        paragraphs = select(body, _SEL["p"])
+        if paragraphs:
+            chapter['first_chapter_content'] = "\n".join([get_text(p, strip=True) for p in paragraphs])
+        else:
+            chapter['first_chapter_content'] = get_text(body, strip=True)
+    return chapter
+
 
 class SfacgSource(BaseSource):
     def __init__(self):
@@ -21,178 +172,77 @@ class SfacgSource(BaseSource):
         
         logger.info(f"[菠萝包] 正在搜索: {url}")
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            try:
-                async with session.get(url, timeout=10) as resp:
-                    if resp.status != 200:
-                        logger.error(f"[菠萝包] 搜索请求失败: {resp.status}")
-                        return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
-                        
-                    content = await resp.text(encoding='utf-8')
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    all_results = []
-                    items = soup.select('table.comic_cover ul')
-                    
-                    for item in items:
-                        name_tag = item.select_one('strong a')
-                        if name_tag:
-                            href = name_tag['href']
-                            full_url = "https://book.sfacg.com" + href if href.startswith('/') else href
-                            
-                            book_id = None
-                            match = re.search(r'/Novel/(\d+)', full_url)
-                            if match: book_id = match.group(1)
-                            
-                            author = "未知"
-                            text_content = item.get_text()
-                            info_match = re.search(r'综合信息：\s*(.*?)/', text_content)
-                            if info_match:
-                                author = info_match.group(1).strip()
-                            
-                            cover_img = item.select_one('img')
-                            cover_url = cover_img.get('src') if cover_img else None
-                            
-                            all_results.append({
-                                "name": name_tag.get_text(strip=True),
-                                "author": author,
-                                "url": full_url,
-                                "origin": "sfacg",
-                                "cover": cover_url,
-                                "bid": book_id,
-                                "book_id": book_id
-                            })
-                    
-                    total_count = len(all_results)
-                    
-                    page_size = 10
-                    max_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
-                    
-                    if page < 1: page = 1
-                    if page > max_pages: page = max_pages
-                    
-                    start_idx = (page - 1) * page_size
-                    end_idx = start_idx + page_size
-                    page_results = all_results[start_idx:end_idx]
-                    
-                    if return_metadata:
-                        return {
-                            "books": page_results,
-                            "total": total_count,
-                            "max_pages": max_pages,
-                            "current_page": page,
-                            "is_last": page >= max_pages
-                        }
-                    
-                    return page_results
-
-            except Exception as e:
-                logger.error(f"[菠萝包] 搜索异常: {e}")
+        try:
+            resp = await self.http.get(url, headers=self.headers, timeout=10)
+            if resp.status != 200:
+                logger.error(f"[菠萝包] 搜索请求失败: {resp.status}")
                 return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
+                
+            content = resp.text(encoding='utf-8')
+            all_results = await self.parse(_parse_search, content, size=len(resp.body))
+            
+            total_count = len(all_results)
+            
+            page_size = 10
+            max_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
+            
+            if page < 1: page = 1
+            if page > max_pages: page = max_pages
+            
+            start_idx = (page - 1) * page_size
+            end_idx = start_idx + page_size
+            page_results = all_results[start_idx:end_idx]
+            
+            if return_metadata:
+                return {
+                    "books": page_results,
+                    "total": total_count,
+                    "max_pages": max_pages,
+                    "current_page": page,
+                    "is_last": page >= max_pages
+                }
+            
+            return page_results
+
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 预算耗尽交给调用方处理，不能当作“没有更多结果”
+        except Exception as e:
+            logger.error(f"[菠萝包] 搜索异常: {e}")
+            return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
 
     async def get_book_details(self, book_url):
-        async with aiohttp.ClientSession(headers=self.headers) as session:
+        try:
+            resp = await self.http.get(book_url, headers=self.headers, timeout=10, cache_ttl=self.detail_cache_ttl)
+            if resp.status != 200:
+                return None
+            content = resp.text()
+            book_info = await self.parse(_parse_detail, content, book_url, size=len(resp.body))
+            match = re.search(r'/Novel/(\d+)', book_url)
+            if match:
+                book_info['bid'] = match.group(1)
+            
+            # 8. Trial Content (First Chapter)，预算不足时跳过
             try:
-                async with session.get(book_url, timeout=10) as resp:
-                    if resp.status != 200:
-                        return None
-                    content = await resp.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    book_info = {
-                        "url": book_url,
-                        "origin": "sfacg"
-                    }
-                    
-                    # 1. Title
-                    title_tag = soup.select_one('.d-summary .title .text')
-                    if title_tag:
-                        for tag in title_tag.find_all(True):
-                            tag.decompose()
-                        book_info['name'] = title_tag.get_text(strip=True)
-                    
-                    # 2. Author
-                    author_tag = soup.select_one('.author-name span')
-                    if author_tag:
-                        book_info['author'] = author_tag.get_text(strip=True)
-                        
-                    # 3. Cover
-                    cover_img = soup.select_one('.books-box .pic img')
-                    if cover_img:
-                        book_info['cover'] = cover_img.get('src')
-                        
-                    # 4. Intro
-                    intro_tag = soup.select_one('.introduce')
-                    if intro_tag:
-                        book_info['intro'] = intro_tag.get_text(strip=True)
-                        
-                    # 5. Tags
-                    tags = [t.get_text(strip=True) for t in soup.select('.tag-list .tag .text')]
-                    book_info['tags'] = tags
-                    
-                    # 6. Metadata
-                    count_details = soup.select('.count-detail .text')
-                    for span in count_details:
-                        text = span.get_text(strip=True)
-                        if '字数' in text:
-                            raw_wc = text.replace('字数：', '')
-                            m = re.search(r'(.*?)\[(.*?)\]', raw_wc)
-                            if m:
-                                book_info['word_count'] = m.group(1)
-                                book_info['status'] = m.group(2)
-                            else:
-                                book_info['word_count'] = raw_wc
-                        if '类型' in text:
-                            book_info['category'] = text.replace('类型：', '')
-                        if '点击' in text:
-                            book_info['total_click'] = text.replace('点击：', '')
-                        if '更新' in text:
-                            book_info['last_update'] = text.replace('更新：', '').strip()
-                            
-                    # 7. Latest Chapter
-                    last_chapter_tag = soup.select_one('.chapter-title .link')
-                    if last_chapter_tag:
-                        book_info['last_chapter'] = last_chapter_tag.get_text(strip=True)
-                    
-                    # 8. Trial Content (First Chapter)
-                    try:
-                        catalog_url = book_url.rstrip('/') + "/MainIndex/"
-                        async with session.get(catalog_url, timeout=5) as c_resp:
-                            if c_resp.status == 200:
-                                c_soup = BeautifulSoup(await c_resp.text(), 'html.parser')
-                                first_chap_link = None
-                                for a in c_soup.select('.catalog-list li a'):
-                                    href = a.get('href')
-                                    if href and '/c/' in href and '/vip/' not in href:
-                                        first_chap_link = href
-                                        break
-                                if not first_chap_link:
-                                    first_chap = c_soup.select_one('.catalog-list li a')
-                                    if first_chap:
-                                        first_chap_link = first_chap.get('href')
-                                
-                                if first_chap_link:
-                                    full_chap_url = "https://book.sfacg.com" + first_chap_link
-                                    async with session.get(full_chap_url, timeout=5) as chap_resp:
-                                        if chap_resp.status == 200:
-                                            chap_soup = BeautifulSoup(await chap_resp.text(), 'html.parser')
-                                            
-                                            title_tag = chap_soup.select_one('.article-title')
-                                            if title_tag:
-                                                book_info['first_chapter_title'] = title_tag.get_text(strip=True)
-                                            
-                                            body = chap_soup.select_one('#ChapterBody')
-                                            if body:
-                                                paragraphs = body.find_all('p')
-                                                if paragraphs:
-                                                    book_info['first_chapter_content'] = "\n".join([p.get_text(strip=True) for p in paragraphs])
-                                                else:
-                                                    book_info['first_chapter_content'] = body.get_text(strip=True)
-                    except Exception as e:
-                        logger.warning(f"[菠萝包] 试读获取失败: {e}")
-                    
+                if not has_budget(self.trial_min_budget):
+                    logger.debug("[菠萝包] 剩余时间不足，跳过试读")
                     return book_info
-
+                catalog_url = book_url.rstrip('/') + "/MainIndex/"
+                c_resp = await self.http.get(catalog_url, headers=self.headers, timeout=5, cache_ttl=self.detail_cache_ttl)
+                if c_resp.status == 200:
+                    first_chap_link = await self.parse(_parse_catalog, c_resp.text(), size=len(c_resp.body))
+                    
+                    if first_chap_link and has_budget(self.trial_min_budget):
+                        full_chap_url = "https://book.sfacg.com" + first_chap_link
+                        chap_resp = await self.http.get(full_chap_url, headers=self.headers, timeout=5, cache_ttl=self.chapter_cache_ttl)
+                        if chap_resp.status == 200:
+                            book_info.update(await self.parse(_parse_chapter, chap_resp.text(), size=len(chap_resp.body)))
             except Exception as e:
-                logger.error(f"[菠萝包] 详情获取异常: {e}")
-                return None
+                logger.warning(f"[菠萝包] 试读获取失败: {e}")
+            
+            return book_info
+
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 主请求超出预算时如实上报，由调用方提示超时
+        except Exception as e:
+            logger.error(f"[菠萝包] 详情获取异常: {e}")
+            return None
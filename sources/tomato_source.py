@@ -1,12 +1,20 @@
-import aiohttp
+import asyncio
 import re
 from datetime import datetime
 from .base_source import BaseSource
+from ..core.deadline import DeadlineExceeded
+from ..core.endpoint_router import HedgedRouter
 from astrbot.api import logger
 
 class TomatoSource(BaseSource):
+    # 健康探测使用的轻量请求
+    PROBE_PATH = "/api/search?key=番茄&offset=0&tab_type=3"
+
     def __init__(self, api_base=None):
         self.api_bases = []
+        # 多个 API 地址按延迟/错误率评分路由，慢地址触发对冲请求
+        self.router = HedgedRouter()
+        self.router.set_probe(self._probe)
         self.api_base = api_base
             
         self.headers = {
@@ -25,29 +33,33 @@ class TomatoSource(BaseSource):
             self.api_bases = [str(url).strip().rstrip('/') for url in value if url]
         else:
             self.api_bases = []
+        self.router.set_endpoints(self.api_bases)
+
+    async def _probe(self, base_url):
+        # 使用未绑定熔断器的共享客户端：探测的是单个地址，失败不应计入番茄整体的熔断
+        client = getattr(self.http, "client", self.http)
+        resp = await client.get(f"{base_url}{self.PROBE_PATH}", headers=self.headers, timeout=5)
+        return resp.status == 200
 
-    async def _fetch_json(self, path):
+    async def _fetch_json(self, path, cache_ttl=None):
         if not self.api_bases:
             return None
-            
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            last_exception = None
-            for base_url in self.api_bases:
-                url = f"{base_url}{path}"
-                try:
-                    async with session.get(url, timeout=10) as resp:
-                        if resp.status == 200:
-                            return await resp.json()
-                        else:
-                            logger.warning(f"[番茄] API 请求失败 {url}: Status {resp.status}")
-                except Exception as e:
-                    last_exception = e
-                    logger.warning(f"[番茄] API 请求异常 {url}: {e}")
-                    continue
-            
-            if last_exception:
-                logger.error(f"[番茄] 所有 API 均请求失败，最后一次异常: {last_exception}")
-            return None
+
+        async def send(base_url):
+            url = f"{base_url}{path}"
+            resp = await self.http.get(url, headers=self.headers, timeout=10, cache_ttl=cache_ttl)
+            if resp.status != 200:
+                logger.warning(f"[番茄] API 请求失败 {url}: Status {resp.status}")
+                return None
+            return resp.json()
+
+        data = await self.router.fetch(send)
+        if data is None:
+            logger.error(f"[番茄] 所有 API 均请求失败: {path}")
+        return data
+
+    async def close(self):
+        await self.router.close()
 
     async def search_book(self, keyword, page=1, return_metadata=False):
         if not self.api_bases:
@@ -100,6 +112,8 @@ class TomatoSource(BaseSource):
                     "is_last": not has_more
                 }
             return results
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 预算耗尽交给调用方处理，不能当作“没有更多结果”
         except Exception as e:
             logger.error(f"[番茄] 搜索异常: {e}")
             return {"books": [], "total": 0, "max_pages": 1, "is_last": True} if return_metadata else []
@@ -117,7 +131,7 @@ class TomatoSource(BaseSource):
         path = f"/api/detail?book_id={book_id}"
         
         try:
-            res_json = await self._fetch_json(path)
+            res_json = await self._fetch_json(path, cache_ttl=self.detail_cache_ttl)
             if not res_json:
                 return None
                 
@@ -127,6 +141,7 @@ class TomatoSource(BaseSource):
                 
             # 18项数据映射实现
             details = {
+                "bid": book_id,
                 "name": data.get("book_name"),
                 "author": data.get("author"),
                 "intro": data.get("abstract", ""),
@@ -148,6 +163,8 @@ class TomatoSource(BaseSource):
                 "url": book_url
             }
             return details
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise  # 主请求超出预算时如实上报，由调用方提示超时
         except Exception as e:
             logger.error(f"[番茄] 详情获取异常: {e}")
             return None
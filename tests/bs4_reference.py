@@ -0,0 +1,302 @@
+"""切换到 lxml 之前基于 BeautifulSoup 的解析逻辑（摘自原 SfacgSource / FalooSource），
+只保留解析部分，用于校验新解析器输出一致"""
+import re
+from bs4 import BeautifulSoup
+
+
+def sfacg_search(content):
+    soup = BeautifulSoup(content, 'html.parser')
+
+    all_results = []
+    items = soup.select('table.comic_cover ul')
+
+    for item in items:
+        name_tag = item.select_one('strong a')
+        if name_tag:
+            href = name_tag['href']
+            full_url = "https://book.sfacg.com" + href if href.startswith('/') else href
+
+            book_id = None
+            match = re.search(r'/Novel/(\d+)', full_url)
+            if match: book_id = match.group(1)
+
+            author = "未知"
+            text_content = item.get_text()
+            info_match = re.search(r'综合信息：\s*(.*?)/', text_content)
+            if info_match:
+                author = info_match.group(1).strip()
+
+            cover_img = item.select_one('img')
+            cover_url = cover_img.get('src') if cover_img else None
+
+            all_results.append({
+                "name": name_tag.get_text(strip=True),
+                "author": author,
+                "url": full_url,
+                "origin": "sfacg",
+                "cover": cover_url,
+                "bid": book_id,
+                "book_id": book_id
+            })
+    return all_results
+
+
+def sfacg_detail(content, book_url):
+    soup = BeautifulSoup(content, 'html.parser')
+
+    book_info = {
+        "url": book_url,
+        "origin": "sfacg"
+    }
+
+    # 1. Title
+    title_tag = soup.select_one('.d-summary .title .text')
+    if title_tag:
+        for tag in title_tag.find_all(True):
+            tag.decompose()
+        book_info['name'] = title_tag.get_text(strip=True)
+
+    # 2. Author
+    author_tag = soup.select_one('.author-name span')
+    if author_tag:
+        book_info['author'] = author_tag.get_text(strip=True)
+
+    # 3. Cover
+    cover_img = soup.select_one('.books-box .pic img')
+    if cover_img:
+        book_info['cover'] = cover_img.get('src')
+
+    # 4. Intro
+    intro_tag = soup.select_one('.introduce')
+    if intro_tag:
+        book_info['intro'] = intro_tag.get_text(strip=True)
+
+    # 5. Tags
+    tags = [t.get_text(strip=True) for t in soup.select('.tag-list .tag .text')]
+    book_info['tags'] = tags
+
+    # 6. Metadata
+    count_details = soup.select('.count-detail .text')
+    for span in count_details:
+        text = span.get_text(strip=True)
+        if '字数' in text:
+            raw_wc = text.replace('字数：', '')
+            m = re.search(r'(.*?)\[(.*?)\]', raw_wc)
+            if m:
+                book_info['word_count'] = m.group(1)
+                book_info['status'] = m.group(2)
+            else:
+                book_info['word_count'] = raw_wc
+        if '类型' in text:
+            book_info['category'] = text.replace('类型：', '')
+        if '点击' in text:
+            book_info['total_click'] = text.replace('点击：', '')
+        if '更新' in text:
+            book_info['last_update'] = text.replace('更新：', '').strip()
+
+    # 7. Latest Chapter
+    last_chapter_tag = soup.select_one('.chapter-title .link')
+    if last_chapter_tag:
+        book_info['last_chapter'] = last_chapter_tag.get_text(strip=True)
+    return book_info
+
+
+def sfacg_catalog(content):
+    c_soup = BeautifulSoup(content, 'html.parser')
+    first_chap_link = None
+    for a in c_soup.select('.catalog-list li a'):
+        href = a.get('href')
+        if href and '/c/' in href and '/vip/' not in href:
+            first_chap_link = href
+            break
+    if not first_chap_link:
+        first_chap = c_soup.select_one('.catalog-list li a')
+        if first_chap:
+            first_chap_link = first_chap.get('href')
+    return first_chap_link
+
+
+def sfacg_chapter(content):
+    chapter = {}
+    chap_soup = BeautifulSoup(content, 'html.parser')
+
+    title_tag = chap_soup.select_one('.article-title')
+    if title_tag:
+        chapter['first_chapter_title'] = title_tag.get_text(strip=True)
+
+    body = chap_soup.select_one('#ChapterBody')
+    if body:
+        paragraphs = body.find_all('p')
+        if paragraphs:
+            chapter['first_chapter_content'] = "\n".join([p.get_text(strip=True) for p in paragraphs])
+        else:
+            chapter['first_chapter_content'] = body.get_text(strip=True)
+    return chapter
+
+
+def faloo_search(content_bytes):
+    content = content_bytes.decode('gb18030', errors='ignore')
+
+    soup = BeautifulSoup(content, 'html.parser')
+    results = []
+
+    items = soup.select('.novelList li')
+    for item in items:
+        try:
+            name_tag = item.select_one('.bl_r1_tit a')
+            if not name_tag: continue
+
+            author_tag = item.select_one('.nl_r1_author a')
+            cover_img = item.select_one('.nl_r1 a img')
+            intro_tag = item.select_one('.bl_r1_into a')
+            word_count_tag = item.select_one('.nl_r2 i')
+
+            href = name_tag['href']
+            if href.startswith('//'):
+                book_url = "https:" + href
+            elif href.startswith('/'):
+                book_url = "https://wap.faloo.com" + href
+            else:
+                book_url = href
+
+            results.append({
+                'name': name_tag.get_text(strip=True),
+                'author': author_tag.get_text(strip=True) if author_tag else "未知",
+                'url': book_url,
+                'origin': 'faloo',
+                'cover': cover_img.get('src') if cover_img else None,
+                'intro': intro_tag.get_text(strip=True) if intro_tag else None,
+                'word_count': word_count_tag.get_text(strip=True) if word_count_tag else None,
+                'bid': re.search(r'(\d+)\.html', book_url).group(1) if re.search(r'(\d+)\.html', book_url) else None
+            })
+        except Exception as e:
+            continue
+    return results
+
+
+def faloo_detail(content_bytes, book_url):
+    content = content_bytes.decode('gb18030', errors='ignore')
+    soup = BeautifulSoup(content, 'html.parser')
+
+    book_info = {
+        "url": book_url,
+        "origin": "faloo"
+    }
+
+    # Extract BID
+    match_bid = re.search(r'(\d+)\.html', book_url)
+    if match_bid:
+        book_info['bid'] = match_bid.group(1)
+
+    # 1. 基本信息
+    name_tag = soup.select_one('.name')
+    if name_tag: book_info['name'] = name_tag.get_text(strip=True)
+
+    author_links = soup.select('.color999 a')
+    if author_links:
+        book_info['author'] = author_links[0].get_text(strip=True)
+        if len(author_links) > 1:
+            book_info['category'] = author_links[1].get_text(strip=True)
+
+    status_tag = soup.select_one('.color999 .tag.textHide')
+    if status_tag: book_info['status'] = status_tag.get_text(strip=True)
+
+    tags = [a.get_text(strip=True) for a in soup.select('.tagList a')]
+    if tags:
+        book_info['tags'] = list(dict.fromkeys(tags))
+
+    cover_img = soup.select_one('.cover_box img')
+    if cover_img: book_info['cover'] = cover_img.get('src')
+
+    intro_p = soup.select_one('#novel_intro')
+    if intro_p: book_info['intro'] = intro_p.get_text('\n', strip=True)
+
+    last_chap = soup.select_one('.newNode')
+    if last_chap: book_info['last_chapter'] = last_chap.get_text(strip=True)
+
+    count_text = soup.select_one('.countText')
+    if count_text:
+        raw_count = count_text.get_text(strip=True)
+        match = re.search(r'(\d+)', raw_count)
+        if match:
+            book_info['total_chapters'] = match.group(1)
+        else:
+            book_info['total_chapters'] = raw_count
+
+    # 2. 统计信息
+    info_ul = soup.select_one('ul.info')
+    if info_ul:
+        lis = info_ul.find_all('li')
+        for li in lis:
+            text = li.get_text(strip=True)
+            if '万字' in text:
+                parts = text.split('|')
+                if len(parts) >= 1: book_info['word_count'] = parts[0].strip()
+                if len(parts) >= 2: book_info['total_click'] = parts[1].strip()
+            if '更新时间：' in text:
+                book_info['last_update'] = text.replace('更新时间：', '').strip()
+            if '分' in text and '已评' in text:
+                raw_score = text.strip()
+                try:
+                    score_parts = raw_score.split('/')
+                    if len(score_parts) >= 1:
+                        book_info['rating'] = score_parts[0].replace('分', '').strip()
+                    if len(score_parts) >= 2:
+                        book_info['rating_users'] = score_parts[1].replace('人已评', '').strip()
+                except:
+                    book_info['rating'] = raw_score
+
+    rewards = soup.select('.reward li')
+    if len(rewards) >= 4:
+        try:
+            book_info['reward_coin'] = rewards[0].select_one('span').get_text(strip=True)
+            book_info['reward_flower'] = rewards[1].select_one('span').get_text(strip=True)
+            book_info['reward_ticket'] = rewards[2].select_one('span').get_text(strip=True)
+            book_info['reward_review'] = rewards[3].select_one('span').get_text(strip=True)
+        except:
+            pass
+
+    nav_links = soup.select('.display_flex_between a')
+    catalog_href = nav_links[1]['href'] if len(nav_links) > 1 else None
+    return book_info, catalog_href
+
+
+def faloo_catalog(content_bytes):
+    c_content = content_bytes.decode('gb18030', errors='ignore')
+    c_soup = BeautifulSoup(c_content, 'html.parser')
+
+    chapter_url = None
+    chapters = c_soup.select('.v_nodeList li a')
+    for link in chapters:
+        if link.select('.icon_close') or link.select('img[src*="vip"]'):
+            continue
+
+        c_href = link.get('href')
+        if c_href:
+            if c_href.startswith('//'):
+                chapter_url = "https:" + c_href
+            elif c_href.startswith('/'):
+                chapter_url = "https://wap.faloo.com" + c_href
+            else:
+                chapter_url = c_href
+            break
+    return chapter_url
+
+
+def faloo_chapter(content_bytes):
+    chapter = {}
+    ch_content = content_bytes.decode('gb18030', errors='ignore')
+    ch_soup = BeautifulSoup(ch_content, 'html.parser')
+
+    title = ch_soup.select_one('h1') or ch_soup.select_one('.title')
+    if title: chapter['first_chapter_title'] = title.get_text(strip=True)
+
+    content_div = ch_soup.select_one('.nodeContent')
+    if content_div:
+        ps = content_div.find_all('p')
+        if ps:
+            lines = [p.get_text(strip=True) for p in ps]
+            chapter['first_chapter_content'] = "\n".join(lines)
+        else:
+            chapter['first_chapter_content'] = content_div.get_text('\n', strip=True)
+    return chapter
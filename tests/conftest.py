@@ -0,0 +1,33 @@
+import importlib
+import os
+import sys
+import types
+import pytest
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PACKAGE = "webnovel_info"
+
+
+def _register_package(name: str, path: str):
+    """注册包但不执行其 __init__（sources/__init__ 会连带导入全部数据源及其依赖）"""
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        sys.modules[name] = module
+
+
+def load_module(name: str):
+    """按插件内的相对路径导入模块，例如 load_module("sources.sfacg_source")"""
+    _register_package(PACKAGE, PLUGIN_ROOT)
+    _register_package(f"{PACKAGE}.sources", os.path.join(PLUGIN_ROOT, "sources"))
+    _register_package(f"{PACKAGE}.core", os.path.join(PLUGIN_ROOT, "core"))
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+@pytest.fixture
+def page():
+    def read(name: str) -> bytes:
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            return f.read()
+    return read
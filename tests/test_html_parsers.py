@@ -0,0 +1,72 @@
+"""新解析器（lxml + cssselect）与原 BeautifulSoup 实现对同一批保存页面的输出必须一致"""
+import pytest
+from conftest import load_module
+
+for dependency in ("astrbot", "lxml", "cssselect", "bs4"):
+    pytest.importorskip(dependency)
+import bs4_reference as ref
+
+sfacg = load_module("sources.sfacg_source")
+faloo = load_module("sources.faloo_source")
+
+
+def test_sfacg_search(page):
+    content = page("sfacg_search.html").decode("utf-8")
+    results = sfacg._parse_search(content)
+    assert results == ref.sfacg_search(content)
+    assert [r["bid"] for r in results] == ["567122", "498831", "612004"]
+
+
+def test_sfacg_detail(page):
+    content = page("sfacg_detail.html").decode("utf-8")
+    url = "https://book.sfacg.com/Novel/567122/"
+    details = sfacg._parse_detail(content, url)
+    assert details == ref.sfacg_detail(content, url)
+    assert details["name"] == "魔法少女不可能这么可爱"
+    assert details["status"] == "连载中"
+
+
+@pytest.mark.parametrize("name", ["sfacg_catalog.html", "sfacg_catalog_vip.html"])
+def test_sfacg_catalog(page, name):
+    content = page(name).decode("utf-8")
+    assert sfacg._parse_catalog(content) == ref.sfacg_catalog(content)
+
+
+@pytest.mark.parametrize("name", ["sfacg_chapter.html", "sfacg_chapter_plain.html"])
+def test_sfacg_chapter(page, name):
+    content = page(name).decode("utf-8")
+    chapter = sfacg._parse_chapter(content)
+    assert chapter == ref.sfacg_chapter(content)
+    assert chapter["first_chapter_content"]
+
+
+def test_faloo_search(page):
+    content = page("faloo_search.html")
+    results = faloo._parse_search(content)
+    assert results == ref.faloo_search(content)
+    assert [r["bid"] for r in results] == ["1234567", "7654321", None]
+
+
+def test_faloo_detail(page):
+    content = page("faloo_detail.html")
+    url = "https://wap.faloo.com/1234567.html"
+    details, catalog_href = faloo._parse_detail(content, url)
+    assert (details, catalog_href) == ref.faloo_detail(content, url)
+    assert details["tags"] == ["修仙", "重生"]
+    assert details["reward_review"] == "96"
+    assert catalog_href == "/list/1234567.html"
+
+
+def test_faloo_catalog(page):
+    content = page("faloo_catalog.html")
+    chapter_url = faloo._parse_catalog(content)
+    assert chapter_url == ref.faloo_catalog(content)
+    assert chapter_url == "https://wap.faloo.com/1234567_1.html"
+
+
+@pytest.mark.parametrize("name", ["faloo_chapter.html", "faloo_chapter_plain.html"])
+def test_faloo_chapter(page, name):
+    content = page(name)
+    chapter = faloo._parse_chapter(content)
+    assert chapter == ref.faloo_chapter(content)
+    assert chapter["first_chapter_content"]